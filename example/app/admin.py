@@ -1,9 +1,23 @@
 from django.contrib import admin
 
-# Register your models here.
+from export_csv.admin import ExportCSVAdminMixin
 
 from .models import Account, Customer, Transaction
+from .views import AccountCSV, CustomerCSV, TransactionCSV
 
-admin.site.register(Account)
-admin.site.register(Customer)
-admin.site.register(Transaction)
+
+@admin.register(Account)
+class AccountAdmin(ExportCSVAdminMixin, admin.ModelAdmin):
+    export_csv_view = AccountCSV
+
+
+@admin.register(Customer)
+class CustomerAdmin(ExportCSVAdminMixin, admin.ModelAdmin):
+    export_csv_view = CustomerCSV
+    list_filter = ['is_active']
+
+
+@admin.register(Transaction)
+class TransactionAdmin(ExportCSVAdminMixin, admin.ModelAdmin):
+    export_csv_view = TransactionCSV
+    list_select_related = ['account']
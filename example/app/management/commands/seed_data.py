@@ -0,0 +1,53 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.models import Account, Customer, Transaction
+
+
+class Command(BaseCommand):
+    help = 'Seeds a large dataset for load testing the export views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--transactions', type=int, default=100000,
+                            help='Total number of transactions.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        random.seed(1729)
+        now = timezone.now()
+        batch_size = options['batch_size']
+
+        # bulk_create skips Model.save and the update_account signal, which
+        # would otherwise take several queries per row.
+        Customer.objects.bulk_create(
+            (Customer(name='Customer %d' % i, address='Address %d' % i,
+                      is_active=bool(i % 5), last_updated=now)
+             for i in range(options['customers'])),
+            batch_size=batch_size)
+        customers = list(Customer.objects.values_list('pk', flat=True))
+        Account.objects.bulk_create(
+            (Account(owner_id=pk, account_no='%010X' % pk,
+                     balance=Decimal(random.randrange(100, 10000000)),
+                     creation_date=now)
+             for pk in customers),
+            batch_size=batch_size)
+        accounts = list(Account.objects.values_list('pk', flat=True))
+
+        total = options['transactions']
+        for start in range(0, total, batch_size):
+            Transaction.objects.bulk_create([
+                Transaction(
+                    account_id=random.choice(accounts),
+                    transaction_id='%010X' % (start + i),
+                    transaction_date=now,
+                    exchange=Decimal(random.randrange(-50000, 50000)),
+                    is_fraudulent=random.random() < 0.2)
+                for i in range(min(batch_size, total - start))
+            ])
+        self.stdout.write('Seeded %d customers, %d accounts and %d '
+                          'transactions.' % (len(customers), len(accounts),
+                                             total))
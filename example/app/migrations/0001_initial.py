@@ -1,6 +1,4 @@
-# -*- coding: utf-8 -*-
 # Generated by Django 1.10.3 on 2016-11-22 12:29
-from __future__ import unicode_literals
 
 from django.db import migrations, models
 import django.db.models.deletion
@@ -1,17 +1,13 @@
-from __future__ import unicode_literals
-
 import random
 
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models.signals import post_save
 from django.utils import timezone
-from django.utils.encoding import python_2_unicode_compatible
 
 from .signals import update_account
 
 
-@python_2_unicode_compatible
 class Customer(models.Model):
     name = models.CharField(max_length=200)
     address = models.CharField(max_length=500)
@@ -26,7 +22,6 @@ class Customer(models.Model):
         return self.name
 
 
-@python_2_unicode_compatible
 class Account(models.Model):
     owner = models.ForeignKey(Customer, on_delete=models.CASCADE)
     account_no = models.CharField(max_length=200)
@@ -52,7 +47,6 @@ class Account(models.Model):
         return self.account_no
 
 
-@python_2_unicode_compatible
 class Transaction(models.Model):
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
     transaction_id = models.CharField(max_length=200)
@@ -1,7 +1,6 @@
-from __future__ import unicode_literals
-
 import random
 
+from django.conf import settings
 from django.utils import timezone
 
 
@@ -24,6 +23,8 @@ def _get_random_boolean(true_probability=0.5):
 
 def populate_models(sender, **kwargs):
     from .models import Customer, Account, Transaction
+    if not getattr(settings, 'POPULATE_DEMO_DATA', True):
+        return
     if Customer.objects.count() != 0:
         return
 
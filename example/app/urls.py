@@ -8,4 +8,6 @@ urlpatterns = [
     url(r'^customer/csv/$', views.CustomerCSV.as_view(), name='customer-csv'),
     url(r'^transaction/csv/$', views.TransactionCSV.as_view(),
         name='transaction-csv'),
+    url(r'^transaction/stream/csv/$', views.TransactionStreamingCSV.as_view(),
+        name='transaction-stream-csv'),
 ]
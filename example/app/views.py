@@ -1,5 +1,3 @@
-from __future__ import unicode_literals
-
 import csv
 
 from django.views.generic import TemplateView
@@ -51,7 +49,13 @@ class TransactionCSV(ExportCSV):
     filename = 'transactions_csv_filename.csv'
 
     def get_csv_writer_kwargs(self, **kwargs):
-        return dict(quoting=csv.QUOTE_ALL, delimiter=b' ', quotechar=b'|')
+        return dict(quoting=csv.QUOTE_ALL, delimiter=str(' '),
+                    quotechar=str('|'))
 
     def clean_transaction_id(self, value):
         return str(value).lower()
+
+
+class TransactionStreamingCSV(TransactionCSV):
+    """Same as TransactionCSV, but streamed."""
+    streaming = True
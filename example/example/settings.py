@@ -78,10 +78,14 @@ WSGI_APPLICATION = 'example.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get('EXAMPLE_DB_NAME',
+                               os.path.join(BASE_DIR, 'db.sqlite3')),
     }
 }
 
+# Populate sample data for demo after migrating an empty database
+POPULATE_DEMO_DATA = os.environ.get('EXAMPLE_POPULATE_DEMO_DATA', '1') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+"""
+Load testing harness for the export views of the example project.
+
+It seeds a separate SQLite database, boots the example project under
+gunicorn (sync or threaded workers), fires concurrent
+downloads at each export URL and reports throughput, latency percentiles,
+peak worker RSS and peak database connections per URL. Everything runs
+locally, no network access is needed.
+
+Example::
+
+    python loadtest.py --transactions 200000 --concurrency 50 \\
+        --requests 200 --workers 4 \\
+        /transaction/csv/ /transaction/stream/csv/
+
+Requires Linux (``/proc``) and gunicorn to be installed.
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BASE_DIR)
+DEFAULT_PATHS = ['/customer/csv/', '/transaction/csv/',
+                 '/transaction/stream/csv/']
+
+
+def manage(env, *args):
+    subprocess.check_call([sys.executable, 'manage.py'] + list(args),
+                          cwd=BASE_DIR, env=env)
+
+
+def seed(env, db_name, options):
+    """Creates and seeds the database, unless it already exists."""
+    if os.path.exists(db_name) and not options.reseed:
+        return
+    if os.path.exists(db_name):
+        os.remove(db_name)
+    manage(env, 'migrate', '--noinput', '-v', '0')
+    manage(env, 'seed_data', '--customers', str(options.customers),
+           '--transactions', str(options.transactions))
+
+
+def get_free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def start_server(env, options, port):
+    bind = '127.0.0.1:%d' % port
+    command = ['gunicorn', 'example.wsgi', '--bind', bind, '--workers',
+               str(options.workers), '--worker-class', options.worker_class,
+               '--threads', str(options.threads), '--timeout', '600']
+    server = subprocess.Popen(command, cwd=BASE_DIR, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except (IOError, OSError):
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('Server did not start: %s' % ' '.join(command))
+
+
+def get_process_tree(pid):
+    """Returns ``pid`` and the pids of all its descendants."""
+    pids = [pid]
+    for current in pids:
+        task_dir = '/proc/%d/task' % current
+        try:
+            tasks = os.listdir(task_dir)
+        except OSError:
+            continue
+        for task in tasks:
+            try:
+                with open('%s/%s/children' % (task_dir, task)) as f:
+                    pids.extend(int(child) for child in f.read().split())
+            except (IOError, OSError):
+                pass
+    return pids
+
+
+def get_rss(pid):
+    """Returns the resident set size of ``pid`` in bytes."""
+    try:
+        with open('/proc/%d/status' % pid) as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError):
+        pass
+    return 0
+
+
+def count_db_connections(pid, db_name):
+    """Returns the number of open file descriptors of ``pid`` pointing to the
+    SQLite database, i.e. its open database connections."""
+    fd_dir = '/proc/%d/fd' % pid
+    count = 0
+    try:
+        fds = os.listdir(fd_dir)
+    except OSError:
+        return 0
+    for fd in fds:
+        try:
+            if os.readlink('%s/%s' % (fd_dir, fd)) == db_name:
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+class Sampler(threading.Thread):
+    """Samples the RSS and database connections of the server processes."""
+
+    def __init__(self, server_pid, db_name, interval=0.1):
+        super(Sampler, self).__init__()
+        self.daemon = True
+        self.server_pid = server_pid
+        self.db_name = db_name
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self.peak_rss = 0
+        self.peak_worker_rss = 0
+        self.peak_connections = 0
+
+    def run(self):
+        while not self.stopped.is_set():
+            pids = get_process_tree(self.server_pid)
+            rss = [get_rss(pid) for pid in pids]
+            connections = sum(count_db_connections(pid, self.db_name)
+                              for pid in pids)
+            self.peak_rss = max(self.peak_rss, sum(rss))
+            self.peak_worker_rss = max([self.peak_worker_rss] + rss)
+            self.peak_connections = max(self.peak_connections, connections)
+            time.sleep(self.interval)
+
+
+def download(url):
+    """Downloads ``url`` and returns (time to first byte, total time,
+    bytes)."""
+    start = time.time()
+    response = urlopen(url, timeout=600)
+    first_byte = None
+    size = 0
+    while True:
+        chunk = response.read(64 * 1024)
+        if first_byte is None:
+            first_byte = time.time() - start
+        if not chunk:
+            break
+        size += len(chunk)
+    response.close()
+    return first_byte, time.time() - start, size
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_load(base_url, path, options, sampler):
+    sampler.reset()
+    url = base_url + path
+    errors = 0
+    results = []
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=options.concurrency) as executor:
+        futures = [executor.submit(download, url)
+                   for _ in range(options.requests)]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.time() - start
+    latencies = [total for _, total, _ in results]
+    first_bytes = [first for first, _, _ in results]
+    size = sum(size for _, _, size in results)
+    return {
+        'path': path,
+        'requests': len(results),
+        'errors': errors,
+        'rps': len(results) / elapsed,
+        'mbps': size / elapsed / 1024 / 1024,
+        'ttfb_p50': percentile(first_bytes, 50),
+        'p50': percentile(latencies, 50),
+        'p90': percentile(latencies, 90),
+        'p99': percentile(latencies, 99),
+        'peak_rss': sampler.peak_rss / 1024 / 1024,
+        'peak_worker_rss': sampler.peak_worker_rss / 1024 / 1024,
+        'peak_connections': sampler.peak_connections,
+    }
+
+
+def print_report(results, options):
+    print()
+    print('Server: gunicorn, %d workers (%s, %d threads), concurrency %d' % (
+        options.workers, options.worker_class, options.threads,
+        options.concurrency))
+    header = ('%-28s %6s %4s %8s %8s %8s %8s %8s %8s %9s %9s %5s' % (
+        'path', 'reqs', 'errs', 'req/s', 'MB/s', 'ttfb50', 'p50', 'p90',
+        'p99', 'rss MB', 'worker MB', 'conns'))
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print('%-28s %6d %4d %8.2f %8.2f %8.3f %8.3f %8.3f %8.3f %9.1f '
+              '%9.1f %5d' % (
+                  r['path'], r['requests'], r['errors'], r['rps'], r['mbps'],
+                  r['ttfb_p50'], r['p50'], r['p90'], r['p99'], r['peak_rss'],
+                  r['peak_worker_rss'], r['peak_connections']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+    parser.add_argument('--db', default='/tmp/export_csv_loadtest.sqlite3',
+                        help='Path of the seeded SQLite database.')
+    parser.add_argument('--reseed', action='store_true')
+    parser.add_argument('--customers', type=int, default=1000)
+    parser.add_argument('--transactions', type=int, default=100000)
+    parser.add_argument('--worker-class', default='sync',
+                        help='gunicorn worker class, e.g. sync or gthread.')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200)
+    options = parser.parse_args()
+
+    db_name = os.path.abspath(options.db)
+    # use export_csv from this checkout
+    python_path = [ROOT_DIR] + [p for p in
+                                os.environ.get('PYTHONPATH', '').split(
+                                    os.pathsep) if p]
+    env = dict(os.environ, EXAMPLE_DB_NAME=db_name,
+               DJANGO_SETTINGS_MODULE='example.settings',
+               EXAMPLE_POPULATE_DEMO_DATA='0',
+               PYTHONPATH=os.pathsep.join(python_path))
+    seed(env, db_name, options)
+
+    port = get_free_port()
+    server = start_server(env, options, port)
+    sampler = Sampler(server.pid, db_name)
+    sampler.start()
+    try:
+        base_url = 'http://127.0.0.1:%d' % port
+        # warm up the workers before measuring
+        for path in options.paths:
+            download(base_url + path)
+        results = [run_load(base_url, path, options, sampler)
+                   for path in options.paths]
+    finally:
+        sampler.stopped.set()
+        server.terminate()
+        server.wait()
+    print_report(results, options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+from django.contrib.admin.options import IS_POPUP_VAR
+from django.utils.translation import ugettext_lazy as _
+
+from .views import ExportCSV
+
+
+def export_csv_action(view_class=ExportCSV, description=None, **initkwargs):
+    """Returns an admin action exporting the selected objects with
+    ``view_class``.
+
+    The columns, hooks and CSV format of the view are used, only the
+    queryset is replaced by the selection. When all the objects are
+    selected across pages, the selection is the filtered queryset of the
+    change list, not a list of primary keys, and it is streamed in chunks
+    like any export of the view.
+
+    :param view_class: :class:`export_csv.views.ExportCSV` subclass
+    :param description: description of the action in the admin
+    :type description: str
+    :param initkwargs: attributes of the view, e.g. ``filename``
+    :returns: function
+    """
+    initkwargs.setdefault('streaming', True)
+
+    def export_csv(modeladmin, request, queryset):
+        view = view_class(**initkwargs)
+        if view.model is None:
+            view.model = queryset.model
+        # export the selection, not the queryset of the view
+        view.get_queryset = lambda: queryset
+        view.request = request
+        view.args = ()
+        view.kwargs = {}
+        return view.get(request)
+
+    export_csv.short_description = description or _('Export selected to CSV')
+    export_csv.allowed_permissions = ('view',)
+    return export_csv
+
+
+class ExportCSVAdminMixin(object):
+    """:class:`ModelAdmin` mixin adding an ``export_csv`` action exporting
+    the selected objects with ``export_csv_view``.
+
+    .. code-block:: python
+
+        class CustomerAdmin(ExportCSVAdminMixin, admin.ModelAdmin):
+            export_csv_view = CustomerCSV
+    """
+
+    export_csv_view = ExportCSV
+    """
+    :class:`export_csv.views.ExportCSV` subclass used by the action.
+    """
+
+    export_csv_description = None
+    """
+    Description of the action in the admin.
+    """
+
+    def get_actions(self, request):
+        actions = super(ExportCSVAdminMixin, self).get_actions(request)
+        # like ModelAdmin, no actions in popups or if actions are disabled
+        if self.actions is None or IS_POPUP_VAR in request.GET:
+            return actions
+        if 'export_csv' not in actions and self.has_view_permission(request):
+            action = export_csv_action(self.export_csv_view,
+                                       self.export_csv_description)
+            actions['export_csv'] = (action, 'export_csv',
+                                     action.short_description)
+        return actions
@@ -1,7 +1,8 @@
-from __future__ import unicode_literals
-
 from django.apps import AppConfig
 
 
 class ExportCsvConfig(AppConfig):
     name = 'export_csv'
+
+    def ready(self):
+        from . import checks  # NOQA
@@ -0,0 +1,169 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.encoding import force_text
+from django.utils.translation import ugettext_lazy as _
+
+from .db import _INTEGER_FIELDS
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+ARROW_FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrows'),
+}
+"""
+Content type and file extension of every columnar output format.
+"""
+
+
+def check_format(format):
+    """Checks that ``format`` is a columnar format and that ``pyarrow`` is
+    installed.
+
+    :raises: ImproperlyConfigured
+    """
+    if format not in ARROW_FORMATS:
+        raise ImproperlyConfigured(
+            _('Unknown output format "{}".').format(format))
+    if pyarrow is None:
+        raise ImproperlyConfigured(
+            _('pyarrow is required to export {} files.').format(format))
+
+
+def get_arrow_type(field):
+    """Returns the Arrow type of the values of the Django model ``field``.
+
+    Fields without a matching Arrow type (e.g. ``UUIDField`` or
+    ``JSONField``) are exported as strings, see :class:`ArrowWriter`.
+
+    :param field: model field, or ``None``
+    :returns: :class:`pyarrow.DataType`
+    """
+    internal_type = field.get_internal_type() if field is not None else None
+    if internal_type in ('BooleanField', 'NullBooleanField'):
+        return pyarrow.bool_()
+    if internal_type in _INTEGER_FIELDS:
+        return pyarrow.int64()
+    if internal_type == 'FloatField':
+        return pyarrow.float64()
+    if internal_type == 'DecimalField' and field.max_digits <= 38:
+        return pyarrow.decimal128(field.max_digits, field.decimal_places)
+    if internal_type == 'DateTimeField':
+        return pyarrow.timestamp('us', tz='UTC' if settings.USE_TZ else None)
+    if internal_type == 'DateField':
+        return pyarrow.date32()
+    if internal_type == 'TimeField':
+        return pyarrow.time64('us')
+    if internal_type == 'DurationField':
+        return pyarrow.duration('us')
+    if internal_type == 'BinaryField':
+        return pyarrow.binary()
+    return pyarrow.string()
+
+
+def _to_string(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return force_text(value)
+
+
+class _Sink(object):
+    """Unseekable file-like object collecting the bytes written by Arrow
+    until they are drained."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        """Returns and forgets the bytes written since the last call."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ArrowWriter(object):
+    """Writes rows as Arrow record batches to a Parquet file or an Arrow IPC
+    stream and returns the bytes produced.
+
+    Every chunk of rows becomes one record batch (one row group in
+    Parquet), built column by column without formatting the values, except
+    for string columns: their values are written as text (lists and dicts,
+    e.g. of a ``JSONField``, as JSON).
+
+    :param names: column names
+    :type names: list
+    :param types: Arrow type of every column, see :func:`get_arrow_type`
+    :type types: list
+    :param format: ``parquet`` or ``arrow`` (IPC stream)
+    :param compression: compression codec of Parquet files, e.g. ``snappy``
+        or ``zstd``
+    :raises: ImproperlyConfigured
+    """
+
+    bom = b''
+
+    def __init__(self, names, types, format='parquet', compression='snappy'):
+        check_format(format)
+        self.schema = pyarrow.schema(list(zip(names, types)))
+        self._strings = [pyarrow.types.is_string(field.type)
+                         for field in self.schema]
+        self._sink = _Sink()
+        if format == 'parquet':
+            self._writer = pyarrow.parquet.ParquetWriter(
+                self._sink, self.schema, compression=compression)
+        else:
+            self._writer = pyarrow.ipc.new_stream(self._sink, self.schema)
+
+    def write_rows(self, rows):
+        """Writes ``rows`` as one record batch.
+
+        :param rows: iterable of lists
+        :returns: bytes
+        """
+        rows = list(rows)
+        if rows:
+            arrays = []
+            for values, field, is_string in zip(zip(*rows), self.schema,
+                                                self._strings):
+                if is_string:
+                    values = [_to_string(value) for value in values]
+                arrays.append(pyarrow.array(values, type=field.type))
+            self._writer.write_batch(pyarrow.RecordBatch.from_arrays(
+                arrays, schema=self.schema))
+        return self._sink.drain()
+
+    def close(self):
+        """Ends the file (Parquet footer or end of stream marker).
+
+        :returns: bytes
+        """
+        self._writer.close()
+        return self._sink.drain()
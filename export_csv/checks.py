@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.checks import Tags, register
+from django.urls import URLResolver, get_resolver
+
+
+def _iter_views(patterns):
+    """Yields ``(view_class, initkwargs)`` for every class-based view of
+    ``patterns``, recursively."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            for view in _iter_views(pattern.url_patterns):
+                yield view
+            continue
+        view_class = getattr(pattern.callback, 'view_class', None)
+        if view_class is not None:
+            yield view_class, getattr(pattern.callback, 'view_initkwargs', {})
+
+
+def iter_export_views(patterns=None):
+    """Yields ``(view_class, initkwargs)`` once for every
+    :class:`export_csv.views.ExportCSV` view of the URLconf, including the
+    views of :class:`export_csv.views.ExportCSVBundle` views.
+
+    :param patterns: URL patterns. Defaults to the patterns of the root
+        URLconf.
+    :returns: generator of tuples
+    """
+    from .views import ExportCSV, ExportCSVBundle
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    seen = set()
+    for view_class, initkwargs in _iter_views(patterns):
+        views = [(view_class, initkwargs)]
+        if issubclass(view_class, ExportCSVBundle):
+            bundle_views = initkwargs.get('views', view_class.views)
+            views = [(cls, {}) for cls in bundle_views or ()]
+        for cls, initkwargs in views:
+            key = (cls, tuple(sorted(initkwargs)))
+            if issubclass(cls, ExportCSV) and key not in seen:
+                seen.add(key)
+                yield cls, initkwargs
+
+
+@register(Tags.urls)
+def check_export_views(app_configs=None, **kwargs):
+    """Validates every :class:`export_csv.views.ExportCSV` view of the
+    URLconf, including the views of :class:`export_csv.views.ExportCSVBundle`
+    views, with :func:`export_csv.views.ExportCSV.check`."""
+    if not getattr(settings, 'ROOT_URLCONF', None):
+        return []
+    errors = []
+    for view_class, initkwargs in iter_export_views():
+        errors.extend(view_class.check(initkwargs))
+    return errors
@@ -0,0 +1,273 @@
+import json
+import random
+from contextlib import contextmanager
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Max, Min
+from django.db.models.expressions import RawSQL
+
+EXACT_COUNT_THRESHOLD = 100000
+"""
+Estimates below this number of rows are replaced by an exact count, which
+is cheap for small tables.
+"""
+
+
+def _get_sql(queryset):
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    return compiler.as_sql()
+
+
+def _estimate_postgresql(queryset, connection):
+    sql, params = _get_sql(queryset)
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if not isinstance(plan, list):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def _estimate_mysql(queryset, connection):
+    sql, params = _get_sql(queryset)
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        columns = [col[0] for col in cursor.description]
+        row = cursor.fetchone()
+    if row is None or 'rows' not in columns:
+        return None
+    rows = row[columns.index('rows')]
+    return int(rows) if rows is not None else None
+
+
+_estimators = {
+    'postgresql': _estimate_postgresql,
+    'mysql': _estimate_mysql,
+}
+
+
+def estimate_count(queryset, exact_threshold=EXACT_COUNT_THRESHOLD):
+    """Returns the estimated number of rows of ``queryset``.
+
+    On PostgreSQL and MySQL the estimate of the query planner is used, which
+    does not scan the table. On other backends, or if the estimate is below
+    ``exact_threshold``, the exact count is returned.
+
+    :param queryset: queryset
+    :type queryset: :class:`QuerySet`
+    :param exact_threshold: estimates below this are replaced by an exact
+        count
+    :type exact_threshold: int
+    :returns: int
+    """
+    connection = connections[queryset.db]
+    estimator = _estimators.get(connection.vendor)
+    estimate = None
+    if estimator is not None:
+        try:
+            estimate = estimator(queryset, connection)
+        except (KeyError, IndexError, TypeError, ValueError):
+            estimate = None
+    if estimate is None or estimate < exact_threshold:
+        return queryset.count()
+    return estimate
+
+
+SAMPLE_SEGMENTS = 10
+"""
+Number of random primary key ranges a sample is read from on databases
+without ``TABLESAMPLE``.
+"""
+
+_INTEGER_FIELDS = (
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'IntegerField',
+    'PositiveBigIntegerField', 'PositiveIntegerField',
+    'PositiveSmallIntegerField', 'SmallAutoField', 'SmallIntegerField',
+)
+
+
+def _sample_postgresql(queryset, rows, connection):
+    opts = queryset.model._meta
+    table_rows = estimate_count(
+        queryset.model._default_manager.using(queryset.db).all(),
+        exact_threshold=0)
+    # sample twice as many rows as needed, as some of them may be filtered
+    # out by the queryset
+    percent = min(100.0, 200.0 * rows / max(table_rows, 1))
+    qn = connection.ops.quote_name
+    sql = 'SELECT {} FROM {} TABLESAMPLE SYSTEM (%s)'.format(
+        qn(opts.pk.column), qn(opts.db_table))
+    return queryset.filter(pk__in=RawSQL(sql, [percent]))
+
+
+def _sample_pk_range(queryset, rows, connection):
+    if queryset.model._meta.pk.get_internal_type() not in _INTEGER_FIELDS:
+        return queryset
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return queryset
+    per_segment = -(-rows // SAMPLE_SEGMENTS)
+    ordered = queryset.order_by('pk').values_list('pk', flat=True)
+    pks = set()
+    for _ in range(SAMPLE_SEGMENTS):
+        start = random.randint(bounds['low'], bounds['high'])
+        pks.update(ordered.filter(pk__gte=start)[:per_segment])
+    return queryset.filter(pk__in=pks)
+
+
+_samplers = {
+    'postgresql': _sample_postgresql,
+}
+
+
+def preview_queryset(queryset, rows, sample=False):
+    """Returns at most ``rows`` objects of ``queryset``, whatever the size of
+    the table.
+
+    By default, the first ``rows`` objects are returned. If ``sample`` is
+    ``True``, a random sample is returned instead: on PostgreSQL, it is read
+    from the blocks picked by ``TABLESAMPLE SYSTEM``; on other databases,
+    from :data:`SAMPLE_SEGMENTS` random ranges of integer primary keys, one
+    index range scan each. Querysets which are already sliced or whose
+    primary key is not an integer are not sampled.
+
+    Sampled objects keep the ordering of ``queryset``.
+
+    :param queryset: queryset
+    :type queryset: :class:`QuerySet`
+    :param rows: maximum number of objects
+    :type rows: int
+    :param sample: whether to return a random sample
+    :type sample: bool
+    :returns: :class:`QuerySet`
+    """
+    if sample and queryset.query.can_filter():
+        connection = connections[queryset.db]
+        sampler = _samplers.get(connection.vendor, _sample_pk_range)
+        queryset = sampler(queryset, rows, connection)
+    return queryset[:rows]
+
+
+def _set_postgresql_timeout(cursor, milliseconds):
+    cursor.execute('SHOW statement_timeout')
+    previous = cursor.fetchone()[0]
+    cursor.execute('SET statement_timeout = %s', [milliseconds])
+    return 'SET statement_timeout = %s', [previous]
+
+
+def _set_mysql_timeout(cursor, milliseconds):
+    if getattr(cursor.db, 'mysql_is_mariadb', False):
+        variable, value = 'max_statement_time', milliseconds / 1000.0
+    else:
+        variable, value = 'max_execution_time', milliseconds
+    cursor.execute('SELECT @@SESSION.%s' % variable)
+    previous = cursor.fetchone()[0]
+    cursor.execute('SET SESSION %s = %%s' % variable, [value])
+    return 'SET SESSION %s = %%s' % variable, [previous]
+
+
+_timeout_setters = {
+    'postgresql': _set_postgresql_timeout,
+    'mysql': _set_mysql_timeout,
+}
+
+
+@contextmanager
+def statement_timeout(using, seconds):
+    """Context manager limiting the execution time of every query run on
+    database ``using`` to ``seconds``, and restoring the previous limit on
+    exit.
+
+    Applied on PostgreSQL (``statement_timeout``), MySQL
+    (``max_execution_time``) and MariaDB (``max_statement_time``). On other
+    databases, or if ``seconds`` is ``None``, it does nothing.
+
+    :param using: database alias
+    :type using: str
+    :param seconds: timeout in seconds
+    :type seconds: float
+    """
+    connection = connections[using]
+    setter = _timeout_setters.get(connection.vendor)
+    if not seconds or setter is None:
+        yield
+        return
+    with connection.cursor() as cursor:
+        reset_sql, reset_params = setter(cursor, int(seconds * 1000))
+    try:
+        yield
+    finally:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(reset_sql, reset_params)
+        except DatabaseError:
+            # e.g. the transaction was aborted by the timeout; the setting
+            # is discarded along with it or when the connection is closed
+            pass
+
+
+# SQLite transactions are serializable, so they need no statement
+_snapshot_statements = {
+    'postgresql': 'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY',
+    'mysql': 'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY',
+    'oracle': 'SET TRANSACTION READ ONLY',
+}
+
+
+@contextmanager
+def snapshot(using, enabled=True, snapshot_id=None):
+    """Context manager running the queries on database ``using`` in one
+    read-only transaction, so that they all read the same snapshot of the
+    data: rows inserted, updated or deleted by other transactions in the
+    meantime are neither skipped nor read twice.
+
+    The isolation level is chosen per database: ``REPEATABLE READ`` on
+    PostgreSQL and MySQL, read-only transactions on Oracle, and the default
+    (serializable) transactions on SQLite. If a transaction is already open
+    (e.g. with ``ATOMIC_REQUESTS``), its isolation level cannot be changed
+    and the queries simply run in it.
+
+    If ``enabled`` is ``False``, it does nothing.
+
+    :param using: database alias
+    :type using: str
+    :param enabled: whether to open the transaction
+    :type enabled: bool
+    :param snapshot_id: on PostgreSQL, identifier of a snapshot exported
+        by another transaction (see :func:`export_snapshot`), e.g. to share
+        it with worker threads
+    :type snapshot_id: str
+    """
+    connection = connections[using]
+    if not enabled or connection.in_atomic_block:
+        yield
+        return
+    with transaction.atomic(using=using):
+        statement = _snapshot_statements.get(connection.vendor)
+        if statement is not None:
+            with connection.cursor() as cursor:
+                cursor.execute(statement)
+                if snapshot_id and connection.vendor == 'postgresql':
+                    cursor.execute('SET TRANSACTION SNAPSHOT %s',
+                                   [snapshot_id])
+        yield
+
+
+def export_snapshot(using):
+    """Returns the identifier of the snapshot of the current transaction on
+    database ``using``, which transactions of other connections can read
+    from (see :func:`snapshot`) while this one is open.
+
+    Only PostgreSQL can share snapshots. On other databases, it returns
+    ``None``.
+
+    :param using: database alias
+    :type using: str
+    :returns: str or None
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql' or not connection.in_atomic_block:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_export_snapshot()')
+        return cursor.fetchone()[0]
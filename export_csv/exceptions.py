@@ -4,3 +4,8 @@ from django.core.exceptions import ImproperlyConfigured
 class NoModelFoundException(ImproperlyConfigured):
     """Exception raised when required model attribute is None"""
     pass
+
+
+class InvalidParameterException(ValueError):
+    """Exception raised when a query parameter of an export is invalid"""
+    pass
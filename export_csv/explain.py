@@ -0,0 +1,146 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import DatabaseError, connections
+from django.db.models.query import ModelIterable
+from django.test.utils import CaptureQueriesContext
+from django.utils.encoding import force_text
+
+from .db import estimate_count
+
+
+def _get_column_kind(column):
+    """Returns how the value of ``column`` is read."""
+    if column.has_get_hook:
+        return 'hook'
+    if column.is_plain:
+        return 'field'
+    if column.related:
+        return 'related'
+    if column.field is not None and column.field.is_relation:
+        return 'relation'
+    return 'attribute'
+
+
+def _get_ordering(queryset):
+    query = queryset.query
+    if query.order_by:
+        return list(query.order_by)
+    if query.default_ordering:
+        return list(queryset.model._meta.ordering)
+    return []
+
+
+def _get_unindexed_ordering(queryset):
+    """Returns the fields of the ordering of ``queryset`` which are not the
+    first column of an index."""
+    from .views import _is_indexed
+    unindexed = []
+    for name in _get_ordering(queryset):
+        if hasattr(name, 'resolve_expression') or name == '?':
+            continue
+        name = name.lstrip('-')
+        if name == 'pk' or '__' in name:
+            continue
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # an annotation
+            continue
+        if not _is_indexed(field):
+            unindexed.append(name)
+    return unindexed
+
+
+def _count_column_queries(queryset, funcs, rows):
+    """Reads the values of the first ``rows`` objects of ``queryset`` and
+    returns the number of queries run to fetch the objects and the number
+    of queries run by every column."""
+    column_queries = [0] * len(funcs)
+    with CaptureQueriesContext(connections[queryset.db]) as queries:
+        objects = list(queryset[:rows])
+        fetch_queries = len(queries)
+        for obj in objects:
+            for i, (get, clean) in enumerate(funcs):
+                before = len(queries)
+                clean(get(obj))
+                column_queries[i] += len(queries) - before
+    return len(objects), fetch_queries, column_queries
+
+
+def explain_export(view, sample=True, queryset=None):
+    """Returns the query plan of the export of ``view`` without exporting
+    it.
+
+    The report holds the SQL of the export query, the plan of the database
+    (:func:`QuerySet.explain`), the estimated number of rows (see
+    :func:`export_csv.db.estimate_count`), how every column is read, the
+    relations joined with :func:`QuerySet.select_related` and ``warnings``
+    about columns running queries per row (N+1) and orderings on fields
+    which are not indexed.
+
+    If ``sample`` is ``True``, the values of the first ``chunk_size``
+    objects are read to count the queries run per chunk and per column.
+
+    :param view: view set up with a request
+    :type view: :class:`export_csv.views.ExportCSV`
+    :param sample: whether to read the first chunk
+    :type sample: bool
+    :param queryset: queryset of the export. Defaults to the queryset of
+        ``view``.
+    :returns: dict
+    """
+    view_class = view.__class__
+    report = {
+        'view': '%s.%s' % (view_class.__module__, view_class.__name__),
+        'warnings': [],
+    }
+    if queryset is None:
+        queryset = view._get_queryset()
+    if queryset is None:
+        report['warnings'].append('get_queryset returned None.')
+        return report
+    schema = view.get_schema(queryset)
+    prepared, funcs = view._prepare_queryset(queryset)
+    report.update({
+        'model': '%s.%s' % (queryset.model._meta.app_label,
+                            queryset.model.__name__),
+        'database': queryset.db,
+        'sql': force_text(prepared.query),
+        'fast_path': prepared._iterable_class is not ModelIterable,
+        'select_related': schema.related,
+        'estimated_rows': estimate_count(queryset),
+    })
+    try:
+        report['explain'] = prepared.explain()
+    except (AttributeError, DatabaseError) as e:
+        report['explain'] = None
+        report['warnings'].append('EXPLAIN failed: %s' % e)
+    prefetched = set(
+        getattr(lookup, 'prefetch_to', lookup)
+        for lookup in queryset._prefetch_related_lookups)
+    columns = []
+    for column in schema.columns:
+        kind = _get_column_kind(column)
+        columns.append({'name': column.name, 'kind': kind})
+        if kind == 'relation' and column.name not in prefetched:
+            report['warnings'].append(
+                'Column "%s" reads the related objects of every row with '
+                'one query (N+1).' % column.name)
+    report['columns'] = columns
+    for name in _get_unindexed_ordering(queryset):
+        report['warnings'].append(
+            'The rows are ordered by "%s", which is not indexed: the '
+            'database sorts the whole result before the first row is '
+            'sent.' % name)
+    if sample:
+        rows, fetch_queries, column_queries = _count_column_queries(
+            prepared, funcs, view.chunk_size)
+        report['sample_rows'] = rows
+        report['queries_per_chunk'] = fetch_queries + sum(column_queries)
+        for column, queries in zip(columns, column_queries):
+            column['queries'] = queries
+            if queries and column['kind'] != 'relation':
+                report['warnings'].append(
+                    'Column "%s" ran %d queries for %d rows (N+1); use '
+                    'select_related or prefetch_related in get_queryset.' % (
+                        column['name'], queries, rows))
+    return report
@@ -0,0 +1,150 @@
+import bz2
+import gzip
+import os
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest
+from django.utils.module_loading import import_string
+
+from export_csv.views import ExportCSV
+
+COMPRESSIONS = ('gzip', 'bz2')
+
+
+class Command(BaseCommand):
+    help = ('Writes the CSV (or the output_format) of an ExportCSV view, or '
+            'of a model, to a file or to stdout without going through '
+            'HTTP.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'view', nargs='?',
+            help='Dotted path to an ExportCSV subclass, e.g. '
+                 'app.views.TransactionCSV.')
+        parser.add_argument(
+            '--model', help='Model to export as app_label.ModelName, instead '
+                            'of a view.')
+        parser.add_argument(
+            '--fields', help='Comma separated field names exported with '
+                             '--model.')
+        parser.add_argument(
+            '--header', action='store_true',
+            help='Add the header row (add_col_names).')
+        parser.add_argument(
+            '-o', '--output', default='-',
+            help='Path of the file to write, or of a directory to write the '
+                 'file named by the view to. Defaults to stdout.')
+        parser.add_argument(
+            '--chunk-size', type=int,
+            help='Number of rows written at once.')
+        parser.add_argument(
+            '--compress', choices=COMPRESSIONS,
+            help='Compress the output.')
+        parser.add_argument(
+            '--database', help='Database alias to export from.')
+        parser.add_argument(
+            '--encoding', help='Encoding of the CSV, e.g. utf-8-sig.')
+        parser.add_argument(
+            '--format', help='Output format, e.g. tsv, ndjson, xlsx or '
+                             'parquet. Defaults to the output_format of the '
+                             'view.')
+        parser.add_argument(
+            '--kwarg', action='append', default=[], metavar='NAME=VALUE',
+            help='URL keyword argument passed to the view. Can be repeated.')
+
+    def get_view_class(self, options):
+        if options['view'] and options['model']:
+            raise CommandError('Provide either a view or --model, not both.')
+        if options['view']:
+            try:
+                view_class = import_string(options['view'])
+            except ImportError as e:
+                raise CommandError(e)
+            if not (isinstance(view_class, type) and
+                    issubclass(view_class, ExportCSV)):
+                raise CommandError('%s is not an ExportCSV subclass.' %
+                                   options['view'])
+            return view_class
+        if not options['model']:
+            raise CommandError('Provide a view or --model.')
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+        attrs = {'model': model}
+        if options['fields']:
+            attrs['field_names'] = [name.strip() for name in
+                                    options['fields'].split(',')]
+        return type(str('%sCSV' % model.__name__), (ExportCSV,), attrs)
+
+    def get_view(self, view_class, options):
+        """Returns the view set up as :func:`as_view` would do, with an empty
+        GET request."""
+        initkwargs = {}
+        if options['header']:
+            initkwargs['add_col_names'] = True
+        if options['chunk_size']:
+            initkwargs['chunk_size'] = options['chunk_size']
+        if options['database']:
+            initkwargs['using'] = options['database']
+        if options['encoding']:
+            initkwargs['encoding'] = options['encoding']
+        if options['format']:
+            initkwargs['output_format'] = options['format']
+        view = view_class(**initkwargs)
+        view.request = HttpRequest()
+        view.request.method = 'GET'
+        view.args = ()
+        view.kwargs = dict(kwarg.split('=', 1) for kwarg in options['kwarg'])
+        return view
+
+    def write(self, chunks, output, compress):
+        size = 0
+        if compress == 'gzip':
+            stream = gzip.GzipFile(filename='', mode='wb', fileobj=output)
+            try:
+                for chunk in chunks:
+                    stream.write(chunk)
+                    size += len(chunk)
+            finally:
+                stream.close()
+        elif compress == 'bz2':
+            compressor = bz2.BZ2Compressor()
+            for chunk in chunks:
+                output.write(compressor.compress(chunk))
+                size += len(chunk)
+            output.write(compressor.flush())
+        else:
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        return size
+
+    def handle(self, *args, **options):
+        if any('=' not in kwarg for kwarg in options['kwarg']):
+            raise CommandError('--kwarg must be NAME=VALUE.')
+        view = self.get_view(self.get_view_class(options), options)
+        try:
+            chunks, content_type, filename = view._get_output()
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+        if options['output'] == '-':
+            stdout = self.stdout._out
+            self.write(chunks, getattr(stdout, 'buffer', stdout),
+                       options['compress'])
+            stdout.flush()
+            return
+        path = options['output']
+        if os.path.isdir(path):
+            path = os.path.join(path, filename)
+            if options['compress'] == 'gzip':
+                path += '.gz'
+            elif options['compress'] == 'bz2':
+                path += '.bz2'
+        with open(path, 'wb') as output:
+            size = self.write(chunks, output, options['compress'])
+        if options['verbosity'] >= 1:
+            self.stderr.write('Wrote %d bytes of %s to %s.' % (
+                size, content_type.split(';')[0], path))
@@ -0,0 +1,119 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest
+from django.utils.module_loading import import_string
+
+from export_csv.checks import iter_export_views
+from export_csv.explain import explain_export
+from export_csv.views import ExportCSV
+
+
+class Command(BaseCommand):
+    help = ('Reports the SQL, the query plan, the estimated rows and the '
+            'queries per chunk of ExportCSV views, and warns about N+1 '
+            'columns and orderings on fields which are not indexed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views', nargs='*',
+            help='Dotted paths to ExportCSV subclasses. Defaults to the '
+                 'export views of the URLconf.')
+        parser.add_argument(
+            '--database', help='Database alias to explain the queries on.')
+        parser.add_argument(
+            '--no-sample', action='store_false', dest='sample',
+            help='Do not read the first chunk of rows to count the queries '
+                 'per chunk.')
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Write the reports as JSON.')
+        parser.add_argument(
+            '--fail-on-warnings', action='store_true',
+            help='Exit with an error if any view has warnings, e.g. in CI.')
+
+    def get_views(self, options):
+        """Returns ``(view_class, initkwargs)`` for every view to explain."""
+        if not options['views']:
+            return list(iter_export_views())
+        views = []
+        for path in options['views']:
+            try:
+                view_class = import_string(path)
+            except ImportError as e:
+                raise CommandError(e)
+            if not (isinstance(view_class, type) and
+                    issubclass(view_class, ExportCSV)):
+                raise CommandError('%s is not an ExportCSV subclass.' % path)
+            views.append((view_class, {}))
+        return views
+
+    def get_view(self, view_class, initkwargs, options):
+        """Returns the view set up as :func:`as_view` would do, with an empty
+        GET request."""
+        initkwargs = dict(initkwargs)
+        if options['database']:
+            initkwargs['using'] = options['database']
+        view = view_class(**initkwargs)
+        view.request = HttpRequest()
+        view.request.method = 'GET'
+        view.args = ()
+        view.kwargs = {}
+        return view
+
+    def write_report(self, report):
+        self.stdout.write(report['view'])
+        if 'model' in report:
+            self.stdout.write('  Model: %s (database %s)' % (
+                report['model'], report['database']))
+            self.stdout.write('  Estimated rows: %d' % (
+                report['estimated_rows']))
+            self.stdout.write('  SQL: %s' % report['sql'])
+            if report['explain'] is not None:
+                self.stdout.write('  Plan:')
+                for line in report['explain'].splitlines():
+                    self.stdout.write('    %s' % line)
+            self.stdout.write('  values_list fast path: %s' % (
+                'yes' if report['fast_path'] else 'no'))
+            if report['select_related']:
+                self.stdout.write('  select_related: %s' % ', '.join(
+                    report['select_related']))
+            self.stdout.write('  Columns:')
+            for column in report['columns']:
+                queries = column.get('queries')
+                self.stdout.write('    %-30s %-10s%s' % (
+                    column['name'], column['kind'],
+                    '' if queries is None else ' %d queries' % queries))
+            if 'queries_per_chunk' in report:
+                self.stdout.write('  Queries per chunk: %d (%d rows read)' % (
+                    report['queries_per_chunk'], report['sample_rows']))
+        for warning in report['warnings']:
+            self.stdout.write(self.style.WARNING('  Warning: %s' % warning))
+        self.stdout.write('')
+
+    def handle(self, *args, **options):
+        reports = []
+        for view_class, initkwargs in self.get_views(options):
+            view = self.get_view(view_class, initkwargs, options)
+            try:
+                queryset = view._get_queryset()
+            except (AttributeError, KeyError) as e:
+                # get_queryset reads attributes of the request (e.g.
+                # request.user) or URL kwargs the command does not provide
+                reports.append({
+                    'view': '%s.%s' % (view_class.__module__,
+                                       view_class.__name__),
+                    'warnings': ['The export query cannot be built without '
+                                 'a request: %r' % e],
+                })
+                continue
+            reports.append(explain_export(view, options['sample'], queryset))
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+        else:
+            for report in reports:
+                self.write_report(report)
+        warned = [report for report in reports if report['warnings']]
+        if options['fail_on_warnings'] and warned:
+            raise CommandError('%d of %d export views have warnings.' % (
+                len(warned), len(reports)))
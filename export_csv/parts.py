@@ -0,0 +1,98 @@
+import hashlib
+
+
+class Part(object):
+    """A part of a split CSV.
+
+    ``rows``, ``size`` and ``sha256`` are updated while the part is being
+    written.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def _write(self, data, is_row=True):
+        self._hash.update(data)
+        self.size += len(data)
+        if is_row:
+            self.rows += 1
+
+    @property
+    def sha256(self):
+        """Hex digest of the SHA-256 checksum of the part."""
+        return self._hash.hexdigest()
+
+    def as_dict(self):
+        """Returns the manifest entry of the part.
+
+        :returns: dict
+        """
+        return {
+            'name': self.name,
+            'rows': self.rows,
+            'size': self.size,
+            'sha256': self.sha256,
+        }
+
+
+def split_parts(lines, get_name, header=None, max_rows=None, max_size=None):
+    """Splits ``lines`` into parts of at most ``max_rows`` lines and
+    ``max_size`` bytes.
+
+    Yields ``(part, chunks)`` for every part. The chunks of a part must be
+    consumed before the next part is requested. At least one part is
+    yielded, even if ``lines`` is empty.
+
+    :param lines: iterable of bytes, one encoded row each
+    :param get_name: callable returning the name of a part from its number
+        (starting at 1)
+    :param header: bytes written at the start of every part
+    :param max_rows: maximum number of lines (header excluded) per part
+    :param max_size: maximum number of bytes per part. A part always holds
+        at least one line.
+    :returns: generator of (:class:`Part`, generator of bytes) tuples
+    """
+    lines = iter(lines)
+    state = {'next': next(lines, None)}
+
+    def is_full(part, line):
+        if not part.rows:
+            return False
+        if max_rows and part.rows >= max_rows:
+            return True
+        return bool(max_size) and part.size + len(line) > max_size
+
+    def iter_chunks(part):
+        if header is not None:
+            part._write(header, is_row=False)
+            yield header
+        while state['next'] is not None:
+            line = state['next']
+            if is_full(part, line):
+                return
+            part._write(line)
+            yield line
+            state['next'] = next(lines, None)
+
+    index = 1
+    while True:
+        part = Part(get_name(index))
+        yield part, iter_chunks(part)
+        if state['next'] is None:
+            return
+        index += 1
+
+
+def get_manifest(parts):
+    """Returns the manifest listing ``parts``.
+
+    :param parts: list of :class:`Part`
+    :returns: dict
+    """
+    return {
+        'rows': sum(part.rows for part in parts),
+        'parts': [part.as_dict() for part in parts],
+    }
@@ -0,0 +1,208 @@
+import cProfile
+import io
+import logging
+import pstats
+from timeit import default_timer
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils.encoding import force_text
+
+from .db import statement_timeout
+from .segments import can_segment
+from .utils import _close
+
+logger = logging.getLogger('export_csv.profiling')
+
+
+class _Timed(object):
+    """Wraps ``func`` and adds the time spent in it to ``timings[key]``."""
+
+    def __init__(self, func, timings, key):
+        self.func = func
+        self.timings = timings
+        self.key = key
+
+    def __call__(self, value):
+        start = default_timer()
+        try:
+            return self.func(value)
+        finally:
+            self.timings[self.key] += default_timer() - start
+
+
+def _get_stage(view, field, step):
+    """Returns the name of the stage of ``step`` ('get' or 'clean')."""
+    if step == 'get':
+        if getattr(view, 'get_field_%s' % field, None) is not None:
+            return 'get_field_hooks'
+        return 'attribute_access'
+    if getattr(view, 'clean_%s' % field, None) is not None:
+        return 'clean_hooks'
+    return 'force_text'
+
+
+def profile_export(view, use_cprofile=False, cprofile_limit=30,
+                   max_rows=None):
+    """Runs the export of ``view``, discarding the CSV, and returns where the
+    time was spent.
+
+    The report holds the time spent per stage (fetching objects, executing
+    SQL, ``get_field_`` hooks, attribute access, ``clean_`` hooks,
+    ``force_text`` and the CSV writer), per column, and the executed SQL
+    queries. If ``use_cprofile`` is ``True``, the export also runs under
+    :mod:`cProfile` and the top ``cprofile_limit`` functions by cumulative
+    time are included.
+
+    The objects are read the way the export reads them (``mode`` of the
+    report): in chunks, from the worker thread of ``pipelined`` exports
+    (whose queries are not captured) or segment by segment with
+    ``segment_size``, where ``fetch`` includes reading and writing the
+    segment cache and the CSV writer. The queries run with the statement
+    timeout of the view.
+
+    :param view: :class:`export_csv.views.ExportCSV` instance
+    :param use_cprofile: whether to include :mod:`cProfile` statistics
+    :type use_cprofile: bool
+    :param max_rows: number of rows after which profiling stops (whole
+        segments in segment mode), or ``None`` to profile the whole export
+    :type max_rows: int
+    :returns: dict
+    """
+    queryset = view._get_queryset()
+    fields = view.get_field_names()
+    using = queryset.db if queryset is not None else DEFAULT_DB_ALIAS
+    writer = view._get_writer()
+    mode = 'chunks'
+    if queryset is not None:
+        if view.segment_size and can_segment(queryset):
+            mode = 'segments'
+            segment_queryset = queryset
+        elif view.pipelined:
+            mode = 'pipelined'
+        queryset, value_funcs = view._prepare_queryset(queryset,
+                                                       writer.typed)
+    else:
+        value_funcs = view._get_value_funcs(fields)
+    stages = dict.fromkeys(
+        ['fetch', 'get_field_hooks', 'attribute_access', 'clean_hooks',
+         'force_text', 'csv_writer'], 0.0)
+    column_timings = {}
+    funcs = []
+    for field, (get, clean) in zip(fields, value_funcs):
+        column_timings[(field, 'get')] = 0.0
+        column_timings[(field, 'clean')] = 0.0
+        funcs.append((_Timed(get, column_timings, (field, 'get')),
+                      _Timed(clean, column_timings, (field, 'clean'))))
+    chunk_size = view.chunk_size
+    chunk = []
+    profiler = cProfile.Profile() if use_cprofile else None
+    counts = {'rows': 0}
+    get_row = view._get_row
+
+    def get_timed_row(obj, untimed_funcs=None):
+        counts['rows'] += 1
+        return get_row(obj, funcs)
+
+    def write_chunk():
+        tick = default_timer()
+        writer.write_rows(chunk)
+        stages['csv_writer'] += default_timer() - tick
+        del chunk[:]
+
+    start = default_timer()
+    with statement_timeout(using, view.get_statement_timeout()), \
+            CaptureQueriesContext(connections[using]) as queries:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            if view.add_col_names and writer.has_header:
+                chunk.append(view.get_col_names())
+                write_chunk()
+            if mode == 'segments':
+                # the rows of the rendered segments are timed per column
+                view._get_row = get_timed_row
+                iterator = view.iter_segments(segment_queryset, writer)
+            elif mode == 'pipelined':
+                iterator = view._iter_pipelined(queryset)
+            elif queryset is not None:
+                iterator = view._iter_objects(queryset)
+            else:
+                iterator = iter(())
+            try:
+                while max_rows is None or counts['rows'] < max_rows:
+                    tick = default_timer()
+                    item = next(iterator, None)
+                    stages['fetch'] += default_timer() - tick
+                    if item is None:
+                        break
+                    if mode == 'segments':
+                        counts['segments'] = counts.get('segments', 0) + 1
+                        if (max_rows is not None and counts['segments'] *
+                                view.segment_size >= max_rows):
+                            break
+                        continue
+                    chunk.append(get_timed_row(item))
+                    if len(chunk) >= chunk_size:
+                        write_chunk()
+                if chunk:
+                    write_chunk()
+            finally:
+                _close(iterator)
+                view.__dict__.pop('_get_row', None)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    total_time = default_timer() - start
+
+    columns = []
+    for field in fields:
+        column = {'name': field}
+        for step in ('get', 'clean'):
+            timing = column_timings[(field, step)]
+            stages[_get_stage(view, field, step)] += timing
+            column[step] = timing
+            column['%s_stage' % step] = _get_stage(view, field, step)
+        columns.append(column)
+    if mode == 'segments':
+        # the rows were built while the segments were fetched
+        stages['fetch'] -= sum(column_timings.values())
+    executed = [{'sql': query['sql'], 'time': float(query['time'])}
+                for query in queries.captured_queries]
+    stages['sql'] = sum(query['time'] for query in executed)
+
+    report = {
+        'view': '{}.{}'.format(view.__class__.__module__,
+                               view.__class__.__name__),
+        'mode': mode,
+        'rows': counts['rows'],
+        'max_rows': max_rows,
+        'total_time': total_time,
+        'stages': stages,
+        'columns': columns,
+        'queries': executed,
+    }
+    if mode == 'segments':
+        report['segments'] = counts.get('segments', 0)
+    if profiler is not None:
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(cprofile_limit)
+        report['cprofile'] = force_text(stream.getvalue())
+    return report
+
+
+def log_report(report):
+    """Logs ``report`` returned by :func:`profile_export` to the
+    ``export_csv.profiling`` logger.
+
+    :param report: report
+    :type report: dict
+    """
+    slowest = sorted(report['stages'].items(), key=lambda item: -item[1])
+    logger.info(
+        'Profiled export %s: %d rows in %.3fs, %d queries; %s',
+        report['view'], report['rows'], report['total_time'],
+        len(report['queries']),
+        ', '.join('{}={:.3f}s'.format(*stage) for stage in slowest),
+        extra={'export_profile': report})
@@ -0,0 +1,169 @@
+import collections
+import functools
+import inspect
+import operator
+import threading
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.translation import ugettext_lazy as _
+
+MAX_SCHEMAS = 256
+"""
+Maximum number of compiled schemas kept by :func:`get_schema`.
+"""
+
+_schemas = collections.OrderedDict()
+_schemas_lock = threading.Lock()
+
+
+class Column(object):
+    """A column of an export, resolved from a field name.
+
+    ``name`` is either the name of a field of the model, a path of fields
+    across relations (e.g. ``owner__name``), or any other attribute of the
+    objects (e.g. a property), or a column whose value comes from a
+    ``get_field_<name>`` method of the view.
+    """
+
+    def __init__(self, name, header, field=None, get=None,
+                 has_get_hook=False):
+        self.name = name
+        self.header = header
+        self.field = field
+        self.get = get
+        self.has_get_hook = has_get_hook
+
+    @property
+    def related(self):
+        """The forward relation (e.g. ``owner``) the value of the column is
+        read through, or ``None``."""
+        if self.has_get_hook or self.field is None:
+            return None
+        if '__' in self.name:
+            return self.name.rsplit('__', 1)[0]
+        if ((self.field.many_to_one or self.field.one_to_one) and
+                self.field.concrete):
+            return self.name
+        return None
+
+    @property
+    def is_plain(self):
+        """Whether the value of the column is the value of a concrete,
+        non-relational field of the model, so that it can be read with
+        :func:`QuerySet.values_list`."""
+        return (not self.has_get_hook and self.field is not None and
+                self.field.concrete and not self.field.is_relation and
+                '__' not in self.name)
+
+    @property
+    def has_plain_attribute(self):
+        """Whether the attribute of the objects is the value of the database
+        column, i.e. the field has no descriptor turning it into another
+        object (such as the :class:`FieldFile` of a :class:`FileField`)."""
+        if not self.is_plain:
+            return False
+        descriptor = inspect.getattr_static(self.field.model,
+                                            self.field.attname, None)
+        return type(descriptor) is DeferredAttribute
+
+
+class Schema(object):
+    """The columns of an export of ``model``."""
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = columns
+        self.names = [column.name for column in columns]
+        self.headers = [column.header for column in columns]
+        self.is_plain = all(column.is_plain for column in columns)
+        """Whether all the columns can be read with
+        :func:`QuerySet.values_list`."""
+        self.related = sorted(set(
+            column.related for column in columns if column.related))
+        """Relations to :func:`QuerySet.select_related`, so that reading
+        the columns does not query the related objects one by one."""
+
+
+def _get_path(obj, attrs):
+    for attr in attrs:
+        if obj is None:
+            return None
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _resolve_path(model, name):
+    """Returns the field at the end of the path ``name`` from ``model``.
+
+    :raises: FieldDoesNotExist
+    """
+    parts = name.split('__')
+    field = None
+    for i, part in enumerate(parts):
+        field = model._meta.get_field(part)
+        if i < len(parts) - 1:
+            # only forward relations have accessors named after the field
+            if not (field.many_to_one or field.one_to_one) or \
+                    not field.concrete:
+                raise FieldDoesNotExist(part)
+            model = field.related_model
+    return field
+
+
+def compile_column(view_class, model, name, extra_names=()):
+    """Resolves the column ``name`` of an export of ``model`` by
+    ``view_class``.
+
+    :param extra_names: names of the annotations of the queryset, which are
+        attributes of the objects but not of the model
+    :raises: ImproperlyConfigured
+    :returns: :class:`Column`
+    """
+    has_get_hook = hasattr(view_class, 'get_field_%s' % name)
+    try:
+        field = _resolve_path(model, name)
+    except FieldDoesNotExist:
+        field = None
+    if field is not None:
+        header = getattr(field, 'verbose_name', name)
+        if '__' in name:
+            get = functools.partial(_get_path, attrs=name.split('__'))
+        else:
+            get = operator.attrgetter(name)
+    elif has_get_hook or name in extra_names or hasattr(model, name):
+        header, get = name, operator.attrgetter(name)
+    else:
+        raise ImproperlyConfigured(
+            _('{} has no field or attribute "{}" (in field_names of '
+              '{}).').format(model.__name__, name, view_class.__name__))
+    return Column(name, header, field=field, get=get,
+                  has_get_hook=has_get_hook)
+
+
+def get_schema(view_class, model, field_names, extra_names=()):
+    """Returns the schema of the export of ``field_names`` of ``model`` by
+    ``view_class``.
+
+    Schemas are compiled once per view class, model, field names and
+    ``extra_names`` (see :func:`compile_column`) and cached. Since field
+    names can be selected by clients, the cache keeps the
+    :data:`MAX_SCHEMAS` most recently used schemas only. The cache is
+    thread-safe.
+
+    :raises: ImproperlyConfigured
+    :returns: :class:`Schema`
+    """
+    key = (view_class, model, tuple(field_names), tuple(extra_names))
+    with _schemas_lock:
+        schema = _schemas.get(key)
+        if schema is not None:
+            _schemas.move_to_end(key)
+            return schema
+        schema = Schema(model, [
+            compile_column(view_class, model, name, extra_names)
+            for name in field_names])
+        _schemas[key] = schema
+        if len(_schemas) > MAX_SCHEMAS:
+            _schemas.popitem(last=False)
+    return schema
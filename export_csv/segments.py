@@ -0,0 +1,74 @@
+import hashlib
+
+from django.db.models import Count, F, Max
+from django.db.models.functions import Floor
+
+from .db import _INTEGER_FIELDS
+
+
+def can_segment(queryset):
+    """Returns whether ``queryset`` can be split into primary key segments,
+    i.e. it has an integer primary key and is not sliced.
+
+    :param queryset: queryset
+    :type queryset: :class:`QuerySet`
+    :returns: bool
+    """
+    pk = queryset.model._meta.pk
+    return (pk.get_internal_type() in _INTEGER_FIELDS and
+            queryset.query.can_filter())
+
+
+def get_segments(queryset, size, version_field=None):
+    """Returns the non-empty segments of ``size`` consecutive primary key
+    values of ``queryset`` with their validators, in primary key order.
+
+    Segment ``n`` holds the objects with ``n * size <= pk < (n + 1) * size``.
+    Its validator is the number of objects and, if ``version_field`` is
+    set, the greatest value of that field (e.g. a ``DateTimeField`` with
+    ``auto_now``) in the segment: it changes when an object of the segment
+    is created, deleted or, with ``version_field``, updated. All the
+    validators are computed by a single aggregate query.
+
+    :param queryset: queryset
+    :type queryset: :class:`QuerySet`
+    :param size: number of primary key values per segment
+    :type size: int
+    :param version_field: name of the field whose greatest value is part of
+        the validators
+    :type version_field: str
+    :returns: list of ``(index, validator)`` tuples
+    """
+    aggregates = {'rows': Count('pk')}
+    if version_field is not None:
+        aggregates['version'] = Max(version_field)
+    rows = (queryset.order_by()
+            .annotate(_segment=Floor(F('pk') / size))
+            .values('_segment')
+            .annotate(**aggregates)
+            .order_by('_segment'))
+    return [(int(row['_segment']), (row['rows'], row.get('version')))
+            for row in rows]
+
+
+def get_segment_queryset(queryset, index, size):
+    """Returns the objects of segment ``index`` of ``queryset`` in primary
+    key order.
+
+    :returns: :class:`QuerySet`
+    """
+    return queryset.filter(pk__gte=index * size,
+                           pk__lt=(index + 1) * size).order_by('pk')
+
+
+def get_fingerprint(*parts):
+    """Returns a hash of ``parts``, e.g. the SQL of the queryset and the
+    settings of the writer, identifying the rendering of an export.
+
+    :returns: str
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
@@ -0,0 +1,99 @@
+from .utils import _close
+
+
+class StreamedFile(object):
+    """Read-only, unseekable file whose content is generated by an iterable
+    of bytes chunks, to save exports to a Django storage without a temporary
+    file or a buffer of the whole content.
+
+    Storages writing ``chunks()`` (e.g. ``FileSystemStorage``) receive the
+    chunks as they are generated. Storages reading ``read(size)`` (e.g.
+    S3 storages uploading with ``upload_fileobj``, part by part) get at most
+    ``size`` bytes at a time, so only one upload part is held in memory.
+
+    Every chunk can only be read once: a storage seeking back to the start
+    of the file (e.g. to retry an upload) cannot be used.
+
+    :param chunks: iterable of bytes
+    :param name: name of the file
+    :type name: str
+    """
+
+    def __init__(self, chunks, name=None):
+        self.name = name
+        self.size = None
+        self.closed = False
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+        self._position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def tell(self):
+        return self._position
+
+    def multiple_chunks(self, chunk_size=None):
+        return True
+
+    def chunks(self, chunk_size=None):
+        """Yields the remaining content in the chunks it is generated in,
+        regardless of ``chunk_size``.
+
+        :returns: generator of bytes
+        """
+        if self._buffer:
+            data = bytes(self._buffer)
+            del self._buffer[:]
+            self._position += len(data)
+            yield data
+        for chunk in self._chunks:
+            if chunk:
+                self._position += len(chunk)
+                yield chunk
+
+    def read(self, size=-1):
+        """Reads at most ``size`` bytes, or the remaining content if
+        ``size`` is negative or ``None``.
+
+        :returns: bytes -- empty at the end of the file
+        """
+        if size is None or size < 0:
+            return b''.join(self.chunks())
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._position += len(data)
+        return data
+
+    def close(self):
+        """Stops generating the content, e.g. closes the export query."""
+        if not self.closed:
+            self.closed = True
+            _close(self._chunks)
+
+
+def save_chunks(storage, name, chunks):
+    """Saves the content generated by ``chunks`` to ``storage`` as ``name``.
+
+    :param storage: Django storage
+    :param name: name of the file
+    :type name: str
+    :param chunks: iterable of bytes
+    :returns: str -- the name the file was saved as
+    """
+    with StreamedFile(chunks, name) as content:
+        return storage.save(name, content)
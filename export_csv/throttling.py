@@ -0,0 +1,174 @@
+import threading
+import time
+
+from django.core.cache import caches
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+
+
+def _get_semaphore(key, limit):
+    with _semaphores_lock:
+        semaphore = _semaphores.get((key, limit))
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(limit)
+            _semaphores[(key, limit)] = semaphore
+        return semaphore
+
+
+class ConcurrencyLimit(object):
+    """Limits the number of concurrent exports sharing ``key`` to ``limit``.
+
+    A slot is taken from a process-local semaphore and, if ``cache_alias``
+    is provided, from a counter in that cache, which is shared by all the
+    processes using the cache (e.g. memcached or Redis). The counter expires
+    ``lease`` seconds after it was last changed or refreshed (see
+    :func:`refresh`), so that slots of killed processes are eventually
+    freed.
+
+    :param key: name of the limit
+    :type key: str
+    :param limit: maximum number of concurrent exports
+    :type limit: int
+    :param cache_alias: alias of the cache holding the counter, or ``None``
+    :type cache_alias: str
+    :param lease: lifetime of the counter in seconds since it was last
+        changed or refreshed
+    :type lease: int
+    """
+
+    def __init__(self, key, limit, cache_alias=None, lease=3600):
+        self.key = key
+        self.limit = limit
+        self.lease = lease
+        self.cache = caches[cache_alias] if cache_alias else None
+        self.cache_key = 'export_csv:concurrency:{}'.format(key)
+        self._semaphore = _get_semaphore(key, limit)
+
+    def _incr(self):
+        self.cache.add(self.cache_key, 0, self.lease)
+        try:
+            value = self.cache.incr(self.cache_key)
+        except ValueError:
+            # the counter expired in between
+            self.cache.add(self.cache_key, 1, self.lease)
+            return 1
+        self.refresh()
+        return value
+
+    def _decr(self):
+        try:
+            value = self.cache.decr(self.cache_key)
+        except ValueError:
+            # the counter expired, the slot is free already
+            return
+        if value < 0:
+            # the counter expired and was created again by other exports
+            self.cache.incr(self.cache_key, -value)
+        self.refresh()
+
+    def try_acquire(self):
+        """Takes a slot if one is free.
+
+        :returns: bool -- whether a slot was taken
+        """
+        if not self._semaphore.acquire(False):
+            return False
+        if self.cache is not None and self._incr() > self.limit:
+            self._decr()
+            self._semaphore.release()
+            return False
+        return True
+
+    def refresh(self):
+        """Extends the lifetime of the shared counter to ``lease`` seconds
+        from now, so that it does not expire while slots are held."""
+        if self.cache is not None:
+            self.cache.touch(self.cache_key, self.lease)
+
+    def release(self):
+        """Frees the slot taken by :func:`try_acquire`."""
+        if self.cache is not None:
+            self._decr()
+        self._semaphore.release()
+
+
+def acquire_all(limits, timeout=None, interval=0.1):
+    """Takes a slot of every limit in ``limits``, or of none of them.
+
+    If a limit is reached, the slots are retried every ``interval`` seconds
+    until ``timeout`` seconds have passed.
+
+    :param limits: list of :class:`ConcurrencyLimit`
+    :param timeout: seconds to wait for free slots
+    :type timeout: float
+    :returns: bool -- whether the slots were taken
+    """
+    deadline = time.time() + (timeout or 0)
+    while True:
+        acquired = []
+        for limit in limits:
+            if not limit.try_acquire():
+                break
+            acquired.append(limit)
+        else:
+            return True
+        release_all(acquired)
+        if time.time() + interval > deadline:
+            return False
+        time.sleep(interval)
+
+
+def release_all(limits):
+    """Frees the slots taken by :func:`acquire_all`.
+
+    :param limits: list of :class:`ConcurrencyLimit`
+    """
+    for limit in reversed(limits):
+        limit.release()
+
+
+def refresh_all(limits):
+    """Extends the lifetime of the shared counters of ``limits``.
+
+    :param limits: list of :class:`ConcurrencyLimit`
+    """
+    for limit in limits:
+        limit.refresh()
+
+
+class _ReleasingIterator(object):
+    """Iterates ``iterable`` and calls ``release`` once, when closed.
+
+    :class:`StreamingHttpResponse` closes it when the response is done, even
+    if the content was never iterated (e.g. for ``HEAD`` requests). If
+    provided, ``refresh`` is called at most every ``refresh_interval``
+    seconds while the content is iterated.
+    """
+
+    def __init__(self, iterable, release, refresh=None, refresh_interval=60):
+        self._iterator = iter(iterable)
+        self._release = release
+        self._refresh = refresh
+        self._refresh_interval = refresh_interval
+        self._refreshed = time.time()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if (self._refresh is not None and
+                time.time() - self._refreshed >= self._refresh_interval):
+            self._refreshed = time.time()
+            self._refresh()
+        return next(self._iterator)
+
+    def close(self):
+        release, self._release = self._release, None
+        try:
+            close = getattr(self._iterator, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            if release is not None:
+                release()
@@ -0,0 +1,74 @@
+import queue
+import threading
+
+from django.db import connections
+
+
+def _close(iterator):
+    """Closes ``iterator``, if it can be closed (e.g. a generator)."""
+    close = getattr(iterator, 'close', None)
+    if close is not None:
+        close()
+
+
+class _Failure(object):
+    """Wraps an exception raised in a worker thread."""
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+_DONE = object()
+
+
+class _ThreadedRenderer(object):
+    """Iterates ``chunks`` in a worker thread and hands the chunks over to
+    the consuming thread through a bounded queue.
+
+    Iterating the renderer yields the chunks in order and re-raises any
+    exception raised while producing them. :func:`cancel` makes a blocked
+    worker stop producing.
+    """
+
+    def __init__(self, chunks, maxsize):
+        self._chunks = chunks
+        self._queue = queue.Queue(maxsize)
+        self._cancelled = threading.Event()
+
+    def _put(self, item):
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        """Produces the chunks. Meant to be the target of a worker thread."""
+        try:
+            if self._cancelled.is_set():
+                return
+            for chunk in self._chunks:
+                if not self._put(chunk):
+                    return
+            self._put(_DONE)
+        except Exception as exc:
+            self._put(_Failure(exc))
+        finally:
+            _close(self._chunks)
+            # database connections are per thread
+            connections.close_all()
+
+    def cancel(self):
+        """Stops the worker at the next chunk."""
+        self._cancelled.set()
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
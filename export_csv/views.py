@@ -1,47 +1,82 @@
-from __future__ import unicode_literals
-
+import codecs
 import csv
+import functools
+import itertools
+import json
+import logging
+import operator
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
-from django.http import HttpResponse
-from django.utils.encoding import force_str, force_text
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.exceptions import (
+    FieldDoesNotExist, ImproperlyConfigured, ValidationError)
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, router, transaction
+from django.db.models.query import ModelIterable
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse)
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import force_bytes, force_str, force_text
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import View
 
-from .exceptions import NoModelFoundException
+from .arrow import ARROW_FORMATS, ArrowWriter, check_format, get_arrow_type
+from .db import (
+    estimate_count, export_snapshot, preview_queryset, snapshot,
+    statement_timeout)
+from .exceptions import InvalidParameterException, NoModelFoundException
+from .parts import get_manifest, split_parts
+from .profiling import log_report, profile_export
+from .schema import compile_column, get_schema
+from .segments import (
+    can_segment, get_fingerprint, get_segment_queryset, get_segments)
+from .storage import save_chunks
+from .throttling import (
+    ConcurrencyLimit, _ReleasingIterator, acquire_all, refresh_all,
+    release_all)
+from .utils import _close, _ThreadedRenderer
+from .writers import WRITER_CLASSES, CSVWriter
+from .xlsx import XLSX_CONTENT_TYPE, XLSXWriter, iter_xlsx
+from .zipstream import iter_zip
 
+logger = logging.getLogger('export_csv')
 
-class ExportCSV(View):
-    """Generic View class which handles exporting queryset to CSV file and
-    rendering the response.
+
+class CSVColumnsMixin(object):
+    """Mixin mapping the fields of ``model`` to the columns of a CSV file.
+
+    It is shared by :class:`ExportCSV` and :class:`ImportCSV`, so that a CSV
+    exported by one view can be imported by the other.
     """
 
-    http_method_names = ['options', 'head', 'get']
     model = None
     """
     Name of a model. If provided, all objects of the
     model will for the queryset. If omitted, :func:`get_queryset` method must
-    be overridden.
+    be overridden. :class:`ImportCSV` creates objects of this model.
     """
 
     field_names = None
     """
-    List of ``model`` field names written to CSV. If provided, only those
-    fields will be included in the CSV. If omitted, values return by
+    List of ``model`` field names, one per CSV column. If provided, only
+    those fields will be included in the CSV. If omitted, values return by
     :func:`get_field_names` is used.
 
     .. note:: Fields will be written in the CSV in the order of their
         occurrence in list.
     """
-    filename = None
-    """
-    Name used for CSV file generated. If omitted, filename returned by
-    :func:`get_filename` will be used as default file name.
-    """
 
     add_col_names = False
     """
-    Set this to ``True`` to add column names (header) to the CSV file. Default
-    value is ``False``.
+    Set this to ``True`` to add column names (header) to the CSV file, or to
+    read them from the first row of an imported CSV file. Default value is
+    ``False``.
     """
 
     col_names = None
@@ -51,35 +86,25 @@ class ExportCSV(View):
     values returned by :func:``get_col_names`` are used.
     """
 
-    _content_type = 'text/csv'
-    """
-     The content_type header of the response returned by :func:`get`` method.
-     Default value is 'text/csv' and should not be overridden.
-    """
-
-    _csv_writer_dialect = 'excel'
+    encoding = None
     """
-    View class uses :func:`csv.writer` to generate CSV. This is the
-    ``dialect`` argument for :func:`csv.writer` method.
+    Encoding of the CSV, e.g. ``utf-8``, ``utf-8-sig`` (UTF-8 with a byte
+    order mark, which Excel needs to detect UTF-8) or ``cp1252``. If omitted,
+    the ``EXPORT_CSV_ENCODING`` setting is used, which defaults to
+    ``utf-8``.
     """
 
-    def get_queryset(self):
-        """Returns the queryset for generating CSV.
-
-        By default, it returns all instances of the Model class referred by
-        ``model`` attribute. Override this method to provide custom queryset.
+    def get_encoding(self):
+        """Returns the encoding of the CSV.
 
-        :raises: NoModelFoundException
+        It returns ``encoding`` attribute, if provided. Otherwise it returns
+        the ``EXPORT_CSV_ENCODING`` setting, or ``utf-8``.
 
-        :returns: :class:`QuerySet`
+        :returns: str
         """
-        if self.model is not None:
-            queryset = self.model.objects.all()
-        else:
-            exception_msg = "No model to get queryset from. Either provide " \
-                            "a model or override get_queryset method."
-            raise NoModelFoundException(_(exception_msg))
-        return queryset
+        if self.encoding:
+            return self.encoding
+        return getattr(settings, 'EXPORT_CSV_ENCODING', 'utf-8')
 
     def get_field_names(self):
         """Returns the fields names to be included in the CSV.
@@ -110,9 +135,8 @@ class ExportCSV(View):
         """
         field_names = self.get_field_names()
         if self.model is not None:
-            verbose_names = [f.verbose_name for f in self.model._meta.fields
-                             if f.name in field_names]
-            return verbose_names
+            return [_get_verbose_name(self.model, name)
+                    for name in field_names]
         else:
             exception_msg = "No model to get verbose field names from."
             raise NoModelFoundException(_(exception_msg))
@@ -134,105 +158,2213 @@ class ExportCSV(View):
                 raise TypeError(_('col_names must be a list.'))
         return self._get_field_verbose_names()
 
-    def get_filename(self):
-        """Returns filename.
 
-        It returns the filename to be used for rendering CSV. If explicit
-        filename is provided, that filename is returned. If omitted,
-        <model>_list.csv is returned.
+class ExportCSV(CSVColumnsMixin, View):
+    """Generic View class which handles exporting queryset to CSV file and
+    rendering the response.
+    """
+
+    http_method_names = ['options', 'head', 'get']
+    filename = None
+    """
+    Name used for CSV file generated. If omitted, filename returned by
+    :func:`get_filename` will be used as default file name.
+    """
+
+    using = None
+    """
+    Alias of the database the queryset is evaluated against, e.g. the alias
+    of a read replica. If omitted, the ``EXPORT_CSV_DATABASE`` setting is
+    used. If both are omitted, the queryset is routed as usual.
+    """
+
+    max_replica_lag = None
+    """
+    Maximum acceptable replication lag (in seconds) of the database returned
+    by :func:`get_database_alias`. If the lag reported by
+    :func:`get_replica_lag` is greater, the export falls back to the default
+    database. If omitted, the ``EXPORT_CSV_MAX_REPLICA_LAG`` setting is used.
+    """
+
+    streaming = False
+    """
+    Set this to ``True`` to stream the CSV using
+    :class:`StreamingHttpResponse` instead of building it in memory. Default
+    value is ``False``.
+    """
+
+    part_rows = None
+    """
+    Maximum number of rows (header row excluded) per part. If provided (or
+    ``part_size``), the CSV is split into parts which are rendered as a ZIP
+    file along with a manifest listing them.
+    """
+
+    part_size = None
+    """
+    Maximum size in bytes per part. A part always holds at least one row.
+    """
+
+    progress_interval = None
+    """
+    Number of rows after which :func:`report_progress` is called. If omitted,
+    progress is not reported and the number of rows is not estimated.
+    """
+
+    progress_param = 'progress_key'
+    """
+    Name of the query parameter holding the token under which progress is
+    stored in the cache.
+    """
+
+    progress_timeout = 3600
+    """
+    Number of seconds progress is kept in the cache.
+    """
+
+    profile_param = 'profile'
+    """
+    Name of the query parameter which returns a profile of the export (see
+    :func:`is_profiling_requested`) instead of the CSV. Set it to ``None``
+    to disable profiling.
+    """
+
+    profile_rows = 10000
+    """
+    Maximum number of rows read when the export is profiled, so that
+    profiling a large export is bounded. ``None`` profiles the whole
+    export.
+    """
+
+    selectable_fields = None
+    """
+    Field names a client may select with the ``fields_param`` query
+    parameter, e.g. ``?fields=name,address``. ``None`` disables the
+    parameter. See :func:`get_selected_field_names`.
+    """
+
+    fields_param = 'fields'
+    """
+    Name of the query parameter selecting the exported fields.
+    """
+
+    filter_fields = None
+    """
+    Fields a client may filter the export on with the ``filter_param``
+    query parameter, e.g. ``?filter=is_active=true``. Either a list of field
+    names, which allows exact matches only, or a dict mapping field names to
+    the allowed lookups, e.g. ``{'last_updated': ['gte', 'lt']}``. The
+    fields must be indexed. ``None`` disables the parameter. See
+    :func:`get_filters`.
+    """
+
+    filter_param = 'filter'
+    """
+    Name of the (repeatable) query parameter filtering the export.
+    """
+
+    preview_param = 'preview'
+    """
+    Name of the query parameter which returns a preview of the export:
+    ``?preview`` returns the first ``preview_rows`` rows, ``?preview=20``
+    the first 20 rows (at most ``max_preview_rows``). Set it to ``None`` to
+    disable previews. See :func:`get_preview_rows`.
+    """
+
+    sample_param = 'sample'
+    """
+    Name of the query parameter which makes the preview a random sample of
+    the rows instead of the first ones, e.g. ``?preview=20&sample``.
+    """
+
+    preview_rows = 100
+    """
+    Number of rows of a preview by default.
+    """
+
+    max_preview_rows = 1000
+    """
+    Maximum number of rows of a preview.
+    """
+
+    encoding_errors = 'strict'
+    """
+    Error handler used when a value cannot be encoded, e.g. ``replace``.
+    """
+
+    chunk_size = 1000
+    """
+    Number of rows written and encoded at once.
+    """
+
+    pipelined = False
+    """
+    Set this to ``True`` to fetch the objects in a worker thread, with its
+    own database connection, while the objects fetched before are being
+    written, so that the latency of the database is hidden behind the
+    formatting of the rows. The queryset is evaluated outside of the
+    transaction of the request, if any.
+    """
+
+    pipeline_depth = 2
+    """
+    Maximum number of chunks of ``chunk_size`` objects fetched ahead of the
+    writer when ``pipelined`` is ``True``.
+    """
+
+    statement_timeout = None
+    """
+    Maximum number of seconds a query of the export may run, applied on
+    PostgreSQL (``statement_timeout``) and MySQL (``max_execution_time``).
+    If omitted, the ``EXPORT_CSV_STATEMENT_TIMEOUT`` setting is used.
+    """
+
+    consistent_snapshot = False
+    """
+    Set this to ``True`` to run all the queries of an export (the row count
+    of the progress, the segment queries, the worker of ``pipelined``
+    exports) in one read-only ``REPEATABLE READ`` transaction, so that rows
+    changed during the export are neither skipped nor exported twice. See
+    :func:`export_csv.db.snapshot`.
+    """
+
+    snapshot_id = None
+    """
+    Identifier of an exported PostgreSQL snapshot the export reads from when
+    ``consistent_snapshot`` is ``True``, see
+    :func:`export_csv.db.export_snapshot`. Set by :class:`ExportCSVBundle`.
+    """
+
+    max_concurrent_exports = None
+    """
+    Maximum number of concurrent exports of the view. Requests past the
+    limit wait up to ``export_queue_timeout`` seconds for a free slot and
+    then get a ``429 Too Many Requests`` response. See
+    :func:`get_concurrency_limits`.
+    """
+
+    export_queue_timeout = 0
+    """
+    Number of seconds a request waits for a free export slot.
+    """
+
+    retry_after = 10
+    """
+    Value of the ``Retry-After`` header of ``429`` responses, in seconds.
+    """
+
+    segment_size = None
+    """
+    Number of primary key values per cached segment. If set, the CSV is
+    rendered by segments of consecutive primary keys, in primary key order,
+    and the encoded rows of every segment are cached until the segment
+    changes. See :func:`iter_segments`.
+    """
+
+    segment_version_field = None
+    """
+    Name of a field updated on every change of an object (e.g. a
+    ``DateTimeField`` with ``auto_now``), whose greatest value in a segment
+    tells whether the segment changed. Without it, only created and deleted
+    objects are detected.
+    """
+
+    segment_cache = 'default'
+    """
+    Alias of the cache holding the rendered segments.
+    """
+
+    segment_cache_timeout = 86400
+    """
+    Number of seconds rendered segments are kept in the cache.
+    """
+
+    output_format = 'csv'
+    """
+    Format of the export: one of the row-oriented formats of
+    ``writer_classes`` (``csv``, ``tsv`` and ``ndjson`` by default),
+    ``xlsx`` (see :func:`iter_xlsx`), or the columnar ``parquet`` and
+    ``arrow`` (Arrow IPC stream) formats, which need ``pyarrow`` (see
+    :func:`iter_arrow`).
+    """
+
+    output_formats = None
+    """
+    Formats the client may choose from with the ``format_param`` query
+    parameter (e.g. ``?format=ndjson``) or the ``Accept`` header. If
+    omitted, ``output_format`` is always used.
+    """
+
+    format_param = 'format'
+    """
+    Name of the query parameter selecting one of ``output_formats``.
+    """
+
+    writer_classes = WRITER_CLASSES
+    """
+    Writer class of every row-oriented format, see
+    :mod:`export_csv.writers`. Add a writer class to support another format
+    with the same queries, chunking and ``clean_<field_name>`` methods.
+    A writer class takes the keyword arguments of
+    :func:`get_writer_kwargs` and has ``content_type``, ``extension``,
+    ``typed``, ``has_header`` and ``bom`` attributes and ``write_rows`` and
+    ``write_row`` methods.
+    """
+
+    parquet_compression = 'snappy'
+    """
+    Compression codec of Parquet exports.
+    """
+
+    _csv_writer_dialect = 'excel'
+    """
+    View class uses :func:`csv.writer` to generate CSV. This is the
+    ``dialect`` argument for :func:`csv.writer` method.
+    """
+
+    def get_queryset(self):
+        """Returns the queryset for generating CSV.
+
+        By default, it returns all instances of the Model class referred by
+        ``model`` attribute. Override this method to provide custom queryset.
 
         :raises: NoModelFoundException
 
-        :returns: str
+        :returns: :class:`QuerySet`
         """
-        if self.filename is not None:
-            return self.filename
         if self.model is not None:
-            model_name = str(self.model.__name__).lower()
-            self.filename = force_str(model_name + '_list.csv')
+            queryset = self.model.objects.all()
         else:
-            exception_msg = "No model to generate filename. Either provide " \
-                            "model or filename or override get_filename " \
-                            "method."
+            exception_msg = "No model to get queryset from. Either provide " \
+                            "a model or override get_queryset method."
             raise NoModelFoundException(_(exception_msg))
-        return self.filename
+        return queryset
 
-    def get_csv_writer_dialect(self):
-        """Returns the dialect to be used with :func:`csv.writer`.
+    def get_field_names(self):
+        """Returns the field names selected by the client (see
+        :func:`get_selected_field_names`), or else the fields names to be
+        included in the CSV.
 
-        :returns: str
+        :raises: NoModelFoundException, InvalidParameterException
+
+        :returns: list
         """
-        return self._csv_writer_dialect
+        field_names = super(ExportCSV, self).get_field_names()
+        selected = self.get_selected_field_names()
+        return field_names if selected is None else selected
 
-    def get_csv_writer_kwargs(self, **kwargs):
-        """Returns the kwargs to be passed to :func:`csv.writer`.
+    def get_col_names(self):
+        """Returns column names to be used for writing header row of the CSV.
 
-        :param kwargs: kwargs to be passed to :func:`csv.writer`
-        :type kwargs: dict
-        :returns: dict -- kwargs to be passed to :func:`csv.writer`
+        If the client selected fields, the column names of the selected
+        fields are returned in the selected order.
+
+        :raises: TypeError
+
+        :returns: list
         """
-        return kwargs
+        selected = self.get_selected_field_names()
+        if selected is None:
+            return super(ExportCSV, self).get_col_names()
+        labels = {}
+        if self.col_names:
+            field_names = super(ExportCSV, self).get_field_names()
+            labels = dict(zip(field_names,
+                              super(ExportCSV, self).get_col_names()))
+        return [labels.get(name) or _get_verbose_name(self.model, name)
+                for name in selected]
 
-    def _create_csv(self):
-        """Create CSV and render the response.
+    def get_schema(self, queryset=None):
+        """Returns the compiled columns of the export.
 
-        :raises: TypeError
+        The schema (fields, headers and getters of the columns) is compiled
+        once per view class and field names, see
+        :func:`export_csv.schema.get_schema`.
 
-        :returns: :class:`HttpResponse`
+        :param queryset: queryset of the export. Defaults to
+            :func:`get_queryset`.
+        :raises: NoModelFoundException, ImproperlyConfigured
+        :returns: :class:`export_csv.schema.Schema`
         """
-        response = HttpResponse(content_type=self._content_type)
-        response['Content-Disposition'] = 'attachment; filename="{}"'.format(
-            self.get_filename())
+        if queryset is None:
+            queryset = self.get_queryset()
+        model = self.model
+        if model is None:
+            model = getattr(queryset, 'model', None)
+        if model is None:
+            exception_msg = "No model to get the columns from."
+            raise NoModelFoundException(_(exception_msg))
+        extra_names = ()
+        if queryset is not None:
+            extra_names = (tuple(queryset.query.annotations) +
+                           tuple(queryset.query.extra))
+        return get_schema(self.__class__, model, self.get_field_names(),
+                          extra_names)
 
-        # TypeError is raised mostly because of unicode and byte string issues
+    def _get_field_verbose_names(self):
+        """Returns verbose names of fields returned by :func:`get_field_names`,
+        in the same order.
+
+        :raises: NoModelFoundException
+
+        :returns: list
+        """
+        if self.model is None:
+            exception_msg = "No model to get verbose field names from."
+            raise NoModelFoundException(_(exception_msg))
+        return self.get_schema().headers
+
+    @classmethod
+    def check(cls, initkwargs=None):
+        """Validates the columns and the query parameters allowed by the
+        view. Run at startup by a system check for every view of the
+        URLconf, see :func:`export_csv.checks.check_export_views`.
+
+        Views whose columns depend on the request (``get_field_names`` or
+        ``get_queryset`` reading attributes of the request or URL kwargs)
+        cannot be validated.
+
+        :param initkwargs: keyword arguments passed to :func:`as_view`
+        :type initkwargs: dict
+        :returns: list of :class:`django.core.checks.CheckMessage`
+        """
+        view = cls(**(initkwargs or {}))
         try:
-            wr = csv.writer(
-                response,
-                dialect=self.get_csv_writer_dialect(),
-                **self.get_csv_writer_kwargs()
-            )
-        except TypeError:
-            raise TypeError()
+            field_names = view.get_field_names()
+            schema = view.get_schema()
+        except ImproperlyConfigured as exc:
+            return [checks.Error(force_text(exc), obj=cls,
+                                 id='export_csv.E001')]
+        except (AttributeError, KeyError):
+            # no request and no URL kwargs at startup
+            return []
+        errors = []
+        col_names = view.col_names
+        if col_names and len(col_names) != len(field_names):
+            errors.append(checks.Warning(
+                'col_names has %d names for %d fields.' % (
+                    len(col_names), len(field_names)),
+                obj=cls, id='export_csv.W001'))
+        for name in view.selectable_fields or ():
+            try:
+                compile_column(cls, schema.model, name)
+            except ImproperlyConfigured as exc:
+                errors.append(checks.Error(
+                    force_text(exc), hint='Check selectable_fields.',
+                    obj=cls, id='export_csv.E003'))
+        if view.filter_fields is not None:
+            for name in view._get_filter_lookups():
+                try:
+                    field = schema.model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    field = None
+                if field is None or not _is_indexed(field):
+                    errors.append(checks.Error(
+                        'Filter field "%s" is not an indexed field of %s.' % (
+                            name, schema.model.__name__),
+                        hint='Check filter_fields.',
+                        obj=cls, id='export_csv.E004'))
+        return errors
 
-        # add header column only if self.add_col_names is True
-        if self.add_col_names:
-            self.col_names = self.get_col_names()
-            wr.writerow(self.col_names)
+    def get_selected_field_names(self):
+        """Returns the field names selected with the ``fields_param`` query
+        parameter, in the requested order, or ``None`` if no fields are
+        selected. Every field can be selected once.
 
-        queryset = self.get_queryset()
-        fields = self.get_field_names()
-        if queryset is not None:
-            for obj in queryset:
-                row = []
-                for field in iter(fields):
-                    # If defined, get_field_<field_name> method will try to get
-                    # value of the field. It can be any function. The purpose
-                    # of this function to get raw data, not reshape it. Read
-                    # docs for complete documentation and examples.
-                    if hasattr(self, 'get_field_%s' % field):
-                        val_func = getattr(self, 'get_field_%s' % field)
-                        value = val_func(obj)
-                    else:
-                        value = getattr(obj, field)
-                    # If defined, clean_<field_name> method will try transform
-                    # (or reshape or modify) the value of field obtained
-                    # previously. For Eg. changing string to uppercase before
-                    # writing to CSV.
-                    if hasattr(self, 'clean_%s' % field):
-                        clean_func = getattr(self, 'clean_%s' % field)
-                        value = clean_func(value)
-                    else:
-                        value = force_text(value)
-                    row.append(value)
-                wr.writerow(row)
-        return response
+        :raises: InvalidParameterException
 
-    def get(self, request):
+        :returns: list or None
         """
-        Default get method.
+        request = getattr(self, 'request', None)
+        if (self.selectable_fields is None or request is None or
+                not request.GET.get(self.fields_param)):
+            return None
+        selected = [name.strip() for name in
+                    request.GET[self.fields_param].split(',') if name.strip()]
+        invalid = [name for name in selected
+                   if name not in self.selectable_fields]
+        if invalid or not selected:
+            raise InvalidParameterException(
+                _('Invalid fields: {}. Allowed fields are: {}.').format(
+                    ', '.join(invalid), ', '.join(self.selectable_fields)))
+        repeated = sorted(set(name for name in selected
+                              if selected.count(name) > 1))
+        if repeated:
+            raise InvalidParameterException(
+                _('Fields selected more than once: {}.').format(
+                    ', '.join(repeated)))
+        return selected
 
-        :param request: request
-        :type request: HttpRequest
-        :returns: HttpResponse
+    def _get_filter_lookups(self):
+        if isinstance(self.filter_fields, dict):
+            return self.filter_fields
+        return dict((name, ['exact']) for name in self.filter_fields)
+
+    def get_filters(self):
+        """Returns the filters requested with the ``filter_param`` query
+        parameter as keyword arguments of :func:`QuerySet.filter`.
+
+        Every filter has the form ``<field>=<value>`` or
+        ``<field>__<lookup>=<value>`` and must be allowed by
+        ``filter_fields``. Values are converted by the model field; values of
+        ``in`` lookups are comma separated.
+
+        :raises: InvalidParameterException, ImproperlyConfigured
+
+        :returns: dict
+        """
+        request = getattr(self, 'request', None)
+        if self.filter_fields is None or request is None:
+            return {}
+        allowed = self._get_filter_lookups()
+        filters = {}
+        for param in request.GET.getlist(self.filter_param):
+            key, sep, value = param.partition('=')
+            name, lookup = key, 'exact'
+            if name not in allowed and '__' in key:
+                name, lookup = key.rsplit('__', 1)
+            if not sep or lookup not in allowed.get(name, ()):
+                raise InvalidParameterException(
+                    _('Invalid filter: {}.').format(param))
+            field = self.model._meta.get_field(name)
+            if not _is_indexed(field):
+                raise ImproperlyConfigured(
+                    _('Filter field {} of {} is not indexed.').format(
+                        name, self.__class__.__name__))
+            try:
+                filters['{}__{}'.format(name, lookup)] = \
+                    _to_lookup_value(field, lookup, value)
+            except ValidationError as exc:
+                raise InvalidParameterException(
+                    _('Invalid filter: {}. {}').format(
+                        param, ' '.join(exc.messages)))
+        return filters
+
+    def _defer_unselected_fields(self, queryset):
+        """Restricts the columns loaded from the database to the fields
+        selected by the client, if they are all model fields without
+        ``get_field_<field_name>`` methods (which could access other
+        fields).
+
+        :returns: :class:`QuerySet`
         """
-        return self._create_csv()
+        selected = self.get_selected_field_names()
+        if not selected or not queryset.query.can_filter():
+            return queryset
+        concrete = set(f.name for f in queryset.model._meta.concrete_fields)
+        for name in selected:
+            if name not in concrete or hasattr(self, 'get_field_%s' % name):
+                return queryset
+        return queryset.only(*selected)
+
+    def _get_format_content_type(self, output_format):
+        writer_class = self.writer_classes.get(output_format)
+        if writer_class is not None:
+            return writer_class.content_type
+        if output_format == 'xlsx':
+            return XLSX_CONTENT_TYPE
+        return ARROW_FORMATS.get(output_format, (None, None))[0]
+
+    def get_output_format(self):
+        """Returns the format of the export.
+
+        If ``output_formats`` is set, it returns the format requested with
+        the ``format_param`` query parameter, or the first one of
+        ``output_formats`` matching the ``Accept`` header. Otherwise, or if
+        none matches, it returns ``output_format``.
+
+        :raises: InvalidParameterException
+
+        :returns: str
+        """
+        formats = self.output_formats
+        if not formats:
+            return self.output_format
+        requested = self.request.GET.get(self.format_param)
+        if requested is not None:
+            if requested not in formats:
+                raise InvalidParameterException(
+                    _('Unknown format "{}". Choose one of: {}.').format(
+                        requested, ', '.join(formats)))
+            return requested
+        content_types = {}
+        for output_format in formats:
+            content_types.setdefault(
+                self._get_format_content_type(output_format), output_format)
+        accept = self.request.META.get('HTTP_ACCEPT', '')
+        for media_type in _parse_accept(accept):
+            if media_type in content_types:
+                return content_types[media_type]
+        return self.output_format
+
+    def validate_parameters(self):
+        """Validates the query parameters selecting the fields and filtering
+        the rows of the export, before the export starts.
+
+        :raises: InvalidParameterException
+        """
+        self.get_selected_field_names()
+        self.get_filters()
+
+    def get_replica_lag(self, using):
+        """Returns the replication lag of database ``using`` in seconds.
+
+        Override this method to query the lag from the replica, for example
+        ``now() - pg_last_xact_replay_timestamp()`` on PostgreSQL. By default,
+        the lag is unknown and ``None`` is returned, which means the replica
+        is always used.
+
+        :param using: database alias
+        :type using: str
+        :returns: float or None
+        """
+        return None
+
+    def get_database_alias(self):
+        """Returns the alias of the database to run the export against.
+
+        It returns ``using`` attribute, if provided. Otherwise it returns the
+        ``EXPORT_CSV_DATABASE`` setting. If ``max_replica_lag`` (or the
+        ``EXPORT_CSV_MAX_REPLICA_LAG`` setting) is set and the replica lags
+        behind by more than that, the default database alias is returned
+        instead.
+
+        :returns: str or None
+        """
+        using = self.using
+        if using is None:
+            using = getattr(settings, 'EXPORT_CSV_DATABASE', None)
+        if using is None or using == DEFAULT_DB_ALIAS:
+            return using
+        max_lag = self.max_replica_lag
+        if max_lag is None:
+            max_lag = getattr(settings, 'EXPORT_CSV_MAX_REPLICA_LAG', None)
+        if max_lag is not None:
+            lag = self.get_replica_lag(using)
+            if lag is not None and lag > max_lag:
+                return DEFAULT_DB_ALIAS
+        return using
+
+    def _get_database_alias(self):
+        """Returns the alias returned by :func:`get_database_alias`, which is
+        resolved only once per export so that all the queries of the export
+        (e.g. the estimated count and the rows) run against the same
+        database.
+
+        :returns: str or None
+        """
+        if not hasattr(self, '_database_alias'):
+            self._database_alias = self.get_database_alias()
+        return self._database_alias
+
+    def _get_queryset(self):
+        """Returns the queryset returned by :func:`get_queryset` routed to
+        the database returned by :func:`get_database_alias`.
+
+        :returns: :class:`QuerySet`
+        """
+        queryset = self.get_queryset()
+        using = self._get_database_alias()
+        if queryset is not None and using is not None:
+            queryset = queryset.using(using)
+        if queryset is not None:
+            filters = self.get_filters()
+            if filters:
+                queryset = queryset.filter(**filters)
+            queryset = self._defer_unselected_fields(queryset)
+        rows = self.get_preview_rows()
+        if queryset is not None and rows is not None:
+            queryset = preview_queryset(queryset, rows,
+                                        sample=self.is_sample_requested())
+        return queryset
+
+    def get_preview_rows(self):
+        """Returns the number of rows of the requested preview, or ``None``
+        if no preview is requested.
+
+        :returns: int or None
+        """
+        request = getattr(self, 'request', None)
+        if (not self.preview_param or request is None or
+                self.preview_param not in request.GET):
+            return None
+        try:
+            rows = int(request.GET[self.preview_param])
+        except ValueError:
+            rows = self.preview_rows
+        return max(1, min(rows, self.max_preview_rows))
+
+    def is_sample_requested(self):
+        """Returns whether the preview should be a random sample of the
+        rows. See :func:`export_csv.db.preview_queryset`.
+
+        :returns: bool
+        """
+        request = getattr(self, 'request', None)
+        return bool(self.sample_param and request is not None and
+                    self.sample_param in request.GET)
+
+    def get_estimated_count(self):
+        """Returns the estimated number of rows of the export.
+
+        The estimate comes from the query planner on PostgreSQL and MySQL
+        and is an exact count on other databases or for small tables (see
+        :func:`export_csv.db.estimate_count`). It is computed only once per
+        export, in the snapshot the rows are read from.
+
+        :returns: int or None
+        """
+        if not hasattr(self, '_estimated_count'):
+            queryset = self._get_queryset()
+            self._estimated_count = (estimate_count(queryset)
+                                     if queryset is not None else None)
+        return self._estimated_count
+
+    def get_progress_key(self):
+        """Returns the cache key under which progress is stored.
+
+        The key is derived from the ``progress_param`` query parameter of the
+        request. ``None`` is returned if the parameter is missing.
+
+        :returns: str or None
+        """
+        request = getattr(self, 'request', None)
+        if not self.progress_param or request is None:
+            return None
+        token = request.GET.get(self.progress_param)
+        if not token:
+            return None
+        return get_progress_cache_key(token)
+
+    def report_progress(self, rows, total, done=False):
+        """Reports the progress of the export.
+
+        It is called when the export starts, every ``progress_interval``
+        rows and when the export is done. By default, the progress is stored
+        in the cache under the key returned by :func:`get_progress_key`, from
+        where :class:`ExportProgress` view returns it. Override this method
+        to report progress elsewhere, e.g. from a background job.
+
+        :param rows: number of rows written so far
+        :type rows: int
+        :param total: estimated number of rows
+        :type total: int
+        :param done: ``True`` once all rows are written
+        :type done: bool
+        """
+        key = self.get_progress_key()
+        if key is not None:
+            progress = {'rows': rows, 'total': total, 'done': done}
+            cache.set(key, progress, self.progress_timeout)
+
+    def get_filename(self):
+        """Returns filename.
+
+        It returns the filename to be used for rendering CSV. If explicit
+        filename is provided, that filename is returned. If omitted,
+        <model>_list.csv is returned.
+
+        :raises: NoModelFoundException
+
+        :returns: str
+        """
+        if self.filename is not None:
+            return self.filename
+        if self.model is not None:
+            model_name = str(self.model.__name__).lower()
+            self.filename = force_str(model_name + '_list.csv')
+        else:
+            exception_msg = "No model to generate filename. Either provide " \
+                            "model or filename or override get_filename " \
+                            "method."
+            raise NoModelFoundException(_(exception_msg))
+        return self.filename
+
+    def get_output_filename(self):
+        """Returns :func:`get_filename` with the extension of
+        ``output_format``, unless the format is CSV.
+
+        :returns: str
+        """
+        filename = self.get_filename()
+        if self.output_format == 'csv':
+            return filename
+        root, ext = os.path.splitext(filename)
+        writer_class = self.writer_classes.get(self.output_format)
+        if writer_class is not None:
+            return root + writer_class.extension
+        if self.output_format == 'xlsx':
+            return root + '.xlsx'
+        return root + ARROW_FORMATS.get(self.output_format, (None, ext))[1]
+
+    def get_csv_writer_dialect(self):
+        """Returns the dialect to be used with :func:`csv.writer`.
+
+        :returns: str
+        """
+        return self._csv_writer_dialect
+
+    def get_csv_writer_kwargs(self, **kwargs):
+        """Returns the kwargs to be passed to :func:`csv.writer`.
+
+        :param kwargs: kwargs to be passed to :func:`csv.writer`
+        :type kwargs: dict
+        :returns: dict -- kwargs to be passed to :func:`csv.writer`
+        """
+        return kwargs
+
+    def _get_value_funcs(self, fields, columns=None, typed=False):
+        """Returns a ``(get, clean)`` pair of callables for every field.
+
+        ``get`` takes the object and returns the raw value of the field and
+        ``clean`` takes that value and returns the value written to CSV. The
+        methods are looked up once per export instead of once per cell.
+
+        :param fields: field names returned by :func:`get_field_names`
+        :type fields: list
+        :param columns: compiled columns of the fields (see
+            :func:`get_schema`), whose getters are used by default
+        :type columns: list
+        :param typed: if ``True``, the values of plain fields (see
+            :attr:`export_csv.schema.Column.is_plain`) are kept as they are
+            and ``None`` is kept instead of being written as ``'None'``
+        :type typed: bool
+        :returns: list of tuples
+        """
+        funcs = []
+        for i, field in enumerate(fields):
+            # If defined, get_field_<field_name> method will try to get
+            # value of the field. It can be any function. The purpose
+            # of this function to get raw data, not reshape it. Read
+            # docs for complete documentation and examples.
+            get = getattr(self, 'get_field_%s' % field, None)
+            if get is None and columns is not None:
+                get = columns[i].get
+            if get is None:
+                get = operator.attrgetter(field)
+            # If defined, clean_<field_name> method will try transform
+            # (or reshape or modify) the value of field obtained
+            # previously. For Eg. changing string to uppercase before
+            # writing to CSV.
+            clean = getattr(self, 'clean_%s' % field, None)
+            if clean is None and typed:
+                plain = columns is not None and columns[i].is_plain
+                clean = _identity if plain else _to_text
+            if clean is None:
+                clean = force_text
+            funcs.append((get, clean))
+        return funcs
+
+    def _prepare_queryset(self, queryset, typed=False):
+        """Returns the queryset to iterate and the ``(get, clean)`` pairs
+        of callables turning its items into rows.
+
+        If all the columns are concrete fields of the model without
+        ``get_field_<field_name>`` methods, the rows are read with
+        :func:`QuerySet.values_list` and no model instance is created,
+        unless a ``clean_<field_name>`` method would get the value of the
+        column instead of the attribute of the object (e.g. the name of the
+        file instead of the :class:`FieldFile` of a :class:`FileField`).
+        Otherwise, the relations the columns are read through are added to
+        :func:`QuerySet.select_related`.
+
+        :param typed: see :func:`_get_value_funcs`
+        :returns: tuple -- (:class:`QuerySet`, list of tuples)
+        """
+        schema = self.get_schema(queryset)
+        funcs = self._get_value_funcs(schema.names, schema.columns, typed)
+        query = queryset.query
+        if (schema.is_plain and queryset._iterable_class is ModelIterable and
+                not queryset._prefetch_related_lookups and
+                not query.distinct and not query.combinator and
+                all(column.has_plain_attribute or
+                    not hasattr(self, 'clean_%s' % column.name)
+                    for column in schema.columns)):
+            funcs = [(operator.itemgetter(i), clean)
+                     for i, (get, clean) in enumerate(funcs)]
+            queryset = queryset.values_list(*schema.names)
+        elif (schema.related and queryset._iterable_class is ModelIterable and
+                queryset.query.select_related is not True):
+            queryset = queryset.select_related(*schema.related)
+        return queryset, funcs
+
+    def _get_row(self, obj, funcs):
+        """Returns the list of values written to CSV for ``obj``.
+
+        :param obj: model instance
+        :param funcs: callables returned by :func:`_get_value_funcs`
+        :type funcs: list
+        :returns: list
+        """
+        return [clean(get(obj)) for get, clean in funcs]
+
+    def get_statement_timeout(self):
+        """Returns the statement timeout of the export queries in seconds.
+
+        It returns ``statement_timeout`` attribute, if provided. Otherwise it
+        returns the ``EXPORT_CSV_STATEMENT_TIMEOUT`` setting.
+
+        :returns: float or None
+        """
+        if self.statement_timeout is not None:
+            return self.statement_timeout
+        return getattr(settings, 'EXPORT_CSV_STATEMENT_TIMEOUT', None)
+
+    def _iter_objects(self, queryset):
+        """Returns an iterator over the objects of ``queryset`` which fetches
+        them ``chunk_size`` at a time (using a server-side cursor where the
+        database supports it) instead of caching the whole result.
+
+        Querysets with :func:`prefetch_related` lookups are iterated as
+        usual, as :func:`iterator` would ignore the lookups.
+
+        :returns: iterator
+        """
+        if queryset._prefetch_related_lookups:
+            return iter(queryset)
+        return queryset.iterator(chunk_size=self.chunk_size)
+
+    def _fetch_chunks(self, queryset, snapshot_id=None):
+        """Yields the objects of ``queryset`` in lists of ``chunk_size``
+        objects. Run by the worker thread of :func:`_iter_pipelined`, on its
+        own database connection.
+
+        :param snapshot_id: identifier of the snapshot of the consuming
+            thread, see ``consistent_snapshot``
+        :returns: generator of lists
+        """
+        using = queryset.db
+        with snapshot(using, self.consistent_snapshot, snapshot_id), \
+                statement_timeout(using, self.get_statement_timeout()):
+            objects = self._iter_objects(queryset)
+            try:
+                while True:
+                    chunk = list(itertools.islice(objects, self.chunk_size))
+                    if not chunk:
+                        return
+                    yield chunk
+            finally:
+                _close(objects)
+
+    def _iter_pipelined(self, queryset):
+        """Yields the objects of ``queryset`` fetched by a worker thread.
+
+        The worker fetches up to ``pipeline_depth`` chunks ahead and waits
+        while the queue is full, so memory stays bounded. Closing the
+        generator stops the worker.
+
+        :returns: generator
+        """
+        snapshot_id = self.snapshot_id
+        if self.consistent_snapshot and snapshot_id is None:
+            # the worker reads the snapshot of this thread
+            snapshot_id = export_snapshot(queryset.db)
+        renderer = _ThreadedRenderer(self._fetch_chunks(queryset, snapshot_id),
+                                     self.pipeline_depth)
+        worker = threading.Thread(target=renderer.run)
+        worker.daemon = True
+        worker.start()
+        try:
+            for chunk in renderer:
+                for obj in chunk:
+                    yield obj
+        finally:
+            renderer.cancel()
+
+    def _iter_data_rows(self, typed=False):
+        """Yields a row for every object of the queryset.
+
+        With ``typed``, the values of plain fields are not converted to
+        text, see :func:`_get_value_funcs`.
+
+        If the generator is closed early, e.g. because the client
+        disconnected and the server closed the streaming response, the
+        database cursor is closed and no more rows are fetched. With
+        ``consistent_snapshot``, all the queries run in one snapshot
+        transaction.
+
+        :returns: generator of lists
+        """
+        queryset = self._get_queryset()
+        if queryset is None:
+            return
+        queryset, funcs = self._prepare_queryset(queryset, typed)
+        interval = self.progress_interval
+        rows = 0
+        with snapshot(queryset.db, self.consistent_snapshot,
+                      self.snapshot_id):
+            total = self.get_estimated_count() if interval else None
+            if interval:
+                self.report_progress(rows, total)
+            with statement_timeout(queryset.db,
+                                   self.get_statement_timeout()):
+                if self.pipelined:
+                    objects = self._iter_pipelined(queryset)
+                else:
+                    objects = self._iter_objects(queryset)
+                try:
+                    for obj in objects:
+                        yield self._get_row(obj, funcs)
+                        rows += 1
+                        if interval and rows % interval == 0:
+                            self.report_progress(rows, total)
+                except GeneratorExit:
+                    logger.info('Export %s stopped after %d rows.',
+                                self.__class__.__name__, rows)
+                    raise
+                finally:
+                    _close(objects)
+        if interval:
+            self.report_progress(rows, total, done=True)
+
+    def _iter_rows(self, header=True, typed=False):
+        """Yields the header row (only if ``add_col_names`` and ``header``
+        are ``True``) followed by a row for every object of the queryset.
+
+        :param typed: see :func:`_get_value_funcs`
+        :returns: generator of lists
+        """
+        # add header column only if self.add_col_names is True
+        if self.add_col_names and header:
+            self.col_names = self.get_col_names()
+            yield self.col_names
+
+        rows = self._iter_data_rows(typed)
+        try:
+            for row in rows:
+                yield row
+        finally:
+            rows.close()
+
+    def get_writer_class(self):
+        """Returns the writer class of ``output_format``, see
+        ``writer_classes``. Previews of the other formats are written as
+        CSV.
+
+        :returns: class
+        """
+        return self.writer_classes.get(self.output_format, CSVWriter)
+
+    def get_writer_kwargs(self, writer_class):
+        """Returns the keyword arguments of ``writer_class``.
+
+        CSV writers (subclasses of :class:`export_csv.writers.CSVWriter`)
+        get the dialect and the kwargs of :func:`csv.writer`, the other
+        writers get the field names.
+
+        :returns: dict
+        """
+        kwargs = {'encoding': self.get_encoding(),
+                  'errors': self.encoding_errors}
+        if issubclass(writer_class, CSVWriter):
+            kwargs['dialect'] = self.get_csv_writer_dialect()
+            kwargs.update(self.get_csv_writer_kwargs())
+        else:
+            kwargs['names'] = self.get_field_names()
+        return kwargs
+
+    def _get_content_type(self):
+        """Returns the Content-Type header of the export, including the
+        charset.
+
+        :returns: str
+        """
+        encoding = self.get_encoding()
+        if codecs.lookup(encoding).name == 'utf-8-sig':
+            encoding = 'utf-8'
+        return '{}; charset={}'.format(self.get_writer_class().content_type,
+                                       encoding)
+
+    def _get_writer(self):
+        """Returns the writer of the rows, see :func:`get_writer_class`.
+
+        :raises: TypeError
+
+        :returns: :class:`export_csv.writers.CSVWriter`
+        """
+        writer_class = self.get_writer_class()
+        # TypeError is raised mostly because of unicode and byte string issues
+        try:
+            return writer_class(**self.get_writer_kwargs(writer_class))
+        except TypeError:
+            raise TypeError()
+
+    def get_segment_cache_key(self, queryset, index):
+        """Returns the cache key of the rendered segment ``index`` of
+        ``queryset``.
+
+        The key depends on the SQL of the queryset, the fields and the CSV
+        format. Override it to add anything else the rendering depends on,
+        e.g. a version of the ``clean_<field_name>`` methods.
+
+        :returns: str
+        """
+        fingerprint = get_fingerprint(
+            self.__class__.__module__, self.__class__.__name__,
+            str(queryset.query), self.get_field_names(), self.get_encoding(),
+            self.encoding_errors, self.output_format,
+            self.get_csv_writer_dialect(),
+            sorted(self.get_csv_writer_kwargs().items()), self.segment_size)
+        return 'export_csv:segment:{}:{}'.format(fingerprint, index)
+
+    def iter_segments(self, queryset, writer):
+        """Yields the encoded rows of ``queryset`` segment by segment.
+
+        The validators of all the segments are read with one aggregate query
+        (see :func:`export_csv.segments.get_segments`) and compared with the
+        cached validators, which are kept under their own keys and read with
+        one cache lookup. The rendered segments are read from the cache one
+        at a time, when they are sent, so that memory does not grow with the
+        size of the export. Only the segments whose validator changed are
+        rendered again and cached.
+
+        :param queryset: queryset with an integer primary key
+        :type queryset: :class:`QuerySet`
+        :param writer: writer of the rows
+        :type writer: :class:`export_csv.writers.CSVWriter`
+        :returns: generator of bytes
+        """
+        segment_cache = caches[self.segment_cache]
+        timeout = self.segment_cache_timeout
+        using = queryset.db
+        with snapshot(using, self.consistent_snapshot, self.snapshot_id), \
+                statement_timeout(using, self.get_statement_timeout()):
+            segments = get_segments(queryset, self.segment_size,
+                                    self.segment_version_field)
+            keys = [self.get_segment_cache_key(queryset, index)
+                    for index, validator in segments]
+            queryset, funcs = self._prepare_queryset(queryset, writer.typed)
+            validators = segment_cache.get_many(
+                [_get_validator_key(key) for key in keys])
+            for (index, validator), key in zip(segments, keys):
+                if validators.get(_get_validator_key(key)) == validator:
+                    entry = segment_cache.get(key)
+                    # the segment may have been evicted or replaced since
+                    if entry is not None and entry[0] == validator:
+                        yield entry[1]
+                        continue
+                objects = self._iter_objects(get_segment_queryset(
+                    queryset, index, self.segment_size))
+                try:
+                    data = writer.write_rows(
+                        self._get_row(obj, funcs) for obj in objects)
+                finally:
+                    _close(objects)
+                segment_cache.set_many({
+                    key: (validator, data),
+                    _get_validator_key(key): validator,
+                }, timeout)
+                yield data
+
+    def iter_csv(self):
+        """Yields the encoded CSV in chunks of ``chunk_size`` rows, or the
+        rows in another format of ``writer_classes`` (see
+        ``output_format``).
+
+        The whole CSV is never held in memory, which makes this method
+        suitable for :class:`StreamingHttpResponse` and other incremental
+        consumers. If ``segment_size`` is set, it yields the segments of
+        :func:`iter_segments` instead.
+
+        :raises: TypeError
+
+        :returns: generator of bytes
+        """
+        writer = self._get_writer()
+        if writer.bom:
+            yield writer.bom
+        if self.segment_size:
+            queryset = self._get_queryset()
+            if queryset is not None and can_segment(queryset):
+                if self.add_col_names and writer.has_header:
+                    self.col_names = self.get_col_names()
+                    yield writer.write_row(self.col_names)
+                segments = self.iter_segments(queryset, writer)
+                try:
+                    for data in segments:
+                        yield data
+                finally:
+                    segments.close()
+                return
+        rows = self._iter_rows(writer.has_header, writer.typed)
+        for chunk in _iter_chunks(rows, self.chunk_size):
+            yield writer.write_rows(chunk)
+
+    def get_arrow_types(self, schema):
+        """Returns the Arrow type of every column of ``schema``.
+
+        Plain fields without ``clean_<field_name>`` methods are typed from
+        their model field (see :func:`export_csv.arrow.get_arrow_type`), the
+        other columns are strings.
+
+        :param schema: see :func:`get_schema`
+        :returns: list of :class:`pyarrow.DataType`
+        """
+        return [get_arrow_type(column.field if column.is_plain and not
+                               hasattr(self, 'clean_%s' % column.name)
+                               else None)
+                for column in schema.columns]
+
+    def iter_arrow(self):
+        """Yields the export as a Parquet file or an Arrow IPC stream,
+        depending on ``output_format``, one record batch of ``chunk_size``
+        rows at a time.
+
+        The values of plain fields go from the database to the record
+        batches without being formatted as text.
+
+        :raises: ImproperlyConfigured
+
+        :returns: generator of bytes
+        """
+        queryset = self._get_queryset()
+        schema = self.get_schema(queryset)
+        writer = ArrowWriter(schema.names, self.get_arrow_types(schema),
+                             format=self.output_format,
+                             compression=self.parquet_compression)
+        yield writer.write_rows(())
+        rows = self._iter_data_rows(typed=True)
+        for chunk in _iter_chunks(rows, self.chunk_size):
+            yield writer.write_rows(chunk)
+        yield writer.close()
+
+    def get_sheet_name(self):
+        """Returns the name of the worksheet of XLSX exports, the filename
+        without its extension by default.
+
+        :returns: str
+        """
+        return os.path.splitext(self.get_filename())[0]
+
+    def _iter_sheet_rows(self, writer):
+        if self.add_col_names:
+            self.col_names = self.get_col_names()
+            yield writer.write_row(self.col_names)
+        rows = self._iter_data_rows(typed=True)
+        for chunk in _iter_chunks(rows, self.chunk_size):
+            yield writer.write_rows(chunk)
+
+    def iter_xlsx(self):
+        """Yields the export as an Excel workbook, ``chunk_size`` rows at a
+        time.
+
+        The worksheet is written row by row with inline strings and the
+        workbook is compressed while it is being generated (see
+        :func:`export_csv.zipstream.iter_zip`), so memory does not grow
+        with the number of rows. The values of plain fields are written as
+        numbers, booleans and dates, the other values as returned by the
+        ``get_field_<field_name>`` and ``clean_<field_name>`` methods.
+
+        :raises: ValueError if there are more rows than an Excel worksheet
+            holds (see :data:`export_csv.xlsx.MAX_ROWS`)
+
+        :returns: generator of bytes
+        """
+        return iter_xlsx(self._iter_sheet_rows(XLSXWriter()),
+                         sheet_name=self.get_sheet_name())
+
+    def get_part_filename(self, index):
+        """Returns the filename of the part number ``index`` (starting at 1)
+        of a split CSV.
+
+        For example, ``customer_list_0001.csv`` for the first part of
+        ``customer_list.csv``.
+
+        :param index: part number
+        :type index: int
+        :returns: str
+        """
+        root, ext = os.path.splitext(self.get_output_filename())
+        return '{}_{:04d}{}'.format(root, index, ext or '.csv')
+
+    def get_manifest_filename(self):
+        """Returns the filename of the manifest of a split CSV, in the ZIP
+        file of the parts and in the storage of :func:`write_parts`.
+
+        :returns: str
+        """
+        root, ext = os.path.splitext(self.get_filename())
+        return '{}_manifest.json'.format(root)
+
+    def iter_parts(self):
+        """Splits the CSV into parts of at most ``part_rows`` rows and
+        ``part_size`` bytes and yields ``(part, chunks)`` for every part.
+
+        Every part starts with the header row if ``add_col_names`` is
+        ``True``. The chunks of a part must be consumed before the next part
+        is requested. Once consumed, ``part`` holds the row count, size and
+        checksum of the part.
+
+        :returns: generator of (:class:`export_csv.parts.Part`, generator of
+            bytes) tuples
+        """
+        writer = self._get_writer()
+        header = writer.bom
+        if self.add_col_names and writer.has_header:
+            self.col_names = self.get_col_names()
+            header += writer.write_row(self.col_names)
+        lines = (writer.write_row(row)
+                 for row in self._iter_data_rows(writer.typed))
+        return split_parts(lines, self.get_part_filename,
+                           header=header or None, max_rows=self.part_rows,
+                           max_size=self.part_size)
+
+    def _iter_part_entries(self):
+        """Yields ``(name, chunks)`` for every part followed by the
+        manifest."""
+        parts = []
+        for part, chunks in self.iter_parts():
+            parts.append(part)
+            yield part.name, chunks
+        manifest = json.dumps(get_manifest(parts), indent=2)
+        yield self.get_manifest_filename(), [force_bytes(manifest)]
+
+    def save_csv(self, storage=None, name=None):
+        """Writes the export (in ``output_format``) to ``storage`` while it
+        is being generated, e.g. from a background job.
+
+        Neither the whole CSV nor a temporary file is held. See
+        :class:`export_csv.storage.StreamedFile`.
+
+        :param storage: storage to write to. Defaults to
+            :data:`django.core.files.storage.default_storage`.
+        :param name: name of the file. Defaults to :func:`get_filename`,
+            with the extension of ``output_format``.
+        :type name: str
+        :raises: TypeError
+        :returns: str -- the name the file was saved as
+        """
+        if storage is None:
+            storage = default_storage
+        chunks, content_type, filename = self._get_output()
+        return save_chunks(storage, name or filename, chunks)
+
+    def write_parts(self, storage=None, prefix=''):
+        """Writes the parts of the split CSV and the manifest listing them
+        to ``storage``.
+
+        The parts are written to the storage while they are generated,
+        without temporary files. See :class:`export_csv.storage.StreamedFile`.
+
+        :param storage: storage to write to. Defaults to
+            :data:`django.core.files.storage.default_storage`.
+        :param prefix: prefix (e.g. directory) prepended to the filenames
+        :type prefix: str
+        :returns: dict -- the manifest
+        """
+        if storage is None:
+            storage = default_storage
+        parts = []
+        for part, chunks in self.iter_parts():
+            part.name = save_chunks(storage, prefix + part.name, chunks)
+            parts.append(part)
+        manifest = get_manifest(parts)
+        content = ContentFile(force_bytes(json.dumps(manifest, indent=2)))
+        storage.save(prefix + self.get_manifest_filename(), content)
+        return manifest
+
+    def _create_csv(self):
+        """Create CSV and render the response.
+
+        If ``streaming`` is ``True``, a :class:`StreamingHttpResponse` is
+        returned and the CSV is generated while it is being sent. If
+        ``part_rows`` or ``part_size`` is set, a ZIP file containing the parts
+        and a manifest (see :func:`get_manifest_filename`) is streamed
+        instead. The rows
+        are written by the writer of ``output_format`` (see
+        :func:`get_writer_class`), the other formats are rendered by
+        :func:`_create_file`.
+
+        Previews (see :func:`get_preview_rows`) are always rendered as a
+        single :class:`HttpResponse`.
+
+        :raises: TypeError
+
+        :returns: :class:`HttpResponse`
+        """
+        if self.get_preview_rows() is not None:
+            return self._create_preview()
+        if self.output_format not in self.writer_classes:
+            return self._create_file()
+        if self.part_rows or self.part_size:
+            response = StreamingHttpResponse(
+                iter_zip(self._iter_part_entries()),
+                content_type='application/zip')
+            root, ext = os.path.splitext(self.get_output_filename())
+            response['Content-Disposition'] = \
+                'attachment; filename="{}.zip"'.format(root)
+            return response
+        if self.streaming:
+            response = StreamingHttpResponse(
+                self.iter_csv(), content_type=self._get_content_type())
+        else:
+            response = HttpResponse(content_type=self._get_content_type())
+            for chunk in self.iter_csv():
+                response.write(chunk)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+            self.get_output_filename())
+        if self.progress_interval and not self.streaming:
+            # estimated in the snapshot the rows were read from
+            estimate = self.get_estimated_count()
+            if estimate is not None:
+                response['X-Export-Estimated-Rows'] = str(estimate)
+        return response
+
+    def _get_output(self):
+        """Returns the chunks, the content type and the filename of the
+        export in ``output_format``.
+
+        :raises: ImproperlyConfigured
+
+        :returns: tuple -- (generator of bytes, str, str)
+        """
+        filename = self.get_output_filename()
+        if self.output_format in self.writer_classes:
+            return self.iter_csv(), self._get_content_type(), filename
+        if self.output_format == 'xlsx':
+            return self.iter_xlsx(), XLSX_CONTENT_TYPE, filename
+        check_format(self.output_format)
+        content_type = ARROW_FORMATS[self.output_format][0]
+        return self.iter_arrow(), content_type, filename
+
+    def _create_file(self):
+        """Renders the export in a format without a writer class (see
+        ``output_format``), named after :func:`get_output_filename`.
+
+        :raises: ImproperlyConfigured
+
+        :returns: :class:`HttpResponse`
+        """
+        chunks, content_type, filename = self._get_output()
+        if self.streaming:
+            response = StreamingHttpResponse(chunks,
+                                             content_type=content_type)
+        else:
+            response = HttpResponse(content_type=content_type)
+            for chunk in chunks:
+                response.write(chunk)
+        response['Content-Disposition'] = \
+            'attachment; filename="{}"'.format(filename)
+        return response
+
+    def _create_preview(self):
+        """Renders the preview of the export as ``<filename>_preview.csv``,
+        or with the extension of ``output_format`` for the formats of
+        ``writer_classes``.
+
+        :returns: :class:`HttpResponse`
+        """
+        response = HttpResponse(content_type=self._get_content_type())
+        for chunk in self.iter_csv():
+            response.write(chunk)
+        if self.output_format in self.writer_classes:
+            filename = self.get_output_filename()
+        else:
+            filename = self.get_filename()
+        root, ext = os.path.splitext(filename)
+        response['Content-Disposition'] = \
+            'attachment; filename="{}_preview{}"'.format(root, ext)
+        response['X-Export-Preview'] = \
+            'sample' if self.is_sample_requested() else 'head'
+        return response
+
+    def get_concurrency_limits(self):
+        """Returns the limits of concurrent exports the view is subject to.
+
+        The limits are ``max_concurrent_exports`` for the view and the
+        ``EXPORT_CSV_MAX_CONCURRENT_EXPORTS`` setting for all the views. The
+        cross-process counters are kept in the cache named by the
+        ``EXPORT_CSV_LIMITER_CACHE`` setting (``default`` by default, ``None``
+        to only limit exports per process).
+
+        :returns: list of :class:`export_csv.throttling.ConcurrencyLimit`
+        """
+        cache_alias = getattr(settings, 'EXPORT_CSV_LIMITER_CACHE', 'default')
+        limits = []
+        if self.max_concurrent_exports:
+            key = '{}.{}'.format(self.__class__.__module__,
+                                 self.__class__.__name__)
+            limits.append(ConcurrencyLimit(key, self.max_concurrent_exports,
+                                           cache_alias))
+        global_limit = getattr(settings, 'EXPORT_CSV_MAX_CONCURRENT_EXPORTS',
+                               None)
+        if global_limit:
+            limits.append(ConcurrencyLimit('global', global_limit,
+                                           cache_alias))
+        return limits
+
+    def is_profiling_requested(self):
+        """Returns whether the export should be profiled instead of rendered.
+
+        Profiling is requested with the ``profile_param`` query parameter and
+        is allowed only if ``DEBUG`` is on or the user is staff. Set
+        ``EXPORT_CSV_PROFILING`` setting to ``False`` to disable it
+        altogether.
+
+        :returns: bool
+        """
+        request = getattr(self, 'request', None)
+        if (not self.profile_param or request is None or
+                self.profile_param not in request.GET):
+            return False
+        if not getattr(settings, 'EXPORT_CSV_PROFILING', True):
+            return False
+        user = getattr(request, 'user', None)
+        return settings.DEBUG or bool(getattr(user, 'is_staff', False))
+
+    def _profile(self):
+        """Profiles the export and returns the report as JSON.
+
+        At most ``profile_rows`` rows are read. The report is logged to the
+        ``export_csv.profiling`` logger as well. With ``?<profile_param>=cprofile``, :mod:`cProfile` statistics are
+        included.
+
+        :returns: :class:`JsonResponse`
+        """
+        use_cprofile = self.request.GET[self.profile_param] == 'cprofile'
+        report = profile_export(self, use_cprofile=use_cprofile,
+                                max_rows=self.profile_rows)
+        log_report(report)
+        return JsonResponse(report)
+
+    def get(self, request):
+        """
+        Default get method.
+
+        :param request: request
+        :type request: HttpRequest
+        :returns: HttpResponse
+        """
+        try:
+            self.output_format = self.get_output_format()
+            self.validate_parameters()
+            # fail before the response starts if a column is invalid
+            self.get_schema()
+        except InvalidParameterException as exc:
+            return HttpResponseBadRequest(force_text(exc),
+                                          content_type='text/plain')
+        # previews are bounded, so they are not limited
+        if self.get_preview_rows() is None:
+            limits = self.get_concurrency_limits()
+        else:
+            limits = []
+        if limits and not acquire_all(limits, self.export_queue_timeout):
+            response = HttpResponse(
+                _('Too many exports are running. Try again later.'),
+                status=429, content_type='text/plain')
+            response['Retry-After'] = str(self.retry_after)
+            return response
+        try:
+            if self.is_profiling_requested():
+                response = self._profile()
+            else:
+                response = self._create_csv()
+        except Exception:
+            release_all(limits)
+            raise
+        if self.output_formats:
+            patch_vary_headers(response, ('Accept',))
+        if limits and response.streaming:
+            # the slots are taken until the whole CSV has been sent, and the
+            # shared counters do not expire while it is sent
+            response.streaming_content = _ReleasingIterator(
+                response.streaming_content,
+                functools.partial(release_all, limits),
+                functools.partial(refresh_all, limits))
+        else:
+            release_all(limits)
+        return response
+
+
+def get_progress_cache_key(token):
+    """Returns the cache key of the progress stored for ``token``.
+
+    :param token: token passed in the ``progress_param`` query parameter
+    :type token: str
+    :returns: str
+    """
+    return 'export_csv:progress:{}'.format(token)
+
+
+class ExportProgress(View):
+    """View returning the progress of an export as JSON.
+
+    The export is identified by the token passed in the ``progress_param``
+    query parameter of both the export and this view, for example
+    ``?progress_key=3f2a``. The response holds the number of ``rows`` written
+    so far, the estimated ``total`` and whether the export is ``done``.
+    """
+
+    http_method_names = ['options', 'head', 'get']
+    progress_param = 'progress_key'
+
+    def get(self, request, *args, **kwargs):
+        """
+        Default get method.
+
+        :param request: request
+        :type request: HttpRequest
+        :returns: JsonResponse
+        """
+        token = request.GET.get(self.progress_param)
+        progress = cache.get(get_progress_cache_key(token)) if token else None
+        if progress is None:
+            return JsonResponse({'error': 'Unknown export.'}, status=404)
+        return JsonResponse(progress)
+
+
+class ExportCSVBundle(View):
+    """Generic View class which streams a ZIP archive containing one CSV file
+    (or one file in the ``output_format`` of the view, named after
+    :func:`ExportCSV.get_output_filename`) for every :class:`ExportCSV`
+    view in ``views``.
+
+    Entries are generated one after another while the archive is being sent,
+    so neither temporary files nor whole CSV files are kept.
+
+    .. note:: Requires Python 3.6 or newer.
+    """
+
+    http_method_names = ['options', 'head', 'get']
+    views = None
+    """
+    List of :class:`ExportCSV` subclasses. If omitted, :func:`get_views`
+    method must be overridden.
+    """
+
+    filename = 'export.zip'
+    """
+    Name used for the ZIP file generated.
+    """
+
+    compression = zipfile.ZIP_DEFLATED
+    """
+    Compression method of the ZIP entries. Use :data:`zipfile.ZIP_STORED` to
+    store the CSV files uncompressed.
+    """
+
+    concurrent = False
+    """
+    Set this to ``True`` to render the CSV files in worker threads while
+    earlier entries are being written. Each worker uses its own database
+    connection.
+    """
+
+    max_workers = 4
+    """
+    Maximum number of worker threads used when ``concurrent`` is ``True``.
+    """
+
+    queue_size = 64
+    """
+    Maximum number of rendered chunks buffered per entry when ``concurrent``
+    is ``True``.
+    """
+
+    consistent_snapshot = False
+    """
+    Set this to ``True`` to export all the files from one snapshot of the
+    ``using`` database (see :func:`export_csv.db.snapshot`). Concurrent
+    workers share the snapshot on PostgreSQL only; on other databases, each
+    file is consistent on its own.
+    """
+
+    using = None
+    """
+    Alias of the database of the snapshot when ``consistent_snapshot`` is
+    ``True``. Defaults to the default database.
+    """
+
+    _content_type = 'application/zip'
+
+    def get_views(self):
+        """Returns the view classes whose CSV files are bundled.
+
+        :raises: ImproperlyConfigured
+
+        :returns: list
+        """
+        if not self.views:
+            raise ImproperlyConfigured(
+                _("No views to bundle. Either provide views or override "
+                  "get_views method."))
+        return self.views
+
+    def get_filename(self):
+        """Returns the filename of the ZIP file.
+
+        :returns: str
+        """
+        return self.filename
+
+    def get_view(self, view_class):
+        """Returns an instance of ``view_class`` set up with the current
+        request.
+
+        :param view_class: :class:`ExportCSV` subclass
+        :returns: :class:`ExportCSV`
+        """
+        view = view_class()
+        view.request = self.request
+        view.args = self.args
+        view.kwargs = self.kwargs
+        return view
+
+    def _iter_entries(self):
+        """Yields ``(name, chunks)`` for every view, in the
+        ``output_format`` of the view."""
+        for view_class in self.get_views():
+            chunks, content_type, filename = \
+                self.get_view(view_class)._get_output()
+            yield filename, chunks
+
+    def _iter_entries_concurrently(self, snapshot_id=None):
+        """Yields ``(name, chunks)`` for every view, rendering the views in
+        worker threads."""
+        views = [self.get_view(view_class) for view_class in self.get_views()]
+        if self.consistent_snapshot:
+            for view in views:
+                view.consistent_snapshot = True
+                view.snapshot_id = snapshot_id
+        outputs = [view._get_output() for view in views]
+        renderers = [_ThreadedRenderer(chunks, self.queue_size)
+                     for chunks, content_type, filename in outputs]
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for renderer in renderers:
+                executor.submit(renderer.run)
+            for output, renderer in zip(outputs, renderers):
+                yield output[2], renderer
+        finally:
+            for renderer in renderers:
+                renderer.cancel()
+            executor.shutdown(wait=False)
+
+    def _iter_entries_in_snapshot(self):
+        """Yields the entries of the views while a snapshot transaction is
+        open, see ``consistent_snapshot``."""
+        using = self.using or DEFAULT_DB_ALIAS
+        with snapshot(using):
+            if self.concurrent:
+                entries = self._iter_entries_concurrently(
+                    export_snapshot(using))
+            else:
+                # the views run their queries in this transaction
+                entries = self._iter_entries()
+            try:
+                for entry in entries:
+                    yield entry
+            finally:
+                entries.close()
+
+    def iter_zip(self):
+        """Yields the ZIP archive chunk by chunk.
+
+        :returns: generator of bytes
+        """
+        if self.consistent_snapshot:
+            entries = self._iter_entries_in_snapshot()
+        elif self.concurrent:
+            entries = self._iter_entries_concurrently()
+        else:
+            entries = self._iter_entries()
+        return iter_zip(entries, compression=self.compression)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Default get method.
+
+        :param request: request
+        :type request: HttpRequest
+        :returns: StreamingHttpResponse
+        """
+        response = StreamingHttpResponse(self.iter_zip(),
+                                         content_type=self._content_type)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+            self.get_filename())
+        return response
+
+
+class ImportCSV(CSVColumnsMixin, View):
+    """Generic View class which handles importing an uploaded CSV file into
+    ``model``.
+
+    The columns are mapped to fields the same way :class:`ExportCSV` maps
+    them: by ``field_names`` and, if ``add_col_names`` is ``True``, by the
+    header row (``col_names`` or field names). The file is parsed row by row
+    and the objects are validated and created in batches of ``batch_size``
+    with :func:`bulk_create`, each batch in its own transaction.
+
+    .. note:: ``Model.save`` and the ``pre_save``/``post_save`` signals are
+        not called. Foreign key columns hold primary keys.
+    """
+
+    http_method_names = ['options', 'post']
+
+    file_field = 'file'
+    """
+    Name of the uploaded file in ``request.FILES``.
+    """
+
+    batch_size = 1000
+    """
+    Number of rows validated and inserted at once.
+    """
+
+    max_errors = 100
+    """
+    Maximum number of row errors included in the report. Rows are still
+    counted past this number.
+    """
+
+    natural_key = None
+    """
+    Name of a unique field identifying the objects, e.g. an account number.
+    If provided, rows whose key already exists update the existing object,
+    only if at least one of their values changed, and the other rows create
+    new objects.
+    """
+
+    using = None
+    """
+    Alias of the database objects are created in. If omitted, the database
+    returned by the routers is used.
+    """
+
+    _csv_reader_dialect = 'excel'
+
+    def get_csv_reader_dialect(self):
+        """Returns the dialect to be used with :func:`csv.reader`.
+
+        :returns: str
+        """
+        return self._csv_reader_dialect
+
+    def get_csv_reader_kwargs(self, **kwargs):
+        """Returns the kwargs to be passed to :func:`csv.reader`.
+
+        :param kwargs: kwargs to be passed to :func:`csv.reader`
+        :type kwargs: dict
+        :returns: dict -- kwargs to be passed to :func:`csv.reader`
+        """
+        return kwargs
+
+    def get_database_alias(self):
+        """Returns the alias of the database objects are created in.
+
+        :returns: str
+        """
+        if self.using is not None:
+            return self.using
+        return router.db_for_write(self.model)
+
+    def _get_columns(self, header):
+        """Returns the field name of every column of the file.
+
+        :param header: header row, or ``None`` if the file has none
+        :raises: ValidationError
+        :returns: list
+        """
+        field_names = self.get_field_names()
+        if header is None:
+            return list(field_names)
+        names = dict((force_text(col_name).strip(), field_name)
+                     for col_name, field_name
+                     in zip(self.get_col_names(), field_names))
+        names.update((field_name, field_name) for field_name in field_names)
+        columns = []
+        for col_name in header:
+            col_name = col_name.strip()
+            if col_name not in names:
+                raise ValidationError(_('Unknown column "%(col_name)s".'),
+                                      params={'col_name': col_name})
+            columns.append(names[col_name])
+        return columns
+
+    def _get_converters(self, columns):
+        """Returns a ``(field, convert)`` pair for every column.
+
+        ``convert`` turns the text of a cell into the value assigned to
+        ``field.attname``. If defined, ``clean_<field_name>`` method is used
+        for that.
+        """
+        if self.model is None:
+            raise NoModelFoundException(
+                _("No model to import into. Provide a model."))
+        converters = []
+        for column in columns:
+            field = self.model._meta.get_field(column)
+            convert = getattr(self, 'clean_%s' % column, None)
+            if convert is None:
+                # empty cells of non-text fields are NULL
+                if field.many_to_one:
+                    convert = functools.partial(_to_related_key,
+                                                field.target_field)
+                elif field.null or not field.empty_strings_allowed:
+                    convert = _empty_to_none
+                else:
+                    convert = _identity
+            converters.append((field, convert))
+        return converters
+
+    def _add_error(self, report, line, error):
+        report['error_count'] += 1
+        if len(report['errors']) < self.max_errors:
+            if isinstance(error, ValidationError):
+                messages = (error.message_dict if hasattr(error, 'error_dict')
+                            else {'__all__': error.messages})
+            else:
+                messages = {'__all__': [force_text(error)]}
+            report['errors'].append({'line': line, 'errors': messages})
+
+    def _validate_relations(self, batch, converters, report):
+        """Checks that foreign keys of the batch exist, with one query per
+        foreign key column, and returns the valid part of the batch."""
+        invalid = set()
+        for field, _convert in converters:
+            if not field.is_relation or not field.many_to_one:
+                continue
+            values = set(getattr(instance, field.attname)
+                         for _line, instance in batch) - set([None])
+            if not values:
+                continue
+            target = field.target_field.attname
+            existing = set(
+                field.remote_field.model._base_manager
+                .using(self.get_database_alias())
+                .filter(**{'%s__in' % target: values})
+                .values_list(target, flat=True))
+            for line, instance in batch:
+                value = getattr(instance, field.attname)
+                if value is not None and value not in existing:
+                    invalid.add(line)
+                    self._add_error(report, line, ValidationError(
+                        {field.name: [_('Object does not exist.')]}))
+        return [item for item in batch if item[0] not in invalid]
+
+    def _diff_batch(self, batch, converters, report, using):
+        """Splits ``batch`` into objects to create and changed objects to
+        update, loading the existing rows with a single query.
+
+        :returns: tuple -- ``(create, update, update_fields)``
+        """
+        key_field = self.model._meta.get_field(self.natural_key)
+        pk_attname = self.model._meta.pk.attname
+        attnames = [field.attname for field, _convert in converters]
+        keyed = {}
+        for line, instance in batch:
+            key = getattr(instance, key_field.attname)
+            if key in keyed:
+                self._add_error(report, line, ValidationError(
+                    {key_field.name: [_('Duplicate key in the file.')]}))
+                continue
+            keyed[key] = (line, instance)
+        existing = dict(
+            (values[key_field.attname], values) for values in
+            self.model._default_manager.using(using)
+            .filter(**{'%s__in' % key_field.attname: list(keyed)})
+            .values(pk_attname, *attnames))
+        create, update, update_fields = [], [], []
+        for key, (line, instance) in keyed.items():
+            old = existing.get(key)
+            if old is None:
+                create.append((line, instance))
+                continue
+            changed = [field.name for field, _convert in converters
+                       if getattr(instance, field.attname) !=
+                       old[field.attname]]
+            if not changed:
+                report['unchanged'] += 1
+                continue
+            setattr(instance, pk_attname, old[pk_attname])
+            update.append((line, instance))
+            update_fields.extend(name for name in changed
+                                 if name not in update_fields)
+        return create, update, update_fields
+
+    def _validate_unique(self, batch, converters, report, using):
+        """Checks the unique columns of ``batch``, except ``natural_key``,
+        with one query per column and returns the valid part of the batch.
+
+        Values must not repeat in the batch nor belong to another existing
+        object (objects to update have their primary key set already).
+        """
+        opts = self.model._meta
+        pk_attname = opts.pk.attname
+        invalid = set()
+        for field, _convert in converters:
+            if not field.unique or field.name == self.natural_key:
+                continue
+            values = set(getattr(instance, field.attname)
+                         for _line, instance in batch) - set([None])
+            if not values:
+                continue
+            existing = dict(
+                self.model._base_manager.using(using)
+                .filter(**{'%s__in' % field.attname: values})
+                .values_list(field.attname, pk_attname))
+            seen = set()
+            for line, instance in batch:
+                value = getattr(instance, field.attname)
+                if value is None or line in invalid:
+                    continue
+                if value in seen:
+                    error = _('Duplicate value in the file.')
+                elif (value in existing and
+                        existing[value] != getattr(instance, pk_attname)):
+                    error = ValidationError(
+                        field.error_messages['unique'], code='unique',
+                        params={'model_name': opts.verbose_name,
+                                'field_label': field.verbose_name})
+                else:
+                    seen.add(value)
+                    continue
+                invalid.add(line)
+                self._add_error(report, line, ValidationError(
+                    {field.name: [error]}))
+        return [item for item in batch if item[0] not in invalid]
+
+    def _save_rows(self, create, update, update_fields, converters, report,
+                   manager):
+        """Creates and updates the objects one by one, each in its own
+        transaction, so that a database error is reported for its row
+        only."""
+        reset_pk = not any(field.primary_key for field, _convert
+                           in converters)
+        pk_attname = self.model._meta.pk.attname
+        for line, instance in create:
+            if reset_pk:
+                # set by the failed bulk insert on some databases
+                setattr(instance, pk_attname, None)
+            try:
+                with transaction.atomic(using=manager.db):
+                    manager.bulk_create([instance])
+            except DatabaseError as e:
+                self._add_error(report, line, e)
+            else:
+                report['created'] += 1
+        for line, instance in update:
+            try:
+                with transaction.atomic(using=manager.db):
+                    manager.bulk_update([instance], update_fields)
+            except DatabaseError as e:
+                self._add_error(report, line, e)
+            else:
+                report['updated'] += 1
+
+    def _save_batch(self, batch, converters, report):
+        """Validates the relations and unique columns of ``batch`` and
+        creates (or, if ``natural_key`` is set, creates and updates) its
+        objects in one transaction.
+
+        If the database still rejects the batch (e.g. because of a
+        constraint across several columns), its rows are saved again one by
+        one, so that the error is reported for the rows causing it only.
+        """
+        batch = self._validate_relations(batch, converters, report)
+        if not batch:
+            return
+        using = self.get_database_alias()
+        if self.natural_key:
+            create, update, update_fields = self._diff_batch(
+                batch, converters, report, using)
+        else:
+            create, update, update_fields = batch, [], []
+        valid = set(line for line, _instance in self._validate_unique(
+            create + update, converters, report, using))
+        create = [item for item in create if item[0] in valid]
+        update = [item for item in update if item[0] in valid]
+        if not create and not update:
+            return
+        manager = self.model._default_manager.using(using)
+        try:
+            with transaction.atomic(using=using):
+                if create:
+                    manager.bulk_create(
+                        [instance for _line, instance in create],
+                        batch_size=self.batch_size)
+                if update:
+                    manager.bulk_update(
+                        [instance for _line, instance in update],
+                        update_fields, batch_size=self.batch_size)
+        except DatabaseError:
+            self._save_rows(create, update, update_fields, converters,
+                            report, manager)
+        else:
+            report['created'] += len(create)
+            report['updated'] += len(update)
+
+    def import_csv(self, csv_file):
+        """Imports ``csv_file`` and returns a report.
+
+        The report holds the number of ``rows`` read, the number of objects
+        ``created``, ``updated`` and left ``unchanged``, the ``error_count``
+        and up to ``max_errors`` ``errors``, each with the ``line`` of the
+        row and the messages per field.
+
+        :param csv_file: file opened in binary mode, e.g. an uploaded file
+        :raises: ValidationError if the header row is invalid
+        :returns: dict
+        """
+        encoding = self.get_encoding()
+        if codecs.lookup(encoding).name == 'utf-8':
+            # skip the byte order mark written for Excel, if any
+            encoding = 'utf-8-sig'
+        reader = csv.reader(codecs.iterdecode(csv_file, encoding),
+                            dialect=self.get_csv_reader_dialect(),
+                            **self.get_csv_reader_kwargs())
+        header = next(reader, None) if self.add_col_names else None
+        columns = self._get_columns(header)
+        if self.natural_key and self.natural_key not in columns:
+            raise ValidationError(
+                _('The file has no column for the key "%(key)s".'),
+                params={'key': self.natural_key})
+        converters = self._get_converters(columns)
+        exclude = [f.name for f in self.model._meta.fields
+                   if f.name not in columns or f.many_to_one]
+        report = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0,
+                  'error_count': 0, 'errors': []}
+        batch = []
+        for row in reader:
+            line = reader.line_num
+            report['rows'] += 1
+            if len(row) != len(columns):
+                self._add_error(report, line, ValidationError(
+                    _('Expected %(expected)d columns, got %(got)d.'),
+                    params={'expected': len(columns), 'got': len(row)}))
+                continue
+            try:
+                values = [(field, convert(value))
+                          for (field, convert), value in zip(converters, row)]
+                instance = self.model(**dict(
+                    (field.attname, value) for field, value in values))
+                # foreign keys and unique fields are checked per batch,
+                # other constraints by the database. NULL is valid for
+                # nullable fields even if they are not blank=True.
+                instance.full_clean(
+                    exclude=exclude + [field.name for field, value in values
+                                       if value is None and field.null],
+                    validate_unique=False)
+            except (ValidationError, ValueError, TypeError) as e:
+                self._add_error(report, line, e)
+                continue
+            batch.append((line, instance))
+            if len(batch) >= self.batch_size:
+                self._save_batch(batch, converters, report)
+                batch = []
+        if batch:
+            self._save_batch(batch, converters, report)
+        return report
+
+    def post(self, request, *args, **kwargs):
+        """
+        Default post method.
+
+        :param request: request
+        :type request: HttpRequest
+        :returns: JsonResponse
+        """
+        csv_file = request.FILES.get(self.file_field)
+        if csv_file is None:
+            return JsonResponse({'error': _('No file uploaded.')},
+                                status=400)
+        try:
+            report = self.import_csv(csv_file)
+        except ValidationError as e:
+            return JsonResponse({'error': e.messages}, status=400)
+        return JsonResponse(report)
+
+
+def _is_indexed(field):
+    """Returns whether the column of ``field`` is the first column of an
+    index, so that filtering on it does not scan the table."""
+    if field.primary_key or field.unique or field.db_index:
+        return True
+    opts = field.model._meta
+    for index in opts.indexes:
+        if index.fields and index.fields[0].lstrip('-') == field.name:
+            return True
+    for fields in tuple(opts.index_together) + tuple(opts.unique_together):
+        if fields and fields[0] == field.name:
+            return True
+    return False
+
+
+def _get_verbose_name(model, name):
+    try:
+        return model._meta.get_field(name).verbose_name
+    except FieldDoesNotExist:
+        return name
+
+
+def _to_lookup_value(field, lookup, value):
+    """Converts the query parameter ``value`` of a ``lookup`` on ``field``.
+
+    :raises: ValidationError
+    """
+    if lookup == 'isnull':
+        if value.lower() not in ('true', 'false', '1', '0'):
+            raise ValidationError(_('Expected true or false.'))
+        return value.lower() in ('true', '1')
+    to_python = getattr(field, 'target_field', field).to_python
+    if lookup == 'in':
+        return [to_python(item) for item in value.split(',')]
+    return to_python(value)
+
+
+def _parse_accept(header):
+    """Returns the media types of an ``Accept`` header by decreasing
+    quality, excluding those with a quality of 0."""
+    media_types = []
+    for index, media_range in enumerate(header.split(',')):
+        params = media_range.split(';')
+        quality = 1.0
+        for param in params[1:]:
+            name, sep, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            media_types.append((-quality, index, params[0].strip().lower()))
+    return [media_type for quality, index, media_type in sorted(media_types)]
+
+
+def _iter_chunks(rows, chunk_size):
+    """Yields lists of ``chunk_size`` rows of ``rows``, and closes ``rows``
+    when closed."""
+    chunk = []
+    try:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    finally:
+        _close(rows)
+    if chunk:
+        yield chunk
+
+
+def _get_validator_key(key):
+    return '{}:validator'.format(key)
+
+
+def _identity(value):
+    return value
+
+
+def _to_text(value):
+    return None if value is None else force_text(value)
+
+
+def _empty_to_none(value):
+    # ExportCSV writes NULL as 'None'
+    return None if value in ('', 'None') else value
+
+
+def _to_related_key(target_field, value):
+    if value in ('', 'None'):
+        return None
+    return target_field.to_python(value)
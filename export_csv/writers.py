@@ -0,0 +1,173 @@
+import codecs
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class CSVWriter(object):
+    """Writes rows as CSV into a reusable in-memory buffer and returns them
+    encoded as bytes.
+
+    Rows are written in chunks: the text of a whole chunk is encoded with a
+    single call, instead of encoding and writing every row separately.
+
+    For ``utf-8-sig``, the byte order mark is not part of the chunks but
+    available as :attr:`bom`, so that it is written only once per file.
+
+    :param encoding: name of the output encoding, e.g. ``utf-8``,
+        ``utf-8-sig`` or ``cp1252``
+    :param errors: error handler of the encoding, e.g. ``strict`` or
+        ``replace``
+    :param dialect: ``dialect`` argument of :func:`csv.writer`
+    :param fmtparams: formatting parameters of :func:`csv.writer`
+    """
+
+    content_type = 'text/csv'
+    """
+    Content type of the output, without the charset.
+    """
+
+    extension = '.csv'
+    """
+    File extension of the output.
+    """
+
+    typed = False
+    """
+    Whether the writer takes the values of plain fields as they are
+    (numbers, dates, ``None``...) instead of text.
+    """
+
+    has_header = True
+    """
+    Whether the output starts with a header row of column names when
+    ``add_col_names`` is ``True``.
+    """
+
+    def __init__(self, encoding='utf-8', errors='strict', dialect='excel',
+                 **fmtparams):
+        if codecs.lookup(encoding).name == 'utf-8-sig':
+            self.bom = codecs.BOM_UTF8
+            encoding = 'utf-8'
+        else:
+            self.bom = b''
+        self.encoding = encoding
+        self.errors = errors
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, dialect=dialect, **fmtparams)
+
+    def _flush(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data.encode(self.encoding, self.errors)
+
+    def write_rows(self, rows):
+        """Returns ``rows`` as encoded CSV.
+
+        :param rows: iterable of lists
+        :returns: bytes
+        """
+        self._writer.writerows(rows)
+        return self._flush()
+
+    def write_row(self, row):
+        """Returns ``row`` as encoded CSV.
+
+        :param row: list
+        :returns: bytes
+        """
+        self._writer.writerow(row)
+        return self._flush()
+
+
+class TSVWriter(CSVWriter):
+    """Writes rows as tab-separated values, see :class:`CSVWriter`."""
+
+    content_type = 'text/tab-separated-values'
+    extension = '.tsv'
+
+    def __init__(self, encoding='utf-8', errors='strict', dialect='excel-tab',
+                 **fmtparams):
+        fmtparams['delimiter'] = '\t'
+        super(TSVWriter, self).__init__(encoding, errors, dialect,
+                                        **fmtparams)
+
+
+class NDJSONWriter(object):
+    """Writes rows as JSON Lines (newline-delimited JSON), one object keyed
+    by the field names per row, and returns them encoded as bytes.
+
+    A whole chunk is serialized with a single call of the JSON encoder: the
+    rows are encoded as one list whose items are separated by a NUL
+    character, which is always escaped inside JSON strings, and the list is
+    then split into lines. Chunks holding nested lists of objects, where
+    the split would be ambiguous, are encoded row by row.
+
+    :param names: field names, the keys of the objects
+    :type names: list
+    :param encoding: name of the output encoding. ``utf-8-sig`` is written
+        as ``utf-8``, since JSON Lines have no byte order mark.
+    :param errors: error handler of the encoding
+    :param cls: :class:`json.JSONEncoder` subclass encoding the values.
+        :class:`DjangoJSONEncoder` encodes dates, times, decimals and UUIDs
+        as strings.
+    """
+
+    content_type = 'application/x-ndjson'
+    extension = '.ndjson'
+    typed = True
+    has_header = False
+    bom = b''
+
+    _separator = ',\x00'
+    _row_separator = '},\x00{'
+
+    def __init__(self, names, encoding='utf-8', errors='strict',
+                 cls=DjangoJSONEncoder):
+        self.names = list(names)
+        if codecs.lookup(encoding).name == 'utf-8-sig':
+            encoding = 'utf-8'
+        self.encoding = encoding
+        self.errors = errors
+        self._encoder = cls(ensure_ascii=False,
+                            separators=(self._separator, ':'))
+        self._row_encoder = cls(ensure_ascii=False, separators=(',', ':'))
+
+    def write_rows(self, rows):
+        """Returns ``rows`` as encoded JSON Lines.
+
+        :param rows: iterable of lists
+        :returns: bytes
+        """
+        names = self.names
+        objects = [dict(zip(names, row)) for row in rows]
+        if not objects:
+            return b''
+        text = self._encoder.encode(objects)
+        if text.count(self._row_separator) == len(objects) - 1:
+            text = text[1:-1].replace(self._row_separator, '}\n{').replace(
+                self._separator, ',')
+        else:
+            text = '\n'.join(self._row_encoder.encode(obj)
+                              for obj in objects)
+        return (text + '\n').encode(self.encoding, self.errors)
+
+    def write_row(self, row):
+        """Returns ``row`` as an encoded JSON line.
+
+        :param row: list
+        :returns: bytes
+        """
+        return self.write_rows([row])
+
+
+WRITER_CLASSES = {
+    'csv': CSVWriter,
+    'tsv': TSVWriter,
+    'ndjson': NDJSONWriter,
+}
+"""
+Writer class of every row-oriented output format.
+"""
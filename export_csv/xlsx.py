@@ -0,0 +1,229 @@
+import datetime
+import decimal
+import re
+
+from django.utils import timezone
+from django.utils.encoding import force_bytes, force_text
+
+from .zipstream import iter_zip
+
+XLSX_CONTENT_TYPE = ('application/vnd.openxmlformats-officedocument.'
+                     'spreadsheetml.sheet')
+
+MAX_ROWS = 1048576
+"""
+Maximum number of rows of an Excel worksheet.
+"""
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'content-types">'
+    '<Default Extension="rels" ContentType="application/'
+    'vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>')
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>')
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/'
+    'main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/'
+    'relationships">'
+    '<sheets><sheet name="{}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>')
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>')
+
+# cell styles: 0 general, 1 date and time, 2 date, 3 time
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/'
+    '2006/main">'
+    '<numFmts count="1">'
+    '<numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/>'
+    '</numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/>'
+    '</border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" '
+    'borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" '
+    'applyNumberFormat="1"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" '
+    'applyNumberFormat="1"/>'
+    '<xf numFmtId="21" fontId="0" fillId="0" borderId="0" xfId="0" '
+    'applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '</styleSheet>')
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/'
+    'main"><sheetData>')
+
+_SHEET_END = '</sheetData></worksheet>'
+
+_EPOCH = datetime.datetime(1899, 12, 30)
+
+# characters which are not allowed in XML 1.0
+_ILLEGAL_CHARACTERS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# characters which are not allowed in sheet names
+_ILLEGAL_SHEET_CHARACTERS = re.compile(r'[\[\]:*?/\\]')
+
+
+def _escape(text):
+    text = _ILLEGAL_CHARACTERS.sub('', text)
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace(
+        '>', '&gt;')
+
+
+def get_column_letter(index):
+    """Returns the letters of the column number ``index`` (starting at 0),
+    e.g. ``A``, ``Z`` or ``AA``.
+
+    :returns: str
+    """
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _to_serial(value):
+    """Returns the Excel serial number of a date, time or datetime."""
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.make_naive(value)
+        return (value - _EPOCH).total_seconds() / 86400
+    if isinstance(value, datetime.date):
+        return (value - _EPOCH.date()).days
+    return (value.hour * 3600 + value.minute * 60 + value.second +
+            value.microsecond / 1e6) / 86400
+
+
+class XLSXWriter(object):
+    """Writes rows as the XML of an Excel worksheet and returns them encoded
+    as bytes.
+
+    Strings are written inline (no shared strings table) and nothing is
+    kept between chunks but the row number, so memory does not grow with
+    the number of rows. Numbers, booleans, dates and times are written as
+    typed cells, ``None`` as empty cells and anything else as text.
+    """
+
+    bom = b''
+
+    def __init__(self):
+        self.rows = 0
+        self._letters = []
+
+    def _get_cell(self, ref, value):
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return '<c r="{}" t="b"><v>{:d}</v></c>'.format(ref, value)
+        if isinstance(value, (int, float, decimal.Decimal)):
+            return '<c r="{}"><v>{}</v></c>'.format(ref, value)
+        if isinstance(value, datetime.datetime):
+            style = 1
+        elif isinstance(value, datetime.date):
+            style = 2
+        elif isinstance(value, datetime.time):
+            style = 3
+        else:
+            return ('<c r="{}" t="inlineStr"><is><t xml:space="preserve">{}'
+                    '</t></is></c>'.format(ref, _escape(force_text(value))))
+        return '<c r="{}" s="{}"><v>{!r}</v></c>'.format(
+            ref, style, _to_serial(value))
+
+    def write_rows(self, rows):
+        """Returns ``rows`` as encoded worksheet rows.
+
+        :param rows: iterable of lists
+        :raises: ValueError if the worksheet would exceed :data:`MAX_ROWS`
+        :returns: bytes
+        """
+        xml = []
+        letters = self._letters
+        for row in rows:
+            self.rows += 1
+            if self.rows > MAX_ROWS:
+                raise ValueError(
+                    'An Excel worksheet has at most {} rows.'.format(MAX_ROWS))
+            while len(letters) < len(row):
+                letters.append(get_column_letter(len(letters)))
+            number = str(self.rows)
+            xml.append('<row r="{}">'.format(number))
+            xml.extend(self._get_cell(letter + number, value)
+                       for letter, value in zip(letters, row))
+            xml.append('</row>')
+        return ''.join(xml).encode('utf-8')
+
+    def write_row(self, row):
+        """Returns ``row`` as an encoded worksheet row.
+
+        :param row: list
+        :returns: bytes
+        """
+        return self.write_rows([row])
+
+
+def _iter_sheet(chunks):
+    yield force_bytes(_SHEET_START)
+    for chunk in chunks:
+        yield chunk
+    yield force_bytes(_SHEET_END)
+
+
+def iter_xlsx(chunks, sheet_name='Sheet1'):
+    """Yields an Excel workbook of a single worksheet chunk by chunk.
+
+    :param chunks: iterable of worksheet rows encoded by
+        :class:`XLSXWriter`, consumed lazily
+    :param sheet_name: name of the worksheet
+    :returns: generator of bytes
+    """
+    # sheet names are limited to 31 characters
+    sheet_name = _ILLEGAL_SHEET_CHARACTERS.sub('', force_text(sheet_name))
+    sheet_name = _escape(sheet_name[:31] or 'Sheet1').replace('"', '&quot;')
+    entries = [
+        ('[Content_Types].xml', [force_bytes(_CONTENT_TYPES)]),
+        ('_rels/.rels', [force_bytes(_RELS)]),
+        ('xl/workbook.xml', [force_bytes(_WORKBOOK.format(sheet_name))]),
+        ('xl/_rels/workbook.xml.rels', [force_bytes(_WORKBOOK_RELS)]),
+        ('xl/styles.xml', [force_bytes(_STYLES)]),
+        ('xl/worksheets/sheet1.xml', _iter_sheet(chunks)),
+    ]
+    return iter_zip(entries)
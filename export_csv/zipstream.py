@@ -0,0 +1,55 @@
+import time
+import zipfile
+
+
+class _ZipBuffer(object):
+    """Unseekable file-like object collecting the bytes written by
+    :class:`zipfile.ZipFile` until they are drained.
+
+    As it is not seekable, :class:`zipfile.ZipFile` writes a data descriptor
+    after every entry instead of seeking back to patch the local header.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Returns and forgets the bytes written since the last call."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """Yields a ZIP archive chunk by chunk.
+
+    :param entries: iterable of ``(name, chunks)`` tuples, where ``chunks``
+        is an iterable of bytes. Entries and their chunks are consumed
+        lazily, one after another.
+    :param compression: :data:`zipfile.ZIP_DEFLATED` or
+        :data:`zipfile.ZIP_STORED`
+    :returns: generator of bytes
+    """
+    buf = _ZipBuffer()
+    with zipfile.ZipFile(buf, mode='w', compression=compression,
+                         allowZip64=True) as archive:
+        for name, chunks in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = compression
+            info.external_attr = 0o644 << 16
+            # the size is unknown beforehand, so always allow ZIP64 sizes
+            with archive.open(info, mode='w', force_zip64=True) as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    data = buf.drain()
+                    if data:
+                        yield data
+            yield buf.drain()
+    yield buf.drain()
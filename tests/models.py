@@ -1,9 +1,9 @@
+import uuid
+
 from django.db import models
 from django.utils import timezone
-from django.utils.encoding import python_2_unicode_compatible
 
 
-@python_2_unicode_compatible
 class Customer(models.Model):
     name = models.CharField(max_length=200)
     address = models.CharField(max_length=500)
@@ -16,3 +16,22 @@ class Customer(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class Account(models.Model):
+    owner = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    account_no = models.CharField(max_length=200, unique=True)
+    balance = models.DecimalField(max_digits=10, decimal_places=2)
+    creation_date = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return self.account_no
+
+
+class Document(models.Model):
+    title = models.CharField(max_length=200)
+    file = models.FileField(upload_to='documents')
+    key = models.UUIDField(default=uuid.uuid4)
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.contrib.admin import AdminSite, ModelAdmin
+from django.contrib.admin.options import IS_POPUP_VAR
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from export_csv.admin import ExportCSVAdminMixin, export_csv_action
+from export_csv.views import ExportCSV
+
+from .models import Customer
+
+
+class CustomerCSV(ExportCSV):
+    model = Customer
+    field_names = ['name', 'is_active']
+    add_col_names = True
+    filename = 'customers.csv'
+
+    def clean_name(self, value):
+        return value.upper()
+
+
+class CustomerAdmin(ExportCSVAdminMixin, ModelAdmin):
+    export_csv_view = CustomerCSV
+
+
+class ExportCSVActionTests(TestCase):
+
+    def setUp(self):
+        for i in range(5):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=bool(i % 2),
+                                    last_updated=timezone.now())
+        self.request = RequestFactory().post('/admin/tests/customer/')
+        self.request.user = mock.Mock(is_staff=True)
+        self.modeladmin = CustomerAdmin(Customer, AdminSite())
+
+    def test_action(self):
+        action = export_csv_action(CustomerCSV, chunk_size=2)
+        queryset = Customer.objects.filter(is_active=True).order_by('name')
+        response = action(self.modeladmin, self.request, queryset)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn('customers.csv', response['Content-Disposition'])
+        self.assertEqual(b'name,Is Active\r\nNAME1,True\r\nNAME3,True\r\n',
+                         b''.join(response.streaming_content))
+
+    def test_action_default_view(self):
+        action = export_csv_action(add_col_names=False)
+        response = action(self.modeladmin, self.request,
+                          Customer.objects.filter(name='name0'))
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'name0,address,False,'))
+
+    def test_mixin(self):
+        self.request.user.has_perm.return_value = True
+        actions = self.modeladmin.get_actions(self.request)
+        action, name, description = actions['export_csv']
+        self.assertEqual('export_csv', name)
+        response = action(self.modeladmin, self.request,
+                          Customer.objects.order_by('name'))
+        self.assertEqual(6, b''.join(response.streaming_content).count(
+            b'\r\n'))
+        self.request.user.has_perm.return_value = False
+        self.assertNotIn('export_csv',
+                         self.modeladmin.get_actions(self.request))
+
+    def test_mixin_without_actions(self):
+        self.request.user.has_perm.return_value = True
+        request = RequestFactory().get('/admin/tests/customer/',
+                                       {IS_POPUP_VAR: '1'})
+        request.user = self.request.user
+        self.assertEqual({}, self.modeladmin.get_actions(request))
+        self.modeladmin.actions = None
+        self.assertEqual({}, self.modeladmin.get_actions(self.request))
@@ -0,0 +1,143 @@
+import io
+import unittest
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.utils import timezone
+
+from export_csv.arrow import ArrowWriter, get_arrow_type, pyarrow
+from export_csv.views import ExportCSV
+
+from .models import Account, Customer, Document
+
+
+class AccountParquet(ExportCSV):
+    model = Account
+    field_names = ['id', 'account_no', 'balance', 'creation_date', 'owner',
+                   'owner__is_active']
+    output_format = 'parquet'
+    chunk_size = 2
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class ArrowExportTests(TestCase):
+
+    def setUp(self):
+        customer = Customer.objects.create(name='name', address='address',
+                                           is_active=True)
+        for i in range(5):
+            Account.objects.create(owner=customer, account_no='no%d' % i,
+                                   balance=Decimal('1.5') * i,
+                                   creation_date=timezone.now() if i else None)
+
+    def get(self, **kwargs):
+        view = AccountParquet.as_view(**kwargs)
+        response = view(RequestFactory().get(''))
+        if response.streaming:
+            return response, b''.join(response.streaming_content)
+        return response, response.content
+
+    def test_parquet(self):
+        import pyarrow.parquet
+        response, content = self.get()
+        self.assertEqual('application/vnd.apache.parquet',
+                         response['Content-Type'])
+        self.assertIn('.parquet"', response['Content-Disposition'])
+        parquet_file = pyarrow.parquet.ParquetFile(io.BytesIO(content))
+        # one row group per chunk
+        self.assertEqual(3, parquet_file.num_row_groups)
+        table = parquet_file.read()
+        self.assertEqual(pyarrow.int64(), table.schema.field('id').type)
+        self.assertEqual(pyarrow.decimal128(10, 2),
+                         table.schema.field('balance').type)
+        self.assertTrue(pyarrow.types.is_timestamp(
+            table.schema.field('creation_date').type))
+        # relations and paths are formatted as text
+        self.assertEqual(pyarrow.string(), table.schema.field('owner').type)
+        self.assertEqual(pyarrow.string(),
+                         table.schema.field('owner__is_active').type)
+        rows = table.to_pydict()
+        self.assertEqual(Decimal('6.00'), rows['balance'][4])
+        self.assertIsNone(rows['creation_date'][0])
+        self.assertEqual(['name'] * 5, rows['owner'])
+        self.assertEqual(['True'] * 5, rows['owner__is_active'])
+
+    def test_arrow_stream(self):
+        import pyarrow.ipc
+        response, content = self.get(output_format='arrow', streaming=False)
+        self.assertEqual('application/vnd.apache.arrow.stream',
+                         response['Content-Type'])
+        table = pyarrow.ipc.open_stream(content).read_all()
+        self.assertEqual(5, table.num_rows)
+        self.assertEqual(['no%d' % i for i in range(5)],
+                         table.column('account_no').to_pylist())
+
+    def test_clean_hook_is_text(self):
+        import pyarrow.parquet
+
+        class View(AccountParquet):
+            field_names = ['balance']
+
+            def clean_balance(self, value):
+                return 'EUR %s' % value
+
+        response = View.as_view(streaming=False)(RequestFactory().get(''))
+        table = pyarrow.parquet.read_table(io.BytesIO(response.content))
+        self.assertEqual(pyarrow.string(), table.schema.field('balance').type)
+        self.assertEqual('EUR 0.00', table.column('balance')[0].as_py())
+
+    def test_unknown_format(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.get(output_format='orc', streaming=False)
+
+    def test_uuid(self):
+        import pyarrow.parquet
+        document = Document.objects.create(title='report', file='report.pdf')
+
+        class DocumentParquet(ExportCSV):
+            model = Document
+            field_names = ['title', 'key', 'file']
+            output_format = 'parquet'
+
+        for streaming in (False, True):
+            response = DocumentParquet.as_view(streaming=streaming)(
+                RequestFactory().get(''))
+            if streaming:
+                content = b''.join(response.streaming_content)
+            else:
+                content = response.content
+            table = pyarrow.parquet.read_table(io.BytesIO(content))
+            self.assertEqual(pyarrow.string(), table.schema.field('key').type)
+            self.assertEqual({'title': ['report'],
+                              'key': [str(document.key)],
+                              'file': ['report.pdf']}, table.to_pydict())
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class ArrowTypeTests(SimpleTestCase):
+
+    @unittest.skipIf(not hasattr(models, 'SmallAutoField'),
+                     'SmallAutoField requires Django 3.0')
+    def test_small_auto_field(self):
+        self.assertEqual(pyarrow.int64(),
+                         get_arrow_type(models.SmallAutoField()))
+
+    @unittest.skipIf(not hasattr(models, 'PositiveBigIntegerField'),
+                     'PositiveBigIntegerField requires Django 3.1')
+    def test_positive_big_integer_field(self):
+        self.assertEqual(pyarrow.int64(),
+                         get_arrow_type(models.PositiveBigIntegerField()))
+
+    def test_json(self):
+        if hasattr(models, 'JSONField'):
+            self.assertEqual(pyarrow.string(),
+                             get_arrow_type(models.JSONField()))
+        import pyarrow.ipc
+        writer = ArrowWriter(['data'], [pyarrow.string()], format='arrow')
+        content = writer.write_rows([[{'a': Decimal('1.5')}], [[1, 2]],
+                                     [None]]) + writer.close()
+        table = pyarrow.ipc.open_stream(content).read_all()
+        self.assertEqual(['{"a": "1.5"}', '[1, 2]', None],
+                         table.column('data').to_pylist())
@@ -0,0 +1,175 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.conf.urls import url
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from export_csv.views import ExportCSV
+
+from .models import Account, Customer
+
+
+class ExportCSVCommandTests(TestCase):
+
+    def setUp(self):
+        Customer.objects.create(name='name1', address='address1',
+                                is_active=True, last_updated=timezone.now())
+        Customer.objects.create(name='name2', address='address2',
+                                is_active=True, last_updated=timezone.now())
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.output = os.path.join(self.directory, 'out.csv')
+
+    def export(self, *args, **kwargs):
+        call_command('export_csv', *args, output=self.output,
+                     stderr=StringIO(), **kwargs)
+        with open(self.output, 'rb') as f:
+            return f.read()
+
+    def test_view(self):
+        content = self.export('tests.test_views.CustomerNameCSV',
+                              header=True, chunk_size=1)
+        self.assertEqual(b'name\r\nname1\r\nname2\r\n', content)
+
+    def test_model(self):
+        content = self.export(model='tests.Customer', fields='name,address')
+        self.assertEqual(b'name1,address1\r\nname2,address2\r\n', content)
+
+    def test_gzip(self):
+        self.export('tests.test_views.CustomerNameCSV', compress='gzip')
+        with gzip.open(self.output) as f:
+            self.assertEqual(b'name1\r\nname2\r\n', f.read())
+
+    def test_format(self):
+        content = self.export('tests.test_views.CustomerNameCSV',
+                              format='ndjson')
+        self.assertEqual(b'{"name":"name1"}\n{"name":"name2"}\n', content)
+
+    def test_output_directory(self):
+        call_command('export_csv', 'tests.test_views.CustomerNameCSV',
+                     format='xlsx', output=self.directory, stderr=StringIO())
+        filenames = [name for name in os.listdir(self.directory)
+                     if name.endswith('.xlsx')]
+        self.assertEqual(1, len(filenames))
+        with open(os.path.join(self.directory, filenames[0]), 'rb') as f:
+            self.assertEqual(b'PK', f.read(2))
+
+    def test_errors(self):
+        self.assertRaises(CommandError, call_command, 'export_csv')
+        self.assertRaises(CommandError, call_command, 'export_csv',
+                          'tests.models.Customer')
+        self.assertRaises(CommandError, call_command, 'export_csv',
+                          model='tests.Unknown')
+        self.assertRaises(CommandError, call_command, 'export_csv',
+                          'tests.test_views.CustomerNameCSV', format='doc',
+                          output=self.output)
+
+
+class OwnerNameCSV(ExportCSV):
+    model = Account
+    field_names = ['account_no', 'owner_name']
+
+    def get_queryset(self):
+        return Account.objects.order_by('balance')
+
+    def get_field_owner_name(self, obj):
+        # reads the owner of every row with its own query
+        return Customer.objects.get(pk=obj.owner_id).name
+
+
+class UserCSV(ExportCSV):
+    field_names = ['name']
+
+    def get_queryset(self):
+        return Customer.objects.filter(name=self.request.user.username)
+
+
+class BrokenCSV(ExportCSV):
+    field_names = ['name']
+
+    def get_queryset(self):
+        raise ValueError('broken')
+
+
+class explain_urls:
+    urlpatterns = [
+        url(r'^accounts/$', OwnerNameCSV.as_view()),
+        url(r'^customers/$', ExportCSV.as_view(
+            model=Customer, field_names=['name'])),
+    ]
+
+
+class ExplainCommandTests(TestCase):
+
+    def setUp(self):
+        for i in range(3):
+            customer = Customer.objects.create(
+                name='name%d' % i, address='address', is_active=True,
+                last_updated=timezone.now())
+            Account.objects.create(owner=customer, account_no=str(i),
+                                   balance=i)
+
+    def explain(self, *args, **kwargs):
+        stdout = StringIO()
+        call_command('export_csv_explain', *args, json=True, stdout=stdout,
+                     **kwargs)
+        return json.loads(stdout.getvalue())
+
+    @override_settings(ROOT_URLCONF=explain_urls)
+    def test_urls(self):
+        reports = self.explain()
+        self.assertEqual(['tests.test_commands.OwnerNameCSV',
+                          'export_csv.views.ExportCSV'],
+                         [report['view'] for report in reports])
+        accounts, customers = reports
+        self.assertEqual('tests.Account', accounts['model'])
+        self.assertEqual(3, accounts['sample_rows'])
+        self.assertEqual([('account_no', 'field', 0),
+                          ('owner_name', 'hook', 3)],
+                         [(c['name'], c['kind'], c['queries'])
+                          for c in accounts['columns']])
+        self.assertEqual(4, accounts['queries_per_chunk'])
+        self.assertEqual(2, len(accounts['warnings']))
+        self.assertIn('"balance"', accounts['warnings'][0])
+        self.assertIn('"owner_name"', accounts['warnings'][1])
+        self.assertIn('ORDER BY', accounts['sql'])
+        self.assertTrue(accounts['explain'])
+        self.assertEqual([], customers['warnings'])
+        self.assertEqual(1, customers['queries_per_chunk'])
+
+    def test_view(self):
+        reports = self.explain('tests.test_commands.OwnerNameCSV',
+                               sample=False)
+        self.assertEqual(1, len(reports))
+        self.assertNotIn('queries_per_chunk', reports[0])
+        self.assertEqual(1, len(reports[0]['warnings']))
+
+    def test_text(self):
+        stdout = StringIO()
+        call_command('export_csv_explain',
+                     'tests.test_commands.OwnerNameCSV', stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn('Queries per chunk: 4 (3 rows read)', output)
+        self.assertIn('Warning: Column "owner_name" ran 3 queries', output)
+
+    def test_fail_on_warnings(self):
+        self.assertRaises(CommandError, call_command, 'export_csv_explain',
+                          'tests.test_commands.OwnerNameCSV',
+                          fail_on_warnings=True, stdout=StringIO())
+        self.assertRaises(CommandError, call_command, 'export_csv_explain',
+                          'tests.models.Customer')
+
+    def test_errors(self):
+        reports = self.explain('tests.test_commands.UserCSV')
+        self.assertEqual(1, len(reports[0]['warnings']))
+        self.assertIn('without a request', reports[0]['warnings'][0])
+        # other errors are not hidden
+        with self.assertRaisesMessage(ValueError, 'broken'):
+            self.explain('tests.test_commands.BrokenCSV')
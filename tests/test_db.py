@@ -0,0 +1,153 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from export_csv.db import (
+    SAMPLE_SEGMENTS, _sample_postgresql, estimate_count, export_snapshot,
+    preview_queryset, snapshot, statement_timeout)
+
+from .models import Customer
+
+
+class EstimateCountTests(TestCase):
+
+    def setUp(self):
+        for i in range(3):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=bool(i),
+                                    last_updated=timezone.now())
+
+    def test_estimate_count_exact(self):
+        self.assertEqual(3, estimate_count(Customer.objects.all()))
+        self.assertEqual(2, estimate_count(
+            Customer.objects.filter(is_active=True)))
+
+    def test_estimate_count_planner(self):
+        estimator = mock.Mock(return_value=5000000)
+        with mock.patch.dict('export_csv.db._estimators',
+                             {'sqlite': estimator}):
+            with self.assertNumQueries(0):
+                estimate = estimate_count(Customer.objects.all())
+        self.assertEqual(5000000, estimate)
+
+    def test_estimate_count_small_table(self):
+        estimator = mock.Mock(return_value=10)
+        with mock.patch.dict('export_csv.db._estimators',
+                             {'sqlite': estimator}):
+            self.assertEqual(3, estimate_count(Customer.objects.all()))
+
+
+class StatementTimeoutTests(TestCase):
+
+    def get_connection(self, vendor, previous):
+        connection = mock.MagicMock(vendor=vendor)
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = [previous]
+        return connection, cursor
+
+    def test_postgresql(self):
+        connection, cursor = self.get_connection('postgresql', '0')
+        with mock.patch.dict('export_csv.db.connections',
+                             {'default': connection}):
+            with statement_timeout('default', 1.5):
+                self.assertEqual(
+                    mock.call('SET statement_timeout = %s', [1500]),
+                    cursor.execute.call_args)
+        self.assertEqual(mock.call('SET statement_timeout = %s', ['0']),
+                         cursor.execute.call_args)
+
+    def test_mysql(self):
+        connection, cursor = self.get_connection('mysql', 0)
+        cursor.db.mysql_is_mariadb = False
+        with mock.patch.dict('export_csv.db.connections',
+                             {'default': connection}):
+            with statement_timeout('default', 2):
+                self.assertEqual(
+                    mock.call('SET SESSION max_execution_time = %s', [2000]),
+                    cursor.execute.call_args)
+        self.assertEqual(
+            mock.call('SET SESSION max_execution_time = %s', [0]),
+            cursor.execute.call_args)
+
+    def test_unsupported(self):
+        with self.assertNumQueries(0):
+            with statement_timeout('default', 1):
+                pass
+
+
+class SnapshotTests(TransactionTestCase):
+
+    def test_snapshot(self):
+        with snapshot('default'):
+            self.assertTrue(connection.in_atomic_block)
+            self.assertIsNone(export_snapshot('default'))
+        self.assertFalse(connection.in_atomic_block)
+        with snapshot('default', enabled=False):
+            self.assertFalse(connection.in_atomic_block)
+
+    def test_isolation_statement(self):
+        with mock.patch.dict('export_csv.db._snapshot_statements',
+                             {'sqlite': 'SELECT 1'}):
+            with CaptureQueriesContext(connection) as queries:
+                with snapshot('default'):
+                    Customer.objects.count()
+        # the first statement of the transaction
+        self.assertEqual(['BEGIN', 'SELECT 1'],
+                         [query['sql'] for query in queries[:2]])
+
+    def test_postgresql(self):
+        pg_connection = mock.MagicMock(vendor='postgresql',
+                                       in_atomic_block=False)
+        cursor = pg_connection.cursor.return_value.__enter__.return_value
+        with mock.patch.dict('export_csv.db.connections',
+                             {'default': pg_connection}):
+            with snapshot('default', snapshot_id='00000003-1'):
+                pass
+            self.assertEqual([
+                mock.call('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, '
+                          'READ ONLY'),
+                mock.call('SET TRANSACTION SNAPSHOT %s', ['00000003-1'])],
+                cursor.execute.call_args_list)
+            pg_connection.in_atomic_block = True
+            cursor.fetchone.return_value = ['00000003-2']
+            self.assertEqual('00000003-2', export_snapshot('default'))
+
+
+class PreviewQuerysetTests(TestCase):
+
+    def setUp(self):
+        for i in range(50):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=bool(i % 2),
+                                    last_updated=timezone.now())
+
+    def test_head(self):
+        queryset = Customer.objects.order_by('name')
+        with self.assertNumQueries(1):
+            preview = list(preview_queryset(queryset, 3))
+        self.assertEqual(list(queryset[:3]), preview)
+
+    def test_sample(self):
+        queryset = Customer.objects.filter(is_active=True).order_by('-pk')
+        with self.assertNumQueries(2 + SAMPLE_SEGMENTS):
+            sample = list(preview_queryset(queryset, 10, sample=True))
+        self.assertTrue(0 < len(sample) <= 10)
+        self.assertTrue(all(obj.is_active for obj in sample))
+        pks = [obj.pk for obj in sample]
+        self.assertEqual(sorted(pks, reverse=True), pks)
+
+    def test_sample_postgresql(self):
+        estimator = mock.Mock(return_value=1000000)
+        with mock.patch.dict('export_csv.db._estimators',
+                             {'sqlite': estimator}), \
+                mock.patch.dict('export_csv.db._samplers',
+                                {'sqlite': _sample_postgresql}):
+            with self.assertNumQueries(0):
+                sample = preview_queryset(Customer.objects.all(), 100,
+                                          sample=True)
+                sql = str(sample.query)
+        self.assertIn('TABLESAMPLE SYSTEM (0.02)', sql)
+        self.assertIn('LIMIT 100', sql)
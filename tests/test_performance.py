@@ -0,0 +1,221 @@
+"""
+Query count, memory and streaming budgets of the export modes.
+
+The memory budgets are checked by exporting the same view over a small and
+a ten times larger table: the peak memory traced while the export is
+consumed must stay below :data:`MEMORY_BUDGET` and must not grow with the
+number of rows by more than :data:`MEMORY_GROWTH`.
+"""
+
+import shutil
+import tempfile
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from export_csv.segments import get_segments
+from export_csv.views import ExportCSV
+
+from .models import Account, Customer
+
+SMALL = 1000
+LARGE = 10000
+MEMORY_BUDGET = 2 * 1024 * 1024
+MEMORY_GROWTH = 320 * 1024
+
+
+def seed(rows=LARGE):
+    now = timezone.now()
+    Customer.objects.bulk_create([
+        Customer(name='customer %d' % i, address='address %d' % i,
+                 is_active=bool(i % 2), last_updated=now)
+        for i in range(rows)])
+    customers = list(Customer.objects.order_by('pk')[:100])
+    Account.objects.bulk_create([
+        Account(owner=customers[i % 100], account_no='account %d' % i,
+                balance=i)
+        for i in range(rows)])
+
+
+class CustomerCSV(ExportCSV):
+    model = Customer
+    add_col_names = True
+    rows = None
+
+    def get_queryset(self):
+        queryset = Customer.objects.order_by('pk')
+        if self.rows is not None:
+            first = queryset.values_list('pk', flat=True)[0]
+            queryset = queryset.filter(pk__lt=first + self.rows)
+        return queryset
+
+
+class AccountCSV(ExportCSV):
+    model = Account
+    field_names = ['owner', 'account_no', 'balance']
+
+    def get_queryset(self):
+        return Account.objects.select_related('owner')
+
+
+def get_view(view_class=CustomerCSV, **kwargs):
+    view = view_class(**kwargs)
+    view.request = RequestFactory().get('')
+    view.args = ()
+    view.kwargs = {}
+    return view
+
+
+def consume(response):
+    if response.streaming:
+        for chunk in response.streaming_content:
+            pass
+    return response
+
+
+def get_peak_memory(func):
+    """Returns the peak memory in bytes allocated while ``func`` runs."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class MemoryBudgetMixin(object):
+
+    def assertMemoryBudget(self, export):
+        """Asserts that ``export(rows)`` stays within the memory budget for
+        :data:`SMALL` and :data:`LARGE` rows."""
+        # warm up caches (e.g. compiled SQL, imported modules)
+        export(100)
+        small = get_peak_memory(lambda: export(SMALL))
+        large = get_peak_memory(lambda: export(LARGE))
+        self.assertLess(large, MEMORY_BUDGET)
+        self.assertLess(large - small, MEMORY_GROWTH,
+                        'peak memory grows with rows: %d bytes for %d rows, '
+                        '%d bytes for %d rows' % (small, SMALL, large, LARGE))
+
+
+class QueryCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(SMALL)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_response(self):
+        with self.assertNumQueries(1):
+            get_view()._create_csv()
+
+    def test_streaming(self):
+        with self.assertNumQueries(1):
+            consume(get_view(streaming=True)._create_csv())
+
+    def test_select_related(self):
+        with self.assertNumQueries(1):
+            consume(get_view(AccountCSV, streaming=True)._create_csv())
+
+    def test_parts(self):
+        with self.assertNumQueries(1):
+            consume(get_view(part_rows=500)._create_csv())
+
+    def test_progress(self):
+        # count, then the rows
+        with self.assertNumQueries(2):
+            consume(get_view(streaming=True, progress_interval=100,
+                             chunk_size=100)._create_csv())
+
+    def test_preview(self):
+        request = RequestFactory().get('', {'preview': '50'})
+        with self.assertNumQueries(1):
+            CustomerCSV.as_view()(request)
+
+    def test_segments(self):
+        view = get_view(streaming=True, segment_size=500)
+        segments = len(get_segments(Customer.objects.all(), 500))
+        with self.assertNumQueries(1 + segments):
+            consume(view._create_csv())
+        # cached segments cost the aggregate query only
+        with self.assertNumQueries(1):
+            consume(get_view(streaming=True, segment_size=500)._create_csv())
+
+
+class StreamingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(SMALL)
+
+    def test_first_chunk_before_queryset_exhausted(self):
+        for kwargs in [{}, {'part_rows': 500}]:
+            view = get_view(streaming=True, chunk_size=100, **kwargs)
+            fetched = []
+            iter_objects = view._iter_objects
+
+            def _iter_objects(queryset):
+                for obj in iter_objects(queryset):
+                    fetched.append(obj)
+                    yield obj
+            view._iter_objects = _iter_objects
+            response = view._create_csv()
+            next(iter(response.streaming_content))
+            self.assertLess(len(fetched), SMALL, kwargs)
+            response.close()
+
+
+class MemoryBudgetTests(MemoryBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed()
+
+    def test_streaming(self):
+        self.assertMemoryBudget(lambda rows: consume(
+            get_view(streaming=True, rows=rows)._create_csv()))
+
+    def test_parts(self):
+        self.assertMemoryBudget(lambda rows: consume(
+            get_view(part_rows=1000, rows=rows)._create_csv()))
+
+    def test_xlsx(self):
+        self.assertMemoryBudget(lambda rows: consume(
+            get_view(streaming=True, output_format='xlsx',
+                     rows=rows)._create_csv()))
+
+    def test_cached_segments(self):
+        def export(rows):
+            consume(get_view(streaming=True, segment_size=500,
+                             rows=rows)._create_csv())
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # render and cache the segments
+        for rows in (100, SMALL, LARGE):
+            export(rows)
+        self.assertMemoryBudget(export)
+
+    def test_save_csv(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storage = FileSystemStorage(location=location)
+        self.assertMemoryBudget(lambda rows: get_view(rows=rows).save_csv(
+            storage, 'customers.csv'))
+
+
+class PipelinedMemoryBudgetTests(MemoryBudgetMixin, TransactionTestCase):
+
+    def setUp(self):
+        seed()
+
+    def test_pipelined(self):
+        self.assertMemoryBudget(lambda rows: consume(
+            get_view(streaming=True, pipelined=True,
+                     rows=rows)._create_csv()))
+
+
@@ -0,0 +1,114 @@
+import json
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings)
+from django.utils import timezone
+
+from export_csv.profiling import profile_export
+from export_csv.views import ExportCSV
+
+from .models import Customer
+
+
+class CustomerCSV(ExportCSV):
+    model = Customer
+    field_names = ['name', 'address', 'is_active']
+
+    def get_field_address(self, obj):
+        return obj.address
+
+    def clean_name(self, value):
+        return value.upper()
+
+
+class ProfileExportTests(TestCase):
+
+    def setUp(self):
+        for i in range(3):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=True,
+                                    last_updated=timezone.now())
+
+    def test_profile_export(self):
+        report = profile_export(CustomerCSV(), use_cprofile=True)
+        self.assertEqual(3, report['rows'])
+        self.assertEqual(1, len(report['queries']))
+        self.assertIn('cumulative', report['cprofile'])
+        self.assertEqual(
+            ['name', 'address', 'is_active'],
+            [column['name'] for column in report['columns']])
+        name, address, is_active = report['columns']
+        self.assertEqual('attribute_access', name['get_stage'])
+        self.assertEqual('clean_hooks', name['clean_stage'])
+        self.assertEqual('get_field_hooks', address['get_stage'])
+        self.assertEqual('force_text', is_active['clean_stage'])
+        self.assertEqual(
+            set(['fetch', 'sql', 'get_field_hooks', 'attribute_access',
+                 'clean_hooks', 'force_text', 'csv_writer']),
+            set(report['stages']))
+
+    def test_max_rows(self):
+        report = profile_export(CustomerCSV(), max_rows=2)
+        self.assertEqual(2, report['rows'])
+        self.assertEqual('chunks', report['mode'])
+
+    @mock.patch('export_csv.profiling.statement_timeout')
+    def test_statement_timeout(self, mock_statement_timeout):
+        profile_export(CustomerCSV(statement_timeout=30))
+        mock_statement_timeout.assert_called_once_with('default', 30)
+
+    def test_segments(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        view = CustomerCSV(segment_size=2)
+        report = profile_export(view, max_rows=2)
+        self.assertEqual('segments', report['mode'])
+        self.assertEqual(1, report['segments'])
+        self.assertGreaterEqual(report['rows'], 1)
+        self.assertGreater(report['columns'][0]['clean'], 0)
+        self.assertNotIn('_get_row', view.__dict__)
+
+    @override_settings(DEBUG=True)
+    def test_get_profile(self):
+        request = RequestFactory().get("", {'profile': '1'})
+        with self.assertLogs('export_csv.profiling', 'INFO'):
+            response = CustomerCSV.as_view()(request)
+        self.assertEqual('application/json', response['Content-Type'])
+        report = json.loads(response.content.decode())
+        self.assertEqual(3, report['rows'])
+        self.assertNotIn('cprofile', report)
+
+    @override_settings(DEBUG=False)
+    def test_get_profile_not_allowed(self):
+        request = RequestFactory().get("", {'profile': '1'})
+        response = CustomerCSV.as_view()(request)
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
+
+    @override_settings(DEBUG=True, EXPORT_CSV_PROFILING=False)
+    def test_get_profile_disabled(self):
+        request = RequestFactory().get("", {'profile': '1'})
+        response = CustomerCSV.as_view()(request)
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
+
+
+class ProfilePipelinedTests(TransactionTestCase):
+
+    def setUp(self):
+        for i in range(5):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=True,
+                                    last_updated=timezone.now())
+
+    def test_pipelined(self):
+        threads = set(threading.enumerate())
+        report = profile_export(CustomerCSV(pipelined=True, chunk_size=2),
+                                max_rows=3)
+        # the cancelled worker closes its cursor before the tables are
+        # flushed
+        for thread in set(threading.enumerate()) - threads:
+            thread.join(5)
+        self.assertEqual('pipelined', report['mode'])
+        self.assertEqual(3, report['rows'])
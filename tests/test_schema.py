@@ -0,0 +1,190 @@
+import threading
+from unittest import mock
+
+from django.conf.urls import url
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from export_csv.checks import check_export_views
+from export_csv import schema as schema_module
+from export_csv.schema import get_schema
+from export_csv.views import ExportCSV, ExportCSVBundle
+
+from .models import Account, Customer, Document
+
+
+class AccountCSV(ExportCSV):
+    model = Account
+    field_names = ['balance', 'owner__name', 'account_no']
+    add_col_names = True
+
+
+class TypoCSV(ExportCSV):
+    model = Customer
+    field_names = ['name', 'adress']
+
+
+class HookCSV(ExportCSV):
+    model = Customer
+    field_names = ['name', 'greeting']
+
+    def get_field_greeting(self, obj):
+        return 'Hello %s' % obj.name
+
+
+class SchemaTests(TestCase):
+
+    def setUp(self):
+        customer = Customer.objects.create(name='name', address='address',
+                                           last_updated=timezone.now())
+        Account.objects.create(owner=customer, account_no='acc',
+                               balance=10)
+
+    def get_view(self, view_class, **kwargs):
+        view = view_class(**kwargs)
+        view.request = RequestFactory().get('')
+        return view
+
+    def test_schema(self):
+        schema = self.get_view(AccountCSV).get_schema()
+        self.assertEqual(['balance', 'name', 'account no'], schema.headers)
+        self.assertEqual(['balance', 'owner__name', 'account_no'],
+                         schema.names)
+        self.assertFalse(schema.is_plain)
+        self.assertIs(schema, self.get_view(AccountCSV).get_schema())
+
+    def test_related_path(self):
+        view = self.get_view(AccountCSV)
+        with self.assertNumQueries(1):
+            content = b''.join(view.iter_csv())
+        self.assertEqual(b'balance,name,account no\r\n10.00,name,acc\r\n',
+                         content)
+
+    def test_values_list(self):
+        view = self.get_view(ExportCSV, model=Customer,
+                             field_names=['is_active', 'name'])
+        queryset, funcs = view._prepare_queryset(Customer.objects.all())
+        self.assertEqual([(True, 'name')], list(queryset))
+        self.assertEqual(b'True,name\r\n', b''.join(view.iter_csv()))
+        # hooks need the objects
+        queryset, funcs = self.get_view(HookCSV)._prepare_queryset(
+            Customer.objects.all())
+        self.assertIsInstance(queryset[0], Customer)
+
+    @override_settings(MEDIA_URL='/media/')
+    def test_clean_hook_gets_attribute(self):
+        Document.objects.create(title='report', file='documents/report.pdf')
+
+        class DocumentCSV(ExportCSV):
+            model = Document
+            field_names = ['title', 'file']
+
+            def clean_file(self, value):
+                return value.url
+
+        view = self.get_view(DocumentCSV)
+        self.assertEqual(b'report,/media/documents/report.pdf\r\n',
+                         b''.join(view.iter_csv()))
+        # without the hook, the name of the file is read from the column
+        view = self.get_view(ExportCSV, model=Document,
+                             field_names=['title', 'file'])
+        queryset, funcs = view._prepare_queryset(Document.objects.all())
+        self.assertEqual([('report', 'documents/report.pdf')], list(queryset))
+        self.assertEqual(b'report,documents/report.pdf\r\n',
+                         b''.join(view.iter_csv()))
+
+    def test_annotations(self):
+        view = self.get_view(ExportCSV, model=Customer,
+                             field_names=['name', 'accounts'])
+        view.get_queryset = lambda: Customer.objects.annotate(
+            accounts=Count('account'))
+        self.assertEqual(b'name,1\r\n', b''.join(view.iter_csv()))
+
+    def test_unknown_field(self):
+        response = TypoCSV.as_view(streaming=True)
+        with self.assertRaisesMessage(ImproperlyConfigured, 'adress'):
+            response(RequestFactory().get(''))
+
+    def test_thread_safe(self):
+        schemas = []
+
+        def compile_schema():
+            schemas.append(get_schema(ExportCSV, Customer, ['address']))
+        threads = [threading.Thread(target=compile_schema)
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(set(id(schema) for schema in schemas)))
+
+    @mock.patch.object(schema_module, 'MAX_SCHEMAS', 2)
+    def test_bounded_cache(self):
+        schema_module._schemas.clear()
+        address = get_schema(ExportCSV, Customer, ['address'])
+        get_schema(ExportCSV, Customer, ['name'])
+        # the least recently used schema is dropped
+        self.assertIs(address, get_schema(ExportCSV, Customer, ['address']))
+        get_schema(ExportCSV, Customer, ['name', 'address'])
+        self.assertEqual(2, len(schema_module._schemas))
+        self.assertIs(address, get_schema(ExportCSV, Customer, ['address']))
+        self.assertNotIn((ExportCSV, Customer, ('name',), ()),
+                         schema_module._schemas)
+
+
+class BadFiltersCSV(ExportCSV):
+    model = Customer
+    field_names = ['name']
+    col_names = ['Name', 'Address']
+    selectable_fields = ['name', 'nmae']
+    filter_fields = ['name']
+
+
+class Bundle(ExportCSVBundle):
+    views = [TypoCSV]
+
+
+class urls:
+    urlpatterns = [
+        url(r'^ok/$', HookCSV.as_view()),
+        url(r'^typo/$', ExportCSV.as_view(model=Customer,
+                                          field_names=['nmae'])),
+        url(r'^bad/$', BadFiltersCSV.as_view()),
+        url(r'^bundle/$', Bundle.as_view()),
+    ]
+
+
+class CheckTests(TestCase):
+
+    def test_check(self):
+        self.assertEqual([], HookCSV.check())
+        errors = BadFiltersCSV.check()
+        self.assertEqual(['export_csv.W001', 'export_csv.E003',
+                          'export_csv.E004'], [e.id for e in errors])
+        self.assertFalse(errors[0].is_serious())
+
+    def test_check_request_dependent(self):
+        class UserCSV(ExportCSV):
+            field_names = ['name']
+
+            def get_queryset(self):
+                return Customer.objects.filter(user=self.request.user)
+
+        class BrokenCSV(UserCSV):
+            def get_queryset(self):
+                raise ValueError('broken')
+
+        self.assertEqual([], UserCSV.check())
+        self.assertRaisesMessage(ValueError, 'broken', BrokenCSV.check)
+
+    @override_settings(ROOT_URLCONF=urls)
+    def test_check_urls(self):
+        errors = check_export_views()
+        self.assertEqual([(ExportCSV, 'export_csv.E001'),
+                          (BadFiltersCSV, 'export_csv.W001'),
+                          (BadFiltersCSV, 'export_csv.E003'),
+                          (BadFiltersCSV, 'export_csv.E004'),
+                          (TypoCSV, 'export_csv.E001')],
+                         [(e.obj, e.id) for e in errors])
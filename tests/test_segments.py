@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from export_csv.segments import get_segments
+from export_csv.views import ExportCSV
+
+from .models import Customer
+
+
+class SegmentedCustomerCSV(ExportCSV):
+    model = Customer
+    field_names = ['id', 'name']
+    add_col_names = True
+    segment_size = 4
+    segment_version_field = 'last_updated'
+
+
+class SegmentCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.customers = [
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=True,
+                                    last_updated=timezone.now())
+            for i in range(10)]
+
+    def export(self, **kwargs):
+        view = SegmentedCustomerCSV(**kwargs)
+        view.request = RequestFactory().get('')
+        return b''.join(view.iter_csv())
+
+    def test_get_segments(self):
+        queryset = Customer.objects.all()
+        segments = get_segments(queryset, 4)
+        pks = [c.pk for c in self.customers]
+        expected = sorted(set(pk // 4 for pk in pks))
+        self.assertEqual(expected, [index for index, validator in segments])
+        self.assertEqual(10, sum(validator[0] for _, validator in segments))
+        self.assertIsNone(segments[0][1][1])
+
+    def test_cached_segments(self):
+        segments = len(get_segments(Customer.objects.all(), 4))
+        with self.assertNumQueries(1 + segments):
+            content = self.export()
+        self.assertEqual(self.export(segment_size=None), content)
+        with self.assertNumQueries(1):
+            self.assertEqual(content, self.export())
+
+    def test_changed_segment(self):
+        content = self.export()
+        customer = self.customers[5]
+        customer.name = 'changed'
+        customer.save()
+        with self.assertNumQueries(2):
+            changed = self.export()
+        self.assertEqual(content.replace(b',name5\r\n', b',changed\r\n'),
+                         changed)
+        self.customers[0].delete()
+        with self.assertNumQueries(2):
+            self.assertNotIn(b',name0\r\n', self.export())
+
+    def test_cache_key(self):
+        view = SegmentedCustomerCSV()
+        queryset = Customer.objects.all()
+        key = view.get_segment_cache_key(queryset, 0)
+        self.assertNotEqual(key, view.get_segment_cache_key(queryset, 1))
+        self.assertNotEqual(key, view.get_segment_cache_key(
+            queryset.filter(is_active=True), 0))
+        view.field_names = ['name']
+        self.assertNotEqual(key, view.get_segment_cache_key(queryset, 0))
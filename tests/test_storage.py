@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, Storage
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from export_csv.storage import StreamedFile
+from export_csv.views import ExportCSV
+
+from .models import Customer
+
+
+class MultipartStorage(Storage):
+    """Stand-in for an S3 storage: reads the content part by part, like
+    ``upload_fileobj`` does for multipart uploads."""
+
+    part_size = 8
+
+    def __init__(self):
+        self.files = {}
+
+    def exists(self, name):
+        return name in self.files
+
+    def _save(self, name, content):
+        if getattr(content, 'seekable', lambda: True)():
+            content.seek(0)
+        parts = []
+        while True:
+            part = content.read(self.part_size)
+            if not part:
+                break
+            parts.append(part)
+        self.files[name] = parts
+        return name
+
+
+def iter_chunks(chunks, generated):
+    for chunk in chunks:
+        generated.append(chunk)
+        yield chunk
+
+
+class StreamedFileTests(TestCase):
+
+    def test_read(self):
+        f = StreamedFile([b'abc', b'', b'defgh', b'ij'])
+        self.assertEqual(b'ab', f.read(2))
+        self.assertEqual(b'cdefg', f.read(5))
+        self.assertEqual(7, f.tell())
+        self.assertEqual(b'hij', f.read())
+        self.assertEqual(b'', f.read(4))
+
+    def test_chunks(self):
+        f = StreamedFile([b'abc', b'defgh'])
+        self.assertEqual(b'a', f.read(1))
+        self.assertEqual([b'bc', b'defgh'], list(f.chunks()))
+        self.assertFalse(f.seekable())
+
+    def test_close(self):
+        def generate():
+            try:
+                yield b'a'
+                yield b'b'
+            finally:
+                closed.append(True)
+        closed = []
+        with StreamedFile(generate()) as f:
+            f.read(1)
+        self.assertEqual([True], closed)
+
+
+class SaveCSVTests(TestCase):
+
+    def setUp(self):
+        for i in range(5):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=True,
+                                    last_updated=timezone.now())
+        self.view = ExportCSV(model=Customer, field_names=['name'],
+                              filename='names.csv', chunk_size=2,
+                              add_col_names=True)
+        self.view.request = RequestFactory().get('')
+
+    def test_filesystem_storage(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storage = FileSystemStorage(location=location)
+        name = self.view.save_csv(storage, 'exports/names.csv')
+        self.assertEqual('exports/names.csv', name)
+        with storage.open(name) as f:
+            self.assertEqual(b'name\r\nname0\r\nname1\r\nname2\r\nname3\r\n'
+                             b'name4\r\n', f.read())
+
+    def test_multipart_storage(self):
+        storage = MultipartStorage()
+        generated = []
+        self.view.iter_csv = (lambda iter_csv=self.view.iter_csv:
+                              iter_chunks(iter_csv(), generated))
+        self.assertEqual('names.csv', self.view.save_csv(storage))
+        parts = storage.files['names.csv']
+        self.assertEqual(b''.join(generated), b''.join(parts))
+        self.assertEqual([8] * 5 + [1], [len(part) for part in parts])
+        self.assertEqual(3, len(generated))
+
+    def test_write_parts_multipart(self):
+        storage = MultipartStorage()
+        self.view.part_rows = 3
+        manifest = self.view.write_parts(storage)
+        self.assertEqual(2, len(manifest['parts']))
+        self.assertEqual(b'name\r\nname3\r\nname4\r\n',
+                         b''.join(storage.files['names_0002.csv']))
@@ -0,0 +1,133 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from export_csv.throttling import (
+    ConcurrencyLimit, _ReleasingIterator, acquire_all, release_all)
+from export_csv.views import ExportCSV
+
+from .models import Customer
+
+
+class LimitedCSV(ExportCSV):
+    model = Customer
+    field_names = ['name']
+    streaming = True
+    max_concurrent_exports = 1
+    retry_after = 30
+
+
+class ConcurrencyLimitTests(TestCase):
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_acquire_release(self):
+        limit = ConcurrencyLimit('test', 2, 'default')
+        self.assertTrue(limit.try_acquire())
+        self.assertTrue(limit.try_acquire())
+        self.assertFalse(limit.try_acquire())
+        self.assertEqual(2, cache.get(limit.cache_key))
+        limit.release()
+        self.assertEqual(1, cache.get(limit.cache_key))
+        self.assertTrue(limit.try_acquire())
+        release_all([limit, limit])
+
+    def test_shared_counter(self):
+        # another process holding the only slot
+        limit = ConcurrencyLimit('shared', 1, 'default')
+        cache.set(limit.cache_key, 1)
+        self.assertFalse(limit.try_acquire())
+        self.assertEqual(1, cache.get(limit.cache_key))
+        # the process-local slot is given back
+        cache.set(limit.cache_key, 0)
+        self.assertTrue(limit.try_acquire())
+        limit.release()
+
+    def test_lease_refreshed(self):
+        limit = ConcurrencyLimit('lease', 2, 'default', lease=60)
+        with mock.patch.object(limit.cache, 'touch') as touch:
+            self.assertTrue(limit.try_acquire())
+            touch.assert_called_once_with(limit.cache_key, 60)
+            limit.release()
+            self.assertEqual(2, touch.call_count)
+
+    def test_expired_counter(self):
+        limit = ConcurrencyLimit('expired', 2, 'default')
+        self.assertTrue(limit.try_acquire())
+        # the counter expired and another export took a slot
+        cache.set(limit.cache_key, 0)
+        limit.release()
+        self.assertEqual(0, cache.get(limit.cache_key))
+        cache.delete(limit.cache_key)
+        self.assertTrue(limit.try_acquire())
+        cache.delete(limit.cache_key)
+        limit.release()
+        self.assertIsNone(cache.get(limit.cache_key))
+
+    def test_refresh_while_streaming(self):
+        release, refresh = mock.Mock(), mock.Mock()
+        iterator = _ReleasingIterator([b'a', b'b'], release, refresh,
+                                      refresh_interval=0)
+        self.assertEqual([b'a', b'b'], list(iterator))
+        self.assertEqual(3, refresh.call_count)
+        iterator.close()
+        release.assert_called_once_with()
+
+    def test_acquire_all_is_atomic(self):
+        free = ConcurrencyLimit('free', 1)
+        full = ConcurrencyLimit('full', 1)
+        self.assertTrue(full.try_acquire())
+        start = time.time()
+        self.assertFalse(acquire_all([free, full], timeout=0.2,
+                                     interval=0.05))
+        self.assertGreaterEqual(time.time() - start, 0.15)
+        self.assertTrue(free.try_acquire())
+        release_all([free, full])
+
+
+class ExportLimitTests(TestCase):
+
+    def setUp(self):
+        Customer.objects.create(name='name', address='address',
+                                is_active=True, last_updated=timezone.now())
+
+    def tearDown(self):
+        cache.clear()
+
+    def get(self, view_class=LimitedCSV):
+        return view_class.as_view()(RequestFactory().get(''))
+
+    def test_too_many_exports(self):
+        response = self.get()
+        self.assertEqual(200, response.status_code)
+        rejected = self.get()
+        self.assertEqual(429, rejected.status_code)
+        self.assertEqual('30', rejected['Retry-After'])
+        # the slot is freed once the streamed response is closed
+        b''.join(response.streaming_content)
+        response.close()
+        response = self.get()
+        self.assertEqual(200, response.status_code)
+        response.close()
+
+    @override_settings(EXPORT_CSV_MAX_CONCURRENT_EXPORTS=1,
+                       EXPORT_CSV_LIMITER_CACHE=None)
+    def test_global_limit(self):
+        class OtherCSV(LimitedCSV):
+            max_concurrent_exports = None
+        response = self.get()
+        self.assertEqual(429, self.get(OtherCSV).status_code)
+        response.close()
+        response = self.get(OtherCSV)
+        self.assertEqual(200, response.status_code)
+        response.close()
+
+    def test_non_streaming_export_releases(self):
+        class NonStreamingCSV(LimitedCSV):
+            streaming = False
+        self.assertEqual(200, self.get(NonStreamingCSV).status_code)
+        self.assertEqual(200, self.get(NonStreamingCSV).status_code)
@@ -1,16 +1,30 @@
-try:
-    import mock
-except ImportError:
-    from unittest import mock
+import codecs
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from unittest import mock
 
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
 from django.http import HttpResponse
-from django.test import RequestFactory, TestCase
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from export_csv.exceptions import NoModelFoundException
-from export_csv.views import ExportCSV
+from export_csv.views import (
+    ExportCSV, ExportCSVBundle, ExportProgress, ImportCSV)
 
-from .models import Customer
+from .models import Account, Customer
 
 
 class ExportCSVTests(TestCase):
@@ -51,6 +65,32 @@ class ExportCSVTests(TestCase):
         view = self.setup_view(view, request)
         self.assertRaises(NoModelFoundException, view.get_queryset)
 
+    def test_get_database_alias_default(self):
+        request = RequestFactory().get("")
+        view = ExportCSV()
+        view = self.setup_view(view, request, model=Customer)
+        self.assertIsNone(view.get_database_alias())
+        self.assertEqual('default', view._get_queryset().db)
+
+    @override_settings(EXPORT_CSV_DATABASE='replica')
+    def test_get_database_alias_setting(self):
+        request = RequestFactory().get("")
+        view = ExportCSV()
+        view = self.setup_view(view, request, model=Customer)
+        self.assertEqual('replica', view.get_database_alias())
+        self.assertEqual('replica', view._get_queryset().db)
+
+    @override_settings(EXPORT_CSV_MAX_REPLICA_LAG=30)
+    def test_get_database_alias_replica_lag(self):
+        request = RequestFactory().get("")
+        view = ExportCSV()
+        view = self.setup_view(view, request, model=Customer)
+        view.using = 'replica'
+        view.get_replica_lag = lambda using: 10
+        self.assertEqual('replica', view.get_database_alias())
+        view.get_replica_lag = lambda using: 60
+        self.assertEqual('default', view.get_database_alias())
+
     def test_get_field_names_custom(self):
         request = RequestFactory().get("")
         view = ExportCSV()
@@ -163,7 +203,7 @@ class ExportCSVTests(TestCase):
         view = self.setup_view(view, request, model=Customer)
         response = view._create_csv()
         self.assertEqual(200, response.status_code)
-        self.assertEqual('text/csv', response['Content-Type'])
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
 
     def test_create_csv_col_names(self):
         request = RequestFactory().get("")
@@ -172,7 +212,7 @@ class ExportCSVTests(TestCase):
                                add_col_names=True)
         response = view._create_csv()
         self.assertEqual(200, response.status_code)
-        self.assertEqual('text/csv', response['Content-Type'])
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
 
     def clean_name(self, value):
         return str(value).upper()
@@ -185,7 +225,74 @@ class ExportCSVTests(TestCase):
         view.clean_name = self.clean_name
         response = view._create_csv()
         self.assertEqual(200, response.status_code)
-        self.assertEqual('text/csv', response['Content-Type'])
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
+
+    def test_create_csv_streaming(self):
+        request = RequestFactory().get("")
+        view = ExportCSV()
+        view = self.setup_view(view, request, model=Customer,
+                               field_names=['name', 'address'])
+        view.streaming = True
+        response = view._create_csv()
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        self.assertEqual(b'name1,address1\r\nname2,address2\r\n', content)
+
+    def test_create_csv_encoding(self):
+        request = RequestFactory().get("")
+        view = ExportCSV()
+        view = self.setup_view(view, request, model=Customer,
+                               field_names=['name'])
+        view.encoding = 'utf-8-sig'
+        response = view._create_csv()
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
+        self.assertEqual(codecs.BOM_UTF8 + b'name1\r\nname2\r\n',
+                         response.content)
+
+    @override_settings(EXPORT_CSV_ENCODING='cp1252')
+    def test_create_csv_encoding_setting(self):
+        request = RequestFactory().get("")
+        view = ExportCSV()
+        view = self.setup_view(view, request, model=Customer,
+                               field_names=['name'])
+        view.chunk_size = 1
+        response = view._create_csv()
+        self.assertEqual('text/csv; charset=cp1252', response['Content-Type'])
+        self.assertEqual(b'name1\r\nname2\r\n', response.content)
+
+    def test_create_csv_streaming_closed(self):
+        request = RequestFactory().get("")
+        view = ExportCSV()
+        view = self.setup_view(view, request, model=Customer,
+                               field_names=['name'])
+        view.streaming = True
+        view.chunk_size = 1
+        fetched = []
+        closed = []
+
+        def iter_objects(queryset):
+            try:
+                for obj in queryset:
+                    fetched.append(obj)
+                    yield obj
+            finally:
+                closed.append(True)
+
+        view._iter_objects = iter_objects
+        response = view._create_csv()
+        self.assertEqual(b'name1\r\n', next(iter(response.streaming_content)))
+        response.close()
+        self.assertEqual([True], closed)
+        self.assertEqual(1, len(fetched))
+
+    @mock.patch('export_csv.views.statement_timeout')
+    def test_create_csv_statement_timeout(self, mock_statement_timeout):
+        request = RequestFactory().get("")
+        view = ExportCSV()
+        view = self.setup_view(view, request, model=Customer)
+        view.statement_timeout = 30
+        view._create_csv()
+        mock_statement_timeout.assert_called_once_with('default', 30)
 
     @mock.patch('export_csv.views.ExportCSV._create_csv')
     def test_get(self, mock_create_csv):
@@ -196,3 +303,597 @@ class ExportCSVTests(TestCase):
         response = view.get(request=request)
         self.assertEqual(200, response.status_code)
         self.assertEqual('text/csv', response['Content-Type'])
+
+
+class CustomerNameCSV(ExportCSV):
+    model = Customer
+    field_names = ['name']
+    filename = 'names.csv'
+
+
+class CustomerAddressCSV(ExportCSV):
+    model = Customer
+    field_names = ['address']
+    filename = 'addresses.csv'
+
+
+class BundleView(ExportCSVBundle):
+    views = [CustomerNameCSV, CustomerAddressCSV]
+
+
+class ExportCSVBundleTests(TransactionTestCase):
+
+    def setUp(self):
+        Customer.objects.create(name='name1', address='address1',
+                                is_active=True, last_updated=timezone.now())
+        Customer.objects.create(name='name2', address='address2',
+                                is_active=True, last_updated=timezone.now())
+
+    def get_archive(self, **initkwargs):
+        request = RequestFactory().get("")
+        response = BundleView.as_view(**initkwargs)(request)
+        self.assertEqual('application/zip', response['Content-Type'])
+        content = b''.join(response.streaming_content)
+        return zipfile.ZipFile(io.BytesIO(content))
+
+    def test_bundle(self):
+        archive = self.get_archive()
+        self.assertEqual(['names.csv', 'addresses.csv'], archive.namelist())
+        self.assertEqual(b'name1\r\nname2\r\n', archive.read('names.csv'))
+        self.assertEqual(b'address1\r\naddress2\r\n',
+                         archive.read('addresses.csv'))
+
+    def test_bundle_stored(self):
+        archive = self.get_archive(compression=zipfile.ZIP_STORED)
+        info = archive.getinfo('names.csv')
+        self.assertEqual(zipfile.ZIP_STORED, info.compress_type)
+        self.assertEqual(b'name1\r\nname2\r\n', archive.read('names.csv'))
+
+    def test_bundle_concurrent(self):
+        archive = self.get_archive(concurrent=True, max_workers=2,
+                                   queue_size=1)
+        self.assertEqual(b'name1\r\nname2\r\n', archive.read('names.csv'))
+        self.assertEqual(b'address1\r\naddress2\r\n',
+                         archive.read('addresses.csv'))
+
+    def test_bundle_snapshot(self):
+        transactions = []
+
+        class NameCSV(CustomerNameCSV):
+            def get_field_name(self, obj):
+                transactions.append(connection.in_atomic_block)
+                return obj.name
+
+        view = BundleView.as_view(views=[NameCSV, CustomerAddressCSV],
+                                  consistent_snapshot=True)
+        response = view(RequestFactory().get(''))
+        b''.join(response.streaming_content)
+        self.assertEqual([True, True], transactions)
+        self.assertFalse(connection.in_atomic_block)
+        archive = self.get_archive(concurrent=True, consistent_snapshot=True)
+        self.assertEqual(b'address1\r\naddress2\r\n',
+                         archive.read('addresses.csv'))
+
+    def test_bundle_formats(self):
+        class AddressNDJSON(CustomerAddressCSV):
+            output_format = 'ndjson'
+
+        class NameXLSX(CustomerNameCSV):
+            output_format = 'xlsx'
+
+        for concurrent in (False, True):
+            archive = self.get_archive(views=[AddressNDJSON, NameXLSX],
+                                       concurrent=concurrent)
+            self.assertEqual(['addresses.ndjson', 'names.xlsx'],
+                             archive.namelist())
+            self.assertEqual(b'{"address":"address1"}\n'
+                             b'{"address":"address2"}\n',
+                             archive.read('addresses.ndjson'))
+            self.assertEqual(b'PK', archive.read('names.xlsx')[:2])
+
+    def test_bundle_no_views(self):
+        view = ExportCSVBundle()
+        self.assertRaises(ImproperlyConfigured, view.get_views)
+
+
+class ExportPipelinedTests(TransactionTestCase):
+
+    def setUp(self):
+        for i in range(7):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=True,
+                                    last_updated=timezone.now())
+
+    def get_view(self, **kwargs):
+        view = CustomerNameCSV(streaming=True, chunk_size=2, **kwargs)
+        view.request = RequestFactory().get("")
+        return view
+
+    def test_pipelined(self):
+        expected = b''.join(self.get_view().iter_csv())
+        view = self.get_view(pipelined=True, pipeline_depth=1)
+        threads = []
+        iter_objects = view._iter_objects
+
+        def _iter_objects(queryset):
+            threads.append(threading.current_thread())
+            return iter_objects(queryset)
+        view._iter_objects = _iter_objects
+        self.assertEqual(expected, b''.join(view.iter_csv()))
+        self.assertEqual(1, len(threads))
+        self.assertIsNot(threading.current_thread(), threads[0])
+
+    def test_pipelined_close(self):
+        view = self.get_view(pipelined=True, pipeline_depth=1)
+        fetched = []
+        fetch_chunks = view._fetch_chunks
+
+        def _fetch_chunks(queryset, snapshot_id=None):
+            for chunk in fetch_chunks(queryset, snapshot_id):
+                fetched.append(chunk)
+                yield chunk
+        view._fetch_chunks = _fetch_chunks
+        chunks = view.iter_csv()
+        self.assertEqual(b'name0\r\nname1\r\n', next(chunks))
+        chunks.close()
+        time.sleep(0.3)
+        # the first chunk, one queued and one waiting to be queued
+        self.assertLessEqual(len(fetched), 3)
+
+    def test_consistent_snapshot(self):
+        transactions = []
+
+        class View(CustomerNameCSV):
+            def get_field_name(self, obj):
+                transactions.append(connection.in_atomic_block)
+                return obj.name
+
+        view = View(chunk_size=2, consistent_snapshot=True,
+                    progress_interval=5)
+        view.request = RequestFactory().get('')
+        with CaptureQueriesContext(connection) as queries:
+            content = b''.join(view.iter_csv())
+        self.assertEqual(b''.join(self.get_view().iter_csv()), content)
+        self.assertEqual([True] * 7, transactions)
+        # the count and the rows are read in one transaction
+        self.assertEqual(['BEGIN', 'SELECT', 'SELECT'],
+                         [query['sql'].split()[0] for query in queries])
+        self.assertFalse(connection.in_atomic_block)
+
+    def test_pipelined_snapshot(self):
+        expected = b''.join(self.get_view().iter_csv())
+        view = self.get_view(pipelined=True, consistent_snapshot=True)
+        self.assertEqual(expected, b''.join(view.iter_csv()))
+
+    def test_pipelined_error(self):
+        view = self.get_view(pipelined=True)
+        view._iter_objects = mock.Mock(side_effect=ValueError('fetch'))
+        with self.assertRaisesMessage(ValueError, 'fetch'):
+            b''.join(view.iter_csv())
+
+
+class ExportCSVPartsTests(TestCase):
+
+    def setUp(self):
+        for i in range(5):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=True,
+                                    last_updated=timezone.now())
+
+    def get_view(self, **kwargs):
+        view = CustomerNameCSV(**kwargs)
+        view.request = RequestFactory().get("")
+        view.args = ()
+        view.kwargs = {}
+        return view
+
+    def test_part_rows(self):
+        view = self.get_view(part_rows=2, add_col_names=True)
+        response = view._create_csv()
+        self.assertEqual('application/zip', response['Content-Type'])
+        self.assertIn('names.zip', response['Content-Disposition'])
+        content = b''.join(response.streaming_content)
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertEqual(['names_0001.csv', 'names_0002.csv',
+                          'names_0003.csv', 'names_manifest.json'],
+                         archive.namelist())
+        self.assertEqual(b'name\r\nname0\r\nname1\r\n',
+                         archive.read('names_0001.csv'))
+        self.assertEqual(b'name\r\nname4\r\n', archive.read('names_0003.csv'))
+        manifest = json.loads(archive.read('names_manifest.json').decode())
+        self.assertEqual(5, manifest['rows'])
+        self.assertEqual([2, 2, 1], [p['rows'] for p in manifest['parts']])
+        data = archive.read('names_0002.csv')
+        self.assertEqual(hashlib.sha256(data).hexdigest(),
+                         manifest['parts'][1]['sha256'])
+
+    def test_part_size(self):
+        view = self.get_view(part_size=14)
+        parts = []
+        for part, chunks in view.iter_parts():
+            self.assertLessEqual(len(b''.join(chunks)), 14)
+            parts.append(part)
+        self.assertEqual([2, 2, 1], [part.rows for part in parts])
+
+    def test_write_parts(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storage = FileSystemStorage(location=location)
+        manifest = self.get_view(part_rows=3).write_parts(storage, 'out/')
+        self.assertEqual(['out/names_0001.csv', 'out/names_0002.csv'],
+                         [p['name'] for p in manifest['parts']])
+        with storage.open('out/names_0002.csv') as f:
+            self.assertEqual(b'name3\r\nname4\r\n', f.read())
+        self.assertTrue(storage.exists('out/names_manifest.json'))
+
+
+class ExportPreviewTests(TestCase):
+
+    def setUp(self):
+        for i in range(20):
+            Customer.objects.create(name='name%02d' % i, address='address',
+                                    is_active=True,
+                                    last_updated=timezone.now())
+
+    def get(self, data, **kwargs):
+        view = CustomerNameCSV.as_view(**kwargs)
+        return view(RequestFactory().get('', data))
+
+    def test_preview(self):
+        with self.assertNumQueries(1):
+            response = self.get({'preview': '2'}, part_rows=10)
+        self.assertEqual(b'name00\r\nname01\r\n', response.content)
+        self.assertEqual('head', response['X-Export-Preview'])
+        self.assertIn('names_preview.csv', response['Content-Disposition'])
+
+    def test_preview_rows(self):
+        response = self.get({'preview': ''}, preview_rows=3,
+                            max_preview_rows=5)
+        self.assertEqual(3, response.content.count(b'\r\n'))
+        response = self.get({'preview': '100'}, max_preview_rows=5)
+        self.assertEqual(5, response.content.count(b'\r\n'))
+
+    def test_sample(self):
+        response = self.get({'preview': '4', 'sample': ''})
+        self.assertEqual('sample', response['X-Export-Preview'])
+        self.assertLessEqual(response.content.count(b'\r\n'), 4)
+
+    def test_preview_disabled(self):
+        response = self.get({'preview': '2'}, preview_param=None)
+        self.assertEqual(20, response.content.count(b'\r\n'))
+
+
+class AccountCSV(ExportCSV):
+    model = Account
+    field_names = ['owner', 'account_no', 'balance']
+    col_names = ['Owner', 'Account', 'Balance']
+    add_col_names = True
+    selectable_fields = ['owner', 'account_no', 'balance', 'creation_date']
+    filter_fields = {'owner': ['exact', 'in'], 'account_no': ['exact'],
+                     'id': ['gte']}
+
+
+class ExportSelectionTests(TestCase):
+
+    def setUp(self):
+        self.customers = []
+        for i in range(3):
+            customer = Customer.objects.create(
+                name='name%d' % i, address='address', is_active=True,
+                last_updated=timezone.now())
+            self.customers.append(customer)
+            Account.objects.create(owner=customer, account_no='acc%d' % i,
+                                   balance=i)
+
+    def get(self, data, view_class=AccountCSV):
+        return view_class.as_view()(RequestFactory().get('', data))
+
+    def test_fields(self):
+        with self.assertNumQueries(1):
+            response = self.get(
+                {'fields': 'balance, account_no,creation_date'})
+        self.assertEqual(b'Balance,Account,creation date\r\n'
+                         b'0.00,acc0,None\r\n1.00,acc1,None\r\n'
+                         b'2.00,acc2,None\r\n', response.content)
+
+    def test_invalid_fields(self):
+        response = self.get({'fields': 'balance,owner__name'})
+        self.assertEqual(400, response.status_code)
+        self.assertIn(b'owner__name', response.content)
+        response = self.get({'fields': 'balance,account_no,balance'})
+        self.assertEqual(400, response.status_code)
+        self.assertIn(b'balance', response.content)
+        # disabled by default
+        response = self.get({'fields': 'name'}, CustomerNameCSV)
+        self.assertEqual(b'name0\r\nname1\r\nname2\r\n', response.content)
+
+    def test_filters(self):
+        owners = '%d,%d' % (self.customers[0].pk, self.customers[2].pk)
+        response = self.get({'fields': 'account_no',
+                             'filter': ['owner__in=' + owners,
+                                        'id__gte=0']})
+        self.assertEqual(b'Account\r\nacc0\r\nacc2\r\n', response.content)
+        response = self.get({'filter': 'account_no=acc1'})
+        self.assertEqual(2, response.content.count(b'\r\n'))
+
+    def test_invalid_filters(self):
+        for param in ['balance=1', 'account_no__gte=a', 'owner', 'id__gte=x',
+                      'owner__in=1,a']:
+            response = self.get({'filter': param})
+            self.assertEqual(400, response.status_code, param)
+
+    def test_filter_field_not_indexed(self):
+        view = CustomerNameCSV.as_view(filter_fields=['name'])
+        with self.assertRaises(ImproperlyConfigured):
+            view(RequestFactory().get('', {'filter': 'name=name0'}))
+
+
+class ExportFormatTests(TestCase):
+
+    def setUp(self):
+        customer = Customer.objects.create(
+            name='name', address='address', is_active=True,
+            last_updated=timezone.now())
+        for i in range(3):
+            Account.objects.create(owner=customer, account_no='acc%d' % i,
+                                   balance=i)
+
+    def get(self, data=None, headers=None, **kwargs):
+        kwargs.setdefault('output_formats', ['csv', 'tsv', 'ndjson'])
+        view = AccountCSV.as_view(**kwargs)
+        return view(RequestFactory().get('', data or {}, **(headers or {})))
+
+    def test_format_param(self):
+        with self.assertNumQueries(1):
+            response = self.get({'format': 'tsv'})
+        self.assertEqual('text/tab-separated-values; charset=utf-8',
+                         response['Content-Type'])
+        self.assertIn('account_list.tsv', response['Content-Disposition'])
+        self.assertTrue(response.content.startswith(
+            b'Owner\tAccount\tBalance\r\nname\tacc0\t0.00\r\n'))
+        self.assertIn('Accept', response['Vary'])
+
+    def test_ndjson(self):
+        response = self.get({'format': 'ndjson'}, streaming=True,
+                            chunk_size=2)
+        self.assertEqual('application/x-ndjson; charset=utf-8',
+                         response['Content-Type'])
+        lines = b''.join(response.streaming_content).splitlines()
+        # no header, plain fields keep their types
+        self.assertEqual([{'owner': 'name', 'account_no': 'acc%d' % i,
+                           'balance': '%d.00' % i} for i in range(3)],
+                         [json.loads(line.decode('utf-8'))
+                          for line in lines])
+
+    def test_accept(self):
+        response = self.get(headers={
+            'HTTP_ACCEPT': 'text/csv;q=0.5, application/x-ndjson'})
+        self.assertEqual('application/x-ndjson; charset=utf-8',
+                         response['Content-Type'])
+        response = self.get(headers={'HTTP_ACCEPT': '*/*'})
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
+
+    def test_invalid_format(self):
+        response = self.get({'format': 'xml'})
+        self.assertEqual(400, response.status_code)
+        # only output_format without output_formats
+        response = self.get({'format': 'tsv'}, output_formats=None)
+        self.assertEqual('text/csv; charset=utf-8', response['Content-Type'])
+
+    def test_parts(self):
+        response = self.get({'format': 'ndjson'}, part_rows=2)
+        content = b''.join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(['account_list_0001.ndjson',
+                              'account_list_0002.ndjson',
+                              'account_list_manifest.json'],
+                             archive.namelist())
+            self.assertEqual(
+                2, len(archive.read('account_list_0001.ndjson').splitlines()))
+
+
+class ExportProgressTests(TestCase):
+
+    def setUp(self):
+        for i in range(5):
+            Customer.objects.create(name='name%d' % i, address='address',
+                                    is_active=True,
+                                    last_updated=timezone.now())
+
+    def test_report_progress(self):
+        request = RequestFactory().get("", {'progress_key': 'abc'})
+        view = CustomerNameCSV(progress_interval=2)
+        view.request = request
+        reports = []
+        view.report_progress = lambda rows, total, done=False: \
+            reports.append((rows, total, done))
+        response = view._create_csv()
+        self.assertEqual('5', response['X-Export-Estimated-Rows'])
+        self.assertEqual([(0, 5, False), (2, 5, False), (4, 5, False),
+                          (5, 5, True)], reports)
+
+    def test_progress_view(self):
+        request = RequestFactory().get("", {'progress_key': 'abc'})
+        view = CustomerNameCSV(progress_interval=2, streaming=True,
+                               chunk_size=1)
+        view.request = request
+        response = view._create_csv()
+        next(iter(response.streaming_content))
+        progress = ExportProgress.as_view()(request)
+        self.assertEqual({'rows': 0, 'total': 5, 'done': False},
+                         json.loads(progress.content.decode()))
+        b''.join(response.streaming_content)
+        progress = ExportProgress.as_view()(request)
+        self.assertEqual({'rows': 5, 'total': 5, 'done': True},
+                         json.loads(progress.content.decode()))
+
+    def test_estimate_streaming(self):
+        request = RequestFactory().get("", {'progress_key': 'abc'})
+        view = CustomerNameCSV(progress_interval=2, streaming=True)
+        view.request = request
+        with mock.patch('export_csv.views.estimate_count',
+                        return_value=5) as estimate:
+            response = view._create_csv()
+            # estimated with the rows, once the snapshot is open
+            self.assertFalse(estimate.called)
+            b''.join(response.streaming_content)
+        self.assertEqual(1, estimate.call_count)
+        self.assertNotIn('X-Export-Estimated-Rows', response)
+
+    def test_replica_lag_once(self):
+        request = RequestFactory().get("", {'progress_key': 'abc'})
+        view = CustomerNameCSV(progress_interval=2, using='replica',
+                               max_replica_lag=30)
+        view.request = request
+        view.get_replica_lag = mock.Mock(return_value=60)
+        response = view._create_csv()
+        self.assertEqual('5', response['X-Export-Estimated-Rows'])
+        self.assertEqual(1, view.get_replica_lag.call_count)
+
+    def test_progress_view_unknown(self):
+        request = RequestFactory().get("", {'progress_key': 'unknown'})
+        self.assertEqual(404, ExportProgress.as_view()(request).status_code)
+
+
+class AccountImportCSV(ImportCSV):
+    model = Account
+    field_names = ['owner', 'account_no', 'balance', 'creation_date']
+    add_col_names = True
+    col_names = ['Owner', 'Account', 'Balance', 'Created']
+
+
+class ImportCSVTests(TestCase):
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            name='name1', address='address1', is_active=True,
+            last_updated=timezone.now())
+
+    def post(self, content, view_class=AccountImportCSV, **initkwargs):
+        upload = SimpleUploadedFile('accounts.csv', content.encode('utf-8'))
+        request = RequestFactory().post("", {'file': upload})
+        response = view_class.as_view(**initkwargs)(request)
+        return response, json.loads(response.content.decode())
+
+    def test_import(self):
+        content = ('\ufeffOwner,Account,Balance,Created\r\n'
+                   '{pk},A1,10.50,2017-01-01 10:00:00\r\n'
+                   '{pk},A2,20,None\r\n'
+                   '{pk},A3,30,\r\n').format(pk=self.customer.pk)
+        with self.assertNumQueries(2 * 5):
+            # per batch: owner check, account_no check, savepoint, insert
+            # and release
+            response, report = self.post(content, batch_size=2)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'rows': 3, 'created': 3, 'updated': 0,
+                          'unchanged': 0, 'error_count': 0, 'errors': []},
+                         report)
+        self.assertEqual(['A1', 'A2', 'A3'], list(
+            Account.objects.order_by('account_no')
+            .values_list('account_no', flat=True)))
+        self.assertIsNone(Account.objects.get(account_no='A2').creation_date)
+
+    def test_import_field_names_header(self):
+        content = 'balance,account_no,owner\r\n1,A1,{pk}\r\n'.format(
+            pk=self.customer.pk)
+        response, report = self.post(content)
+        self.assertEqual(1, report['created'])
+        self.assertEqual(1, Account.objects.get(account_no='A1').balance)
+
+    def test_import_errors(self):
+        content = ('Owner,Account,Balance,Created\r\n'
+                   '{pk},A1,abc,\r\n'
+                   '0,A2,1,\r\n'
+                   '{pk},A3\r\n'
+                   '{pk},A4,1,\r\n').format(pk=self.customer.pk)
+        response, report = self.post(content)
+        self.assertEqual(4, report['rows'])
+        self.assertEqual(1, report['created'])
+        self.assertEqual(3, report['error_count'])
+        self.assertEqual([2, 3, 4], sorted(e['line'] for e in report['errors']))
+        errors = dict((e['line'], e['errors']) for e in report['errors'])
+        self.assertIn('balance', errors[2])
+        self.assertIn('owner', errors[3])
+
+    def test_import_unique_error(self):
+        Account.objects.create(owner=self.customer, account_no='A0',
+                               balance=0)
+        content = ('Owner,Account,Balance,Created\r\n'
+                   '{pk},A1,1,\r\n'
+                   '{pk},A1,1,\r\n'
+                   '{pk},A0,1,\r\n'
+                   '{pk},A2,1,\r\n').format(pk=self.customer.pk)
+        response, report = self.post(content)
+        # only the rows with a duplicate value fail
+        self.assertEqual(2, report['created'])
+        self.assertEqual(2, report['error_count'])
+        errors = dict((e['line'], e['errors']) for e in report['errors'])
+        self.assertEqual([3, 4], sorted(errors))
+        self.assertIn('account_no', errors[3])
+        self.assertIn('already exists', errors[4]['account_no'][0])
+        self.assertEqual(['A0', 'A1', 'A2'], list(
+            Account.objects.order_by('account_no')
+            .values_list('account_no', flat=True)))
+
+    def test_import_database_error(self):
+        # rejected by the database only: the batch is saved row by row
+        bulk_create = QuerySet.bulk_create
+
+        def reject_bad(queryset, objs, *args, **kwargs):
+            if any(obj.account_no == 'bad' for obj in objs):
+                raise IntegrityError('rejected')
+            return bulk_create(queryset, objs, *args, **kwargs)
+
+        content = ('Owner,Account,Balance,Created\r\n'
+                   '{pk},A1,1,\r\n'
+                   '{pk},bad,1,\r\n'
+                   '{pk},A2,1,\r\n').format(pk=self.customer.pk)
+        with mock.patch.object(QuerySet, 'bulk_create', reject_bad):
+            response, report = self.post(content)
+        self.assertEqual(2, report['created'])
+        self.assertEqual([{'line': 3, 'errors': {'__all__': ['rejected']}}],
+                         report['errors'])
+        self.assertEqual(2, Account.objects.count())
+
+    def test_upsert(self):
+        Account.objects.create(owner=self.customer, account_no='A1',
+                               balance=10)
+        Account.objects.create(owner=self.customer, account_no='A2',
+                               balance=20)
+        content = ('Owner,Account,Balance,Created\r\n'
+                   '{pk},A1,10.00,None\r\n'
+                   '{pk},A2,25,None\r\n'
+                   '{pk},A3,30,None\r\n').format(pk=self.customer.pk)
+        # owner check, existing rows, savepoint, insert, update and release
+        with self.assertNumQueries(6):
+            response, report = self.post(content, natural_key='account_no')
+        self.assertEqual(3, report['rows'])
+        self.assertEqual(1, report['created'])
+        self.assertEqual(1, report['updated'])
+        self.assertEqual(1, report['unchanged'])
+        self.assertEqual(
+            [('A1', 10), ('A2', 25), ('A3', 30)],
+            list(Account.objects.order_by('account_no')
+                 .values_list('account_no', 'balance')))
+
+    def test_upsert_duplicate_key(self):
+        content = ('Owner,Account,Balance,Created\r\n'
+                   '{pk},A1,1,None\r\n'
+                   '{pk},A1,2,None\r\n').format(pk=self.customer.pk)
+        response, report = self.post(content, natural_key='account_no')
+        self.assertEqual(1, report['created'])
+        self.assertEqual(3, report['errors'][0]['line'])
+
+    def test_upsert_missing_key_column(self):
+        response, report = self.post('Owner,Balance\r\n',
+                                     natural_key='account_no')
+        self.assertEqual(400, response.status_code)
+
+    def test_import_unknown_column(self):
+        response, report = self.post('Owner,Unknown\r\n')
+        self.assertEqual(400, response.status_code)
+
+    def test_import_no_file(self):
+        request = RequestFactory().post("", {})
+        response = AccountImportCSV.as_view()(request)
+        self.assertEqual(400, response.status_code)
@@ -0,0 +1,69 @@
+import codecs
+import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from export_csv.writers import CSVWriter, NDJSONWriter, TSVWriter
+
+
+class CSVWriterTests(SimpleTestCase):
+
+    def test_write_rows(self):
+        writer = CSVWriter()
+        self.assertEqual(b'', writer.bom)
+        self.assertEqual('a,b\r\nc,"d,e"\r\n'.encode('utf-8'),
+                         writer.write_rows([['a', 'b'], ['c', 'd,e']]))
+        # the buffer is reused for the next chunk
+        self.assertEqual(b'f\r\n', writer.write_rows([['f']]))
+
+    def test_write_row_fmtparams(self):
+        writer = CSVWriter(delimiter=';')
+        self.assertEqual(b'a;b\r\n', writer.write_row(['a', 'b']))
+
+    def test_utf_8_sig(self):
+        writer = CSVWriter(encoding='utf-8-sig')
+        self.assertEqual(codecs.BOM_UTF8, writer.bom)
+        self.assertEqual('é\r\n'.encode('utf-8'), writer.write_row(['é']))
+
+    def test_cp1252(self):
+        writer = CSVWriter(encoding='cp1252')
+        self.assertEqual('€\r\n'.encode('cp1252'), writer.write_row(['€']))
+        self.assertRaises(UnicodeEncodeError, writer.write_row, ['☃'])
+
+    def test_errors(self):
+        writer = CSVWriter(encoding='cp1252', errors='replace')
+        self.assertEqual(b'?\r\n', writer.write_row(['☃']))
+
+
+class TSVWriterTests(SimpleTestCase):
+
+    def test_write_rows(self):
+        writer = TSVWriter(dialect='excel')
+        self.assertEqual(b'a\tb,c\r\n', writer.write_rows([['a', 'b,c']]))
+
+
+class NDJSONWriterTests(SimpleTestCase):
+
+    def test_write_rows(self):
+        writer = NDJSONWriter(['a', 'b'])
+        self.assertEqual(b'', writer.write_rows([]))
+        self.assertEqual(
+            '{"a":"é},{","b":1}\n'
+            '{"a":null,"b":"2.50"}\n'
+            '{"a":true,"b":"2020-01-02"}\n'.encode('utf-8'),
+            writer.write_rows([['é},{', 1], [None, Decimal('2.50')],
+                               [True, datetime.date(2020, 1, 2)]]))
+
+    def test_no_bom(self):
+        writer = NDJSONWriter(['a'], encoding='utf-8-sig')
+        self.assertEqual(b'', writer.bom)
+        self.assertEqual('{"a":"é"}\n'.encode('utf-8'),
+                         writer.write_rows([['é']]))
+
+    def test_nested_values(self):
+        # the rows are encoded one by one
+        writer = NDJSONWriter(['a'])
+        self.assertEqual(b'{"a":[{"b":1},{"b":2}]}\n{"a":"\\u0000"}\n',
+                         writer.write_rows([[[{'b': 1}, {'b': 2}]],
+                                            ['\x00']]))
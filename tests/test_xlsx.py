@@ -0,0 +1,129 @@
+import datetime
+import io
+import zipfile
+from decimal import Decimal
+from xml.etree import ElementTree
+
+from django.test import RequestFactory, TestCase
+
+from export_csv.views import ExportCSV
+from export_csv.xlsx import XLSXWriter, get_column_letter
+
+from .models import Account, Customer
+
+NS = {'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def read_sheet(content):
+    """Returns the cells of the worksheet of an XLSX file as a list of
+    ``{ref: (type, style, value)}`` dicts, one per row."""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        root = ElementTree.fromstring(
+            archive.read('xl/worksheets/sheet1.xml'))
+    rows = []
+    for row in root.iterfind('main:sheetData/main:row', NS):
+        cells = {}
+        for cell in row.iterfind('main:c', NS):
+            text = cell.find('main:is/main:t', NS)
+            if text is None:
+                text = cell.find('main:v', NS)
+            cells[cell.get('r')] = (cell.get('t'), cell.get('s'), text.text)
+        rows.append(cells)
+    return rows
+
+
+class AccountXLSX(ExportCSV):
+    model = Account
+    field_names = ['account_no', 'balance', 'creation_date', 'owner',
+                   'owner__is_active']
+    add_col_names = True
+    output_format = 'xlsx'
+    chunk_size = 2
+
+    def clean_account_no(self, value):
+        return value.upper()
+
+
+class XLSXWriterTests(TestCase):
+
+    def test_get_column_letter(self):
+        self.assertEqual(['A', 'Z', 'AA', 'AZ', 'BA', 'XFD'],
+                         [get_column_letter(i)
+                          for i in [0, 25, 26, 51, 52, 16383]])
+
+    def test_write_rows(self):
+        writer = XLSXWriter()
+        xml = writer.write_rows([
+            ['a<b & c', 1, Decimal('2.50'), True, None,
+             datetime.date(1900, 3, 1), datetime.time(12), 'x\x00y']])
+        self.assertEqual(
+            '<row r="1">'
+            '<c r="A1" t="inlineStr"><is><t xml:space="preserve">'
+            'a&lt;b &amp; c</t></is></c>'
+            '<c r="B1"><v>1</v></c>'
+            '<c r="C1"><v>2.50</v></c>'
+            '<c r="D1" t="b"><v>1</v></c>'
+            '<c r="F1" s="2"><v>61</v></c>'
+            '<c r="G1" s="3"><v>0.5</v></c>'
+            '<c r="H1" t="inlineStr"><is><t xml:space="preserve">xy</t></is>'
+            '</c></row>', xml.decode('utf-8'))
+        self.assertTrue(writer.write_row(['b']).startswith(b'<row r="2">'))
+
+
+class ExportXLSXTests(TestCase):
+
+    def setUp(self):
+        customer = Customer.objects.create(name='name', address='address',
+                                           is_active=False)
+        for i in range(3):
+            Account.objects.create(
+                owner=customer, account_no='no%d' % i,
+                balance=Decimal('1.5') * i,
+                creation_date=(datetime.datetime(2020, 1, 2, 6)
+                               if i else None))
+
+    def get(self, **kwargs):
+        response = AccountXLSX.as_view(**kwargs)(RequestFactory().get(''))
+        if response.streaming:
+            return response, b''.join(response.streaming_content)
+        return response, response.content
+
+    def test_xlsx(self):
+        response, content = self.get(streaming=True)
+        self.assertEqual('application/vnd.openxmlformats-officedocument.'
+                         'spreadsheetml.sheet', response['Content-Type'])
+        self.assertIn('.xlsx"', response['Content-Disposition'])
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertIn('xl/styles.xml', archive.namelist())
+        rows = read_sheet(content)
+        self.assertEqual(4, len(rows))
+        self.assertEqual(('inlineStr', None, 'account no'), rows[0]['A1'])
+        self.assertEqual(('inlineStr', None, 'NO1'), rows[2]['A3'])
+        self.assertEqual((None, None, '1.50'), rows[2]['B3'])
+        self.assertEqual((None, '1', '43832.25'), rows[2]['C3'])
+        # None is an empty cell
+        self.assertNotIn('C2', rows[1])
+        # relations and paths are written as text
+        self.assertEqual(('inlineStr', None, 'name'), rows[1]['D2'])
+        self.assertEqual(('inlineStr', None, 'False'), rows[1]['E2'])
+
+    def test_save_csv(self):
+        from django.core.files.storage import Storage
+
+        class MemoryStorage(Storage):
+            files = {}
+
+            def _save(self, name, content):
+                self.files[name] = b''.join(content.chunks())
+                return name
+
+            def exists(self, name):
+                return False
+
+        view = AccountXLSX()
+        view.request = RequestFactory().get('')
+        storage = MemoryStorage()
+        name = view.save_csv(storage)
+        self.assertTrue(name.endswith('.xlsx'))
+        self.assertEqual(4, len(read_sheet(storage.files[name])))